@@ -0,0 +1,57 @@
+"""EC point arithmetic for the encrypted running tally on the Bulletin Board.
+
+ElGamal is additively homomorphic: summing the ciphertexts of all voters' last ballots per
+candidate gives an encryption of the candidate's vote count. The BB keeps this sum in the
+"EncryptedAggregate" table, and on every ballot insert adds the new last ciphertext vote (ctv)
+of the voter and subtracts the one it replaces.
+
+Points are stored and passed around in their binary (SEC1) encoding, as in "Ballots".
+"""
+from functools import lru_cache
+from petlib.ec import EcGroup, EcPt
+
+
+@lru_cache(maxsize=None)
+def group_for(nid) -> EcGroup:
+    """Return the petlib group for a curve id, constructed once per process.
+    Args:
+        nid: OpenSSL curve id as stored in GlobalInfo.GroupCurve.
+    Returns:
+        EcGroup: The elliptic curve group.
+    """
+    return EcGroup(nid)
+
+
+def update_aggregate(GROUP, aggregate, added_ctvs, removed_ctvs):
+    """Add and subtract ctvs to/from a per-candidate aggregate.
+    Args:
+        GROUP (EcGroup): Group the points belong to.
+        aggregate (list): Current ``[c0, c1]`` per candidate as bytes.
+        added_ctvs (list): ctvs of ballots that became a voter's last ballot, each ``[[c0, c1], ...]`` as bytes.
+        removed_ctvs (list): ctvs of ballots that stopped being a voter's last ballot.
+    Returns:
+        list: The new ``[c0, c1]`` per candidate as bytes.
+    """
+    sums = [[EcPt.from_binary(c0, GROUP), EcPt.from_binary(c1, GROUP)] for c0, c1 in aggregate]
+
+    for ctv in added_ctvs:
+        for i, (c0, c1) in enumerate(ctv):
+            sums[i][0] += EcPt.from_binary(c0, GROUP)
+            sums[i][1] += EcPt.from_binary(c1, GROUP)
+
+    for ctv in removed_ctvs:
+        for i, (c0, c1) in enumerate(ctv):
+            sums[i][0] -= EcPt.from_binary(c0, GROUP)
+            sums[i][1] -= EcPt.from_binary(c1, GROUP)
+
+    return [[c0.export(), c1.export()] for c0, c1 in sums]
+
+
+def zero_aggregate(candidates_length):
+    """Return an aggregate of points at infinity, i.e. an empty sum.
+    Args:
+        candidates_length (int): Number of candidates in the election.
+    Returns:
+        list: ``[c0, c1]`` per candidate as bytes.
+    """
+    return [[b"\x00", b"\x00"] for _ in range(candidates_length)]
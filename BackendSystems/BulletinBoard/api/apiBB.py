@@ -7,15 +7,77 @@ and Tallying Server (TS) for:
 - Receiving and storing elections, ballots, and public keys
 - Providing election, voter and result data
 """
-from fastapi import FastAPI, Query, HTTPException
-from modelsBB import ElGamalParams, NewElectionData, VoterKeyList, Ballot, ElectionResult, Elections, IndexImageCBR
+from fastapi import FastAPI, Query, HTTPException, Request, Response, BackgroundTasks
+from fastapi.responses import StreamingResponse, JSONResponse
+from contextlib import asynccontextmanager
+from modelsBB import ElGamalParams, NewElectionData, VoterKeyList, Ballot, BallotList, BallotReceiptList, BallotHashLookup, ElectionResult, Elections, IndexImageCBR, BoardChangeList, HeadsRequest, Heads
 import base64
+import json
+import asyncio
+import os
+import time
 import dbcalls as db
+from cacheBB import cache
+from changefeedBB import listener
+from groupcommitBB import ballot_writer
+from hashBB import hash_ballot
+from snapshotBB import snapshots, SnapshotUnavailable, SnapshotStale
+import boardexportBB
 from notifications import notify_ts_vs_params_saved, notify_ra_public_key_saved
-from coloursBB import RED, CYAN, GREEN, PURPLE, BLUE
+from coloursBB import RED, CYAN, GREEN, PURPLE, BLUE, PINK
 from datetime import datetime
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Opens the database connection pool and the change feed listener on startup and closes them on shutdown.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+    await db.pool.open()
+    await listener.start()
+    yield
+    await listener.stop()
+    await db.pool.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Cached data never changes once written, but clients must revalidate so that they notice a new election setup.
+CACHE_CONTROL = "no-cache"
+
+ROSTER_PAGE_SIZE = int(os.getenv("BB_ROSTER_PAGE_SIZE", "1000")) # Maximum voters or candidates per page of /voters and /candidates.
+CHANGES_PAGE_SIZE = int(os.getenv("BB_CHANGES_PAGE_SIZE", "500")) # Changes read per query by GET /changes and /changes/stream.
+CHANGES_KEEPALIVE_S = float(os.getenv("BB_CHANGES_KEEPALIVE_S", "15")) # Idle time before /changes/stream sends a keepalive.
+
+async def cached_json_response(request: Request, key, loader):
+    """Serve immutable data from the in-process cache with an ETag.
+    Args:
+        request (Request): The incoming request, checked for ``If-None-Match``.
+        key: Cache key for the data, e.g. ``("candidates", election_id)``.
+        loader: Async callable building the JSON-serialisable response body on a cache miss.
+            It returns ``None`` if the data is not available yet.
+    Returns:
+        Response: 304 if the client's ETag matches, otherwise the JSON body with ETag and Cache-Control headers.
+        ``None`` if the data is not available yet.
+    """
+    entry = await cache.get(key, loader)
+    if entry is None:
+        return None
+
+    headers = {"ETag": entry.etag, "Cache-Control": CACHE_CONTROL}
+    if entry.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry.value, headers=headers)
+
+def print_stage_timings(label, timings):
+    """Print the duration of each stage of a bulk load (performance logging).
+    Args:
+        label (str): What was loaded, e.g. "Election setup".
+        timings (dict): Stage name -> duration in ms.
+    """
+    for stage, ms in timings.items():
+        print(f"{PINK}{label} time ({stage}):", round(ms, 3), "ms")
+    print(f"{PINK}{label} time (total):", round(sum(timings.values()), 3), "ms")
 
 @app.get("/health")
 def health():
@@ -27,44 +89,99 @@ def health():
 
 
 @app.get("/candidates")
-def candidates(election_id: int = Query(..., description = "id of the election")):
-    """Retrieve candidates for a specific election.
+async def candidates(
+    request: Request,
+    election_id: int = Query(..., description = "id of the election"),
+    after_id: int | None = Query(None, description = "Return candidates after this id (keyset cursor)"),
+    limit: int = Query(ROSTER_PAGE_SIZE, ge=1, le=ROSTER_PAGE_SIZE, description = "Maximum number of candidates")
+):
+    """Retrieve a page of the candidates for a specific election, ordered by id.
     Args:
         election_id (int): Id of the election.
+        after_id (int | None): ``next`` of the previous page, None for the first page.
+        limit (int): Maximum number of candidates.
     Returns:
-        A dictionary containing a list of candidates with their IDs and names.
+        A dictionary containing a list of candidates with their IDs and names, and
+        ``next``: the ``after_id`` of the following page, or None on the last page.
     """
-    candidates = db.fetch_candidates_for_election(election_id)
-    candidates_dict = [{"id": cid, "name": name} for cid, name in candidates]
-    return {"candidates": candidates_dict}
+    async def load():
+        candidates = await db.fetch_candidates_for_election(election_id, after_id, limit)
+        candidates_dict = [{"id": cid, "name": name} for cid, name in candidates]
+        return {"candidates": candidates_dict, "next": candidates[-1][0] if len(candidates) == limit else None}
+
+    if after_id is not None: # Only first pages are cached, so arbitrary cursors cannot grow the cache.
+        return await load()
+    return await cached_json_response(request, ("candidates", election_id, limit), load)
 
 
 @app.get("/voters")
-def voters(election_id: int = Query(..., description = "id of the election")):
-    """Retrieve voters for a given election.
+async def voters(
+    request: Request,
+    election_id: int = Query(..., description = "id of the election"),
+    after_id: int | None = Query(None, description = "Return voters after this id (keyset cursor)"),
+    limit: int = Query(ROSTER_PAGE_SIZE, ge=1, le=ROSTER_PAGE_SIZE, description = "Maximum number of voters")
+):
+    """Retrieve a page of the voters for a given election, ordered by id.
+    Args:
+        election_id (int): Id of the election.
+        after_id (int | None): ``next`` of the previous page, None for the first page.
+        limit (int): Maximum number of voters.
+    Returns:
+        A dictionary containing a list of voters with their IDs and names, and
+        ``next``: the ``after_id`` of the following page, or None on the last page.
+    """
+    async def load():
+        voters = await db.fetch_voters_for_election(election_id, after_id, limit)
+        voters_dict = [{"id": vid, "name": name} for vid, name in voters]
+        return {"voters": voters_dict, "next": voters[-1][0] if len(voters) == limit else None}
+
+    if after_id is not None: # Only first pages are cached, so arbitrary cursors cannot grow the cache.
+        return await load()
+    return await cached_json_response(request, ("voters", election_id, limit), load)
+
+
+@app.get("/voters/count")
+async def voter_count(election_id: int = Query(..., description = "id of the election")):
+    """Return the number of voters participating in an election.
+    Args:
+        election_id (int): Id of the election.
+    Returns:
+        dict: Election id and voter count.
+    """
+    return {"electionid": election_id, "voter_count": await db.fetch_voter_count(election_id)}
+
+
+@app.get("/voters/{voter_id}/eligible")
+async def voter_eligible(
+    voter_id: int,
+    election_id: int = Query(..., description = "id of the election")
+):
+    """Check whether a voter is eligible to vote in an election.
     Args:
+        voter_id (int): Id of the voter.
         election_id (int): Id of the election.
     Returns:
-        A dictionary containing a list of voters with their IDs and names.
+        dict: Voter id, election id and eligibility.
     """
-    voters = db.fetch_voters_for_election(election_id)
-    voters_dict = [{"id": vid, "name": name} for vid, name in voters]
-    return {"voters": voters_dict}
+    return {"voterid": voter_id, "electionid": election_id, "eligible": await db.fetch_voter_eligible(voter_id, election_id)}
 
 
 @app.get("/elgamalparams")
-async def get_params():
+async def get_params(request: Request):
     """Fetch ElGamal parameters from the database.
     Returns:
         ElGamal group parameters with generator and order encoded with Base64 for transfer.
     """
-    GROUP, GENERATOR, ORDER = await db.fetch_params()
+    async def load():
+        GROUP, GENERATOR, ORDER = await db.fetch_params()
 
-    return {
-    "group": GROUP,
-    "generator": base64.b64encode(GENERATOR).decode(),
-    "order": base64.b64encode(ORDER).decode(),  
-    }
+        return {
+        "group": GROUP,
+        "generator": base64.b64encode(GENERATOR).decode(),
+        "order": base64.b64encode(ORDER).decode(),  
+        }
+
+    return await cached_json_response(request, ("elgamalparams",), load)
 
 
 @app.post("/receive-params")
@@ -85,7 +202,8 @@ async def receive_params(params: ElGamalParams):
     ORDER = base64.b64decode(params.order)
 
     print(f"{BLUE}saving Elgamal parameters to database")
-    db.save_elgamalparams(GROUP, GENERATOR, ORDER)
+    await db.save_elgamalparams(GROUP, GENERATOR, ORDER)
+    cache.invalidate(("elgamalparams",))
 
     # Send notification to Voting Server and Tallying Server so that they can generate their own keys.
     await notify_ts_vs_params_saved()
@@ -105,7 +223,8 @@ async def receive_key(payload: dict):
     """
     service = payload.get("service")
     KEY = base64.b64decode(payload.get("key"))
-    db.save_key_to_db(service, KEY)
+    await db.save_key_to_db(service, KEY)
+    cache.invalidate(("public-keys-tsvs",))
     print(f"{BLUE}public key received from {service} and saved to database")
     await notify_ra_public_key_saved(service)
 
@@ -121,27 +240,157 @@ async def receive_election(payload: NewElectionData):
     Returns:
         Status message indicating successful load of new election.
     """
-    db.load_election_into_db(payload)
+    timings = await db.load_election_into_db(payload)
+    election_id = payload.election.id
+    cache.invalidate_prefix(("candidates", election_id))
+    cache.invalidate_prefix(("voters", election_id))
+    cache.invalidate(("election-dates", election_id))
+    snapshots.discard(election_id)
     print(f"{CYAN}election loaded with id {payload.election.id}")
+    print_stage_timings("Election setup", timings)
     
     return {"status": "new election loaded into database"}
 
 
+@app.post("/elections/{election_id}/detach")
+async def detach_election(election_id: int):
+    """Detach the ballot partitions of a finished election so they can be archived.
+    Afterwards the election's ballots are only served by the BB from its snapshot, if it has one.
+    Args:
+        election_id (int): Id of the election.
+    Returns:
+        Status message indicating the partitions were detached.
+    Raises:
+        HTTPException: If the partitions could not be detached.
+    """
+    try:
+        await db.detach_election_partitions(election_id)
+        print(f"{PURPLE}Ballot partitions detached for election {election_id}")
+
+        return {"status": f"ballot partitions for election {election_id} detached"}
+    except Exception as e:
+        print(f"{RED}[BB] detach_election_partitions failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def export_path(name):
+    """Resolve the name of an export directory inside ``BB_EXPORT_DIR``, rejecting anything outside it."""
+    if not name or name.startswith(".") or os.path.basename(name) != name:
+        raise HTTPException(status_code=400, detail="Invalid export name")
+    return os.path.join(boardexportBB.EXPORT_DIR, name)
+
+
+@app.post("/elections/{election_id}/export")
+async def export_election(
+    election_id: int,
+    name: str | None = Query(None, description="Directory in BB_EXPORT_DIR to write to, election_<id> by default")
+):
+    """Export the full board of an election as Parquet files, e.g. to move it to another BB or for an offline audit.
+    Args:
+        election_id (int): Id of the election.
+        name (str, optional): Name of the export directory.
+    Returns:
+        dict: Export directory name and number of rows per table.
+    Raises:
+        HTTPException: If the election does not exist.
+    """
+    name = name or f"election_{election_id}"
+    try:
+        counts = await boardexportBB.export_election(election_id, export_path(name))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    print_stage_timings(f"Election {election_id} export", counts.pop("timings"))
+
+    return {"name": name, "tables": counts}
+
+
+@app.post("/elections/import")
+async def import_election(
+    background_tasks: BackgroundTasks,
+    name: str = Query(..., description="Directory in BB_EXPORT_DIR written by an export")
+):
+    """Import an exported election board in a single transaction.
+    Args:
+        name (str): Name of the export directory.
+    Returns:
+        dict: Election id and number of rows imported per table.
+    Raises:
+        HTTPException: If the export does not exist, the election already exists or one of its candidates or voters
+            exists with different data.
+    """
+    path = export_path(name)
+    if not os.path.isfile(os.path.join(path, "manifest.json")):
+        raise HTTPException(status_code=404, detail=f"No export named {name}")
+    try:
+        counts = await boardexportBB.import_election(path)
+    except boardexportBB.ImportConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    election_id = counts.pop("electionid")
+    print_stage_timings(f"Election {election_id} import", counts.pop("timings"))
+
+    cache.invalidate_prefix(("candidates", election_id))
+    cache.invalidate_prefix(("voters", election_id))
+    cache.invalidate(("election-dates", election_id))
+    cache.invalidate(("election-result", election_id))
+    if snapshots.enabled:
+        background_tasks.add_task(build_snapshot, election_id)
+
+    return {"electionid": election_id, "tables": counts}
+
+
+@app.post("/elections/{election_id}/snapshot")
+async def snapshot_election(election_id: int):
+    """(Re)build the frozen snapshot of a tallied election, from which its read endpoints are then served.
+    Snapshots are built automatically when the result is posted; this rebuilds one, e.g. after a restore.
+    Args:
+        election_id (int): Id of the election.
+    Returns:
+        dict: Number of ballots and voters in the snapshot.
+    Raises:
+        HTTPException: If snapshots are disabled, the election has no result yet or ballots were posted while building.
+    """
+    if not snapshots.enabled:
+        raise HTTPException(status_code=409, detail="Snapshots are disabled (BB_SNAPSHOT_DIR is empty)")
+    try:
+        counts = await snapshots.build(election_id)
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    print(f"{PURPLE}Snapshot built for election {election_id}: {counts['ballots']} ballots, {counts['voters']} voters")
+
+    return {"electionid": election_id, **counts}
+
+
+def check_ballot_hash(pyBallot: Ballot):
+    """Hash a ballot and reject it if its client-supplied hash (its idempotency key) does not match its contents.
+    Returns:
+        str: The ballot hash, passed on to the insert so the ballot is hashed once.
+    Raises:
+        HTTPException: If the hash does not match.
+    """
+    ballot_hash = hash_ballot(pyBallot)
+    if pyBallot.hash is not None and pyBallot.hash != ballot_hash:
+        raise HTTPException(status_code=400, detail="Ballot hash does not match the ballot")
+    return ballot_hash
+
+
 @app.post("/receive-ballot0")
 async def receive_ballot0(pyBallot:Ballot):
     """Receive and store an initial (Ballot0) ballot.
+    Posting is idempotent: a ballot that is already stored is not stored again, its id is returned.
     Args:
         pyBallot (Ballot): Ballot object containing encrypted choices and information about the ballot.
     Returns:
-        dict: Status message on successful load.
+        dict: Status message and ballot id on successful load.
     Raises:
-        HTTPException: If the ballot could not be stored.
+        HTTPException: If the ballot hash does not match or the ballot could not be stored.
     """
+    ballot_hash = check_ballot_hash(pyBallot)
     try:
-        db.load_ballot_into_db(pyBallot)
+        ballot_id = await ballot_writer.submit(pyBallot, ballot_hash)
+        snapshots.discard(pyBallot.electionid)
         print(f"{CYAN}Ballot0 loaded with voter id {pyBallot.voterid}")
     
-        return {"status": "new ballot0 loaded into database"}
+        return {"status": "new ballot0 loaded into database", "ballotid": ballot_id}
     except Exception as e:
         print(f"{RED}[BB] load_ballot0_into_db failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -150,23 +399,50 @@ async def receive_ballot0(pyBallot:Ballot):
 @app.post("/receive-ballot")
 async def receive_ballot(pyBallot:Ballot):
     """Receive and store a ballot for voter in an election.
+    Posting is idempotent: a ballot that is already stored is not stored again, its id is returned.
     Args:
         pyBallot (Ballot): Ballot object containing encrypted choices and nformation about the ballot.
     Returns:
-        dict: Status message on successful load.
+        dict: Status message and ballot id on successful load.
     Raises:
-        HTTPException: If the ballot could not be stored.
+        HTTPException: If the ballot hash does not match or the ballot could not be stored.
     """
+    ballot_hash = check_ballot_hash(pyBallot)
     try:
-        db.load_ballot_into_db(pyBallot)
+        ballot_id = await ballot_writer.submit(pyBallot, ballot_hash)
+        snapshots.discard(pyBallot.electionid)
         print(f"{GREEN}Ballot loaded with voter id {pyBallot.voterid}, in election {pyBallot.electionid}")
     
-        return {"status": "new ballot loaded into database"}
+        return {"status": "new ballot loaded into database", "ballotid": ballot_id}
     except Exception as e:
         print(f"{RED}[BB] load_ballot_into_db failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/receive-ballots")
+async def receive_ballots(payload: BallotList):
+    """Receive and store a batch of ballots in a single transaction.
+    Ballots that are already stored (e.g. a retried batch) are not stored again, their receipt has the existing id.
+    Args:
+        payload (BallotList): Ballots to store, e.g. all obfuscation ballots due in the same tick.
+    Returns:
+        BallotReceiptList: Ballot id or error for each posted ballot, in the order they were posted.
+    Raises:
+        HTTPException: If the batch could not be written at all.
+    """
+    try:
+        receipts = await db.load_ballots_into_db(payload.ballots)
+        stored = sum(1 for receipt in receipts if receipt.error is None)
+        for election_id in {ballot.electionid for ballot in payload.ballots}:
+            snapshots.discard(election_id)
+        print(f"{GREEN}Ballot batch loaded: {stored} of {len(payload.ballots)} ballots stored")
+
+        return BallotReceiptList(receipts=receipts)
+    except Exception as e:
+        print(f"{RED}[BB] load_ballots_into_db failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # receives public keys for voters for a given election from RA and loads them into the database.
 @app.post("/receive-voter-keys")
 async def receive_voter_keys(payload: VoterKeyList):
@@ -175,11 +451,14 @@ async def receive_voter_keys(payload: VoterKeyList):
         payload (VoterKeyList): List of voter id's and their public keys.
     """
     print(f"{CYAN}saving voter public keys to database")
-    db.save_voter_keys_to_db(payload)
+    timings = await db.save_voter_keys_to_db(payload)
+    for election_id in {voter_key.electionid for voter_key in payload.voterkeylist}:
+        cache.invalidate_prefix(("voters", election_id)) # The roster is the voters with a key for the election.
+    print_stage_timings("Voter key loading", timings)
 
 
 @app.post("/send-election-startdate")
-async def send_election_startdate(payload: dict):
+async def send_election_startdate(request: Request, payload: dict):
     """Return the start and end dates for an election.
     Args:
         payload (dict): Dictionary containing:
@@ -187,16 +466,21 @@ async def send_election_startdate(payload: dict):
     Returns:
         dict: ISO 8601 formatted start and end dates for transfer.
     """
-    election_startdate, election_enddate = db.fetch_election_dates(payload.get("electionid"))
+    election_id = payload.get("electionid")
 
-    formatted_startdate = election_startdate.isoformat()
-    formatted_enddate = election_enddate.isoformat()
+    async def load():
+        election_startdate, election_enddate = await db.fetch_election_dates(election_id)
 
-    return {"startdate": formatted_startdate, "enddate": formatted_enddate}
+        formatted_startdate = election_startdate.isoformat()
+        formatted_enddate = election_enddate.isoformat()
+
+        return {"startdate": formatted_startdate, "enddate": formatted_enddate}
+
+    return await cached_json_response(request, ("election-dates", election_id), load)
 
 
 @app.get("/send-elections-for-voter")
-def send_elections_for_voter(
+async def send_elections_for_voter(
     voter_id: int = Query(..., description="ID of the voter")
 ):
     """Return elections that a given voter is eligible to participate in.
@@ -205,26 +489,29 @@ def send_elections_for_voter(
     Returns:
         Elections: Object containing election id and name.
     """
-    elections: Elections = db.fetch_elections_for_voter(voter_id) 
+    elections: Elections = await db.fetch_elections_for_voter(voter_id) 
 
     return elections
 
 
 @app.get("/public-keys-tsvs")
-async def send_public_keys_tsvs():
+async def send_public_keys_tsvs(request: Request):
     """Retrieve the public keys for the Tallying Server (TS) and Voting Server (VS).
     Returns:
         dict: Base64-encoded public keys for TS and VS.
     """
-    public_key_ts_bin, public_key_vs_bin = db.fetch_public_keys_tsvs()
-    public_key_ts_b64 = base64.b64encode(public_key_ts_bin)
-    public_key_vs_b64 = base64.b64encode(public_key_vs_bin)
-    
-    return {"publickey_ts": public_key_ts_b64, "publickey_vs": public_key_vs_b64}
+    async def load():
+        public_key_ts_bin, public_key_vs_bin = await db.fetch_public_keys_tsvs()
+        public_key_ts_b64 = base64.b64encode(public_key_ts_bin).decode()
+        public_key_vs_b64 = base64.b64encode(public_key_vs_bin).decode()
+        
+        return {"publickey_ts": public_key_ts_b64, "publickey_vs": public_key_vs_b64}
+
+    return await cached_json_response(request, ("public-keys-tsvs",), load)
 
 
 @app.get("/voter-public-key")
-def voter_public_key(
+async def voter_public_key(
     voter_id: int = Query(..., description="ID of the voter"),
     election_id: int = Query(..., description="ID of the election")
 ):
@@ -235,14 +522,14 @@ def voter_public_key(
     Returns:
         Base64-encoded public key for the given voter in the given election.
     """
-    voter_public_key_bin = db.fetch_voter_public_key(voter_id, election_id)
+    voter_public_key_bin = await db.fetch_voter_public_key(voter_id, election_id)
     voter_public_key_b64 = base64.b64encode(voter_public_key_bin).decode()
 
     return {"voter_public_key": voter_public_key_b64}
 
 
 @app.get("/last_previous_last_ballot")
-def get_last_previous_last_ballot(
+async def get_last_previous_last_ballot(
     election_id: int = Query(..., description="ID of the election"),
     voter_id: int = Query(..., description="ID of the voter")
 ):
@@ -253,13 +540,58 @@ def get_last_previous_last_ballot(
     Returns:
         The last and the previous last ballot for the voter in the election.
     """
-    last_ballot, previous_last_ballot = db.fetch_last_and_previouslast_ballot(voter_id, election_id)
+    snapshot = snapshots.get(election_id)
+    if snapshot is not None:
+        last_ballot, previous_last_ballot = snapshot.last_and_previous_last_ballot(voter_id)
+    else:
+        last_ballot, previous_last_ballot = await db.fetch_last_and_previouslast_ballot(voter_id, election_id)
 
     return {"last_ballot": last_ballot, "previous_last_ballot": previous_last_ballot}
 
 
+@app.get("/proof-context")
+async def get_proof_context(
+    election_id: int = Query(..., description="ID of the election"),
+    voter_id: int = Query(..., description="ID of the voter"),
+    before: datetime | None = Query(None, description="Only consider ballots cast before this timestamp")
+):
+    """Return everything needed to build or verify one ballot for a voter, read in one DB transaction.
+    Replaces the separate calls for ElGamal parameters, TS/VS public keys, CBR length, candidates,
+    voter public key and the last and previous last ballots.
+    Args:
+        election_id (int): Id of the election.
+        voter_id (int): Id of the voter.
+        before (datetime, optional): If given, the CBR length and preceding ballots are taken as of this timestamp.
+    Returns:
+        ProofContext: Parameters, keys, candidates and preceding ballots for the voter.
+    Raises:
+        HTTPException: If the voter does not participate in the election.
+    """
+    snapshot = snapshots.get(election_id)
+    if snapshot is not None:
+        proof_context = snapshot.proof_context(voter_id, before)
+    else:
+        proof_context = await db.fetch_proof_context(voter_id, election_id, before)
+    if proof_context is None:
+        raise HTTPException(status_code=404, detail="Voter not found in election")
+    return proof_context
+
+
+@app.post("/heads", response_model=Heads)
+async def get_heads(request: HeadsRequest):
+    """Return the CBR heads of many voters in one request, read in one DB transaction.
+    For each voter: public key, CBR length, and last and previous last ballot. The election parameters,
+    keys and candidates are included once, so a whole tick of obfuscation ballots can be prepared with one call.
+    Args:
+        request (HeadsRequest): Election id and voter ids.
+    Returns:
+        Heads: Election context and one head per voter in the election, in request order.
+    """
+    return await db.fetch_heads(request.electionid, request.voterids)
+
+
 @app.get("/cbr_length")
-def get_cbr_lenghth(
+async def get_cbr_lenghth(
     election_id: int = Query(..., description="ID of the election"),
     voter_id: int = Query(..., description="ID of the voter")
 ):
@@ -270,29 +602,48 @@ def get_cbr_lenghth(
     Returns:
         Length of the CBR.
     """
-    cbr_length = db.fetch_cbr_length(voter_id, election_id)
+    cbr_length = await db.fetch_cbr_length(voter_id, election_id)
 
     return {"cbr_length": cbr_length}
 
 
 @app.get("/cbr-for-voter")
-def send_cbr_for_voter_in_election(
+async def send_cbr_for_voter_in_election(
+    request: Request,
+    response: Response,
     election_id: int = Query(..., description="ID of the election"),
-    voter_id: int = Query(..., description="ID of the voter")
+    voter_id: int = Query(..., description="ID of the voter"),
+    after_index: int | None = Query(None, description="Only return ballots with a higher CBR index"),
+    limit: int | None = Query(None, gt=0, description="Maximum number of ballots to return")
 ):
     """Return the cast ballot record (CBR) for a voter in an election.
+    The ETag is derived from the CBR length, so a poll with ``If-None-Match`` returns 304
+    without reading the CBR if no ballot has been added since.
     Args:
         election_id (int): Id of the election.
         voter_id (int): Id of the voter.
+        after_index (int, optional): Keyset cursor, the CBR index of the last ballot already known to the client.
+        limit (int, optional): Maximum number of ballots to return.
     Returns:
         IndexImageCBR: Object containing CBR information.
     """
-    voter_cbr: IndexImageCBR = db.fetch_cbr_for_voter_in_election(voter_id, election_id)
+    snapshot = snapshots.get(election_id)
+    cbr_length = snapshot.cbr_length(voter_id) if snapshot is not None else await db.fetch_cbr_length(voter_id, election_id)
+    etag = f'"cbr-{election_id}-{voter_id}-{cbr_length}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    if snapshot is not None:
+        voter_cbr: IndexImageCBR = snapshot.cbr(voter_id, after_index, limit)
+    else:
+        voter_cbr: IndexImageCBR = await db.fetch_cbr_for_voter_in_election(voter_id, election_id, after_index, limit)
+    response.headers.update(headers)
     return voter_cbr
 
 
 @app.get("/fetch-ballot-hashes")
-def fetch_ballot_hashes(
+async def fetch_ballot_hashes(
     election_id: int = Query(..., description="ID of the election")
 ):
     """Return all ballot hashes for a given election.
@@ -301,36 +652,287 @@ def fetch_ballot_hashes(
     Returns:
         List of ballot hashes.
     """
-    ballot_hashes = db.fetch_ballot_hashes(election_id)
+    snapshot = snapshots.get(election_id)
+    ballot_hashes = snapshot.ballot_hashes() if snapshot is not None else await db.fetch_ballot_hashes(election_id)
     return {"ballot_hashes": ballot_hashes}
 
 
+@app.post("/ballot-hashes/exists")
+async def ballot_hashes_exist(lookup: BallotHashLookup):
+    """Check whether ballot hashes are already included on the BB for an election.
+    Args:
+        lookup (BallotHashLookup): Election id and the ballot hashes to check.
+    Returns:
+        dict: Mapping from each requested ballot hash to whether it exists.
+    """
+    existing = await db.fetch_existing_ballot_hashes(lookup.electionid, lookup.hashes)
+    return {"exists": {ballot_hash: ballot_hash in existing for ballot_hash in lookup.hashes}}
+
+
 @app.get("/fetch_last_ballot_ctvs")
-def fetch_last_ballot_ctvs(election_id):
+async def fetch_last_ballot_ctvs(
+    election_id: int = Query(..., description="ID of the election")
+):
     """Return all last ballot ciphertexts for candidate chioce (CTVs) for an election.
     Used for tallying. 
     Args:
-        election_id: Id of the election.
+        election_id (int): Id of the election.
     Returns:
         JSON representation of the last ballot ciphertexts.
     """
-    last_ballot_ctvs_json = db.fetch_last_ballot_ctvs(election_id)
+    snapshot = snapshots.get(election_id)
+    if snapshot is not None:
+        last_ballot_ctvs_json = [ctv for _, ctv in snapshot.last_ballot_ctvs()]
+    else:
+        last_ballot_ctvs_json = await db.fetch_last_ballot_ctvs(election_id)
 
     return {"last_ballot_ctvs": last_ballot_ctvs_json}
 
 
+@app.get("/last-ballot-ctvs/stream")
+async def stream_last_ballot_ctvs(
+    election_id: int = Query(..., description="ID of the election")
+):
+    """Stream the last ballot ciphertexts for candidate choice (CTVs) for an election as NDJSON.
+    Each line is one voter: ``{"voterid": ..., "ctv": [[c0_b64, c1_b64], ...]}``, so consumers can
+    fold the ciphertexts into per-candidate sums while the data arrives.
+    Args:
+        election_id (int): Id of the election.
+    Returns:
+        StreamingResponse: Newline-delimited JSON, one line per voter.
+    """
+    snapshot = snapshots.get(election_id)
+
+    async def ndjson_lines():
+        if snapshot is not None:
+            for voter_id, ctv in snapshot.last_ballot_ctvs():
+                yield json.dumps({"voterid": voter_id, "ctv": ctv}) + "\n"
+            return
+        async for voter_id, ctv in db.stream_last_ballot_ctvs(election_id):
+            yield json.dumps({"voterid": voter_id, "ctv": ctv}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/changes", response_model=BoardChangeList)
+async def get_changes(
+    election_id: int = Query(..., description="ID of the election"),
+    since: int = Query(0, ge=0, description="Cursor of the last change already seen"),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=CHANGES_PAGE_SIZE, description="Maximum number of changes")
+):
+    """Return the ballots and results posted for an election after a cursor.
+    Args:
+        election_id (int): Id of the election.
+        since (int): Cursor returned as ``next`` by the previous call, 0 for all changes.
+        limit (int): Maximum number of changes.
+    Returns:
+        BoardChangeList: The changes, oldest first, and the cursor to continue from.
+    """
+    changes = await db.fetch_board_changes(election_id, since, limit)
+
+    return BoardChangeList(electionid=election_id, changes=changes, next=changes[-1].id if changes else since)
+
+
+@app.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    election_id: int = Query(..., description="ID of the election"),
+    since: int = Query(0, ge=0, description="Cursor of the last change already seen")
+):
+    """Stream the ballots and results posted for an election as Server-Sent Events.
+    Each event has the change cursor as ``id``, the kind as ``event`` and the change as JSON ``data``.
+    A reconnecting client resumes after the ``Last-Event-ID`` header, which takes precedence over ``since``.
+    Args:
+        election_id (int): Id of the election.
+        since (int): Cursor of the last change already seen, 0 for all changes.
+    Returns:
+        StreamingResponse: ``text/event-stream`` that stays open until the client disconnects.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    cursor = int(last_event_id) if last_event_id.isdigit() else since
+
+    async def events():
+        nonlocal cursor
+        while not await request.is_disconnected():
+            waiter = listener.waiter(election_id)
+            changes = await db.fetch_board_changes(election_id, cursor, CHANGES_PAGE_SIZE)
+            for change in changes:
+                yield f"id: {change.id}\nevent: {change.kind}\ndata: {change.model_dump_json()}\n\n"
+                cursor = change.id
+            if changes:
+                continue
+
+            try:
+                await asyncio.wait_for(waiter.wait(), CHANGES_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/encrypted-aggregate")
+async def get_encrypted_aggregate(
+    election_id: int = Query(..., description="ID of the election")
+):
+    """Return the per-candidate sum of the last ballot ciphertexts (CTVs) of all voters in an election.
+    The sum is kept up to date on every ballot insert, so tallying needs one ciphertext pair per candidate.
+    Args:
+        election_id (int): Id of the election.
+    Returns:
+        dict: Base64-encoded [c0, c1] pair per candidate, in ballot ctv order.
+    """
+    snapshot = snapshots.get(election_id)
+    aggregate = snapshot.encrypted_aggregate if snapshot is not None else await db.fetch_encrypted_aggregate(election_id)
+
+    return {"electionid": election_id, "aggregate": aggregate}
+
+
+@app.post("/encrypted-aggregate/rebuild")
+async def rebuild_encrypted_aggregate(
+    election_id: int = Query(..., description="ID of the election")
+):
+    """Recompute the encrypted aggregate of an election from the last ballots of all voters.
+    Only needed for elections with ballots stored before the aggregate was maintained on insert.
+    Args:
+        election_id (int): Id of the election.
+    Returns:
+        dict: Status message.
+    """
+    await db.rebuild_encrypted_aggregate(election_id)
+    print(f"{PURPLE}Encrypted aggregate rebuilt for election {election_id}")
+
+    return {"status": "encrypted aggregate rebuilt"}
+
+
+@app.get("/merkle/root")
+async def get_merkle_root(
+    election_id: int = Query(..., description="ID of the election"),
+    tree_size: int | None = Query(None, description="Size of an earlier tree, defaults to the current size")
+):
+    """Return the root of the append-only Merkle log over the ballot hashes of an election (RFC 6962).
+    Args:
+        election_id (int): Id of the election.
+        tree_size (int | None): Size of an earlier tree to return the root for.
+    Returns:
+        dict: Tree size and hex-encoded root.
+    Raises:
+        HTTPException: If the election has no Merkle log of the requested size.
+    """
+    result = await db.fetch_merkle_root(election_id, tree_size)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Merkle tree not found")
+    tree_size, root = result
+
+    return {"electionid": election_id, "tree_size": tree_size, "root": root.hex()}
+
+
+@app.get("/merkle/inclusion")
+async def get_merkle_inclusion_proof(
+    election_id: int = Query(..., description="ID of the election"),
+    ballot_hash: str = Query(..., description="Hash of the ballot"),
+    tree_size: int | None = Query(None, description="Size of the tree to prove inclusion in, defaults to the current size")
+):
+    """Return the audit path proving that a ballot is in the Merkle log of an election.
+    The leaf is ``SHA-256(0x00 || ballot hash)``; hashing it with the path as in RFC 6962 gives the root of ``tree_size``.
+    Args:
+        election_id (int): Id of the election.
+        ballot_hash (str): Hash of the ballot.
+        tree_size (int | None): Size of the tree to prove inclusion in.
+    Returns:
+        dict: Leaf index, tree size and hex-encoded audit path from the leaf upwards.
+    Raises:
+        HTTPException: If the ballot is not in the tree.
+    """
+    try:
+        result = await db.fetch_merkle_inclusion_proof(election_id, ballot_hash, tree_size)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ballot hash is not a hex digest")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Ballot not found in Merkle tree")
+    leaf_index, tree_size, audit_path = result
+
+    return {
+        "electionid": election_id,
+        "leaf_index": leaf_index,
+        "tree_size": tree_size,
+        "audit_path": [node.hex() for node in audit_path],
+    }
+
+
+@app.get("/merkle/consistency")
+async def get_merkle_consistency_proof(
+    election_id: int = Query(..., description="ID of the election"),
+    first: int = Query(..., description="Size of the older tree"),
+    second: int = Query(..., description="Size of the newer tree")
+):
+    """Return the proof that the Merkle log of an election only appended ballots between two tree sizes (RFC 6962).
+    Args:
+        election_id (int): Id of the election.
+        first (int): Size of the older tree.
+        second (int): Size of the newer tree.
+    Returns:
+        dict: Both tree sizes and the hex-encoded consistency proof.
+    Raises:
+        HTTPException: If the sizes are invalid or the election has no Merkle log of size ``second``.
+    """
+    if not 0 <= first <= second:
+        raise HTTPException(status_code=400, detail="Tree sizes must satisfy 0 <= first <= second")
+    proof = await db.fetch_merkle_consistency_proof(election_id, first, second)
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Merkle tree not found")
+
+    return {"electionid": election_id, "first": first, "second": second, "proof": [node.hex() for node in proof]}
+
+
+@app.post("/merkle/rebuild")
+async def rebuild_merkle_log(
+    election_id: int = Query(..., description="ID of the election")
+):
+    """Rebuild the Merkle log of an election from its stored ballots.
+    Only needed for elections with ballots stored before the log was maintained on insert.
+    Args:
+        election_id (int): Id of the election.
+    Returns:
+        dict: Status message.
+    """
+    await db.rebuild_merkle_log(election_id)
+    print(f"{PURPLE}Merkle log rebuilt for election {election_id}")
+
+    return {"status": "merkle log rebuilt"}
+
+
 @app.post("/receive-election-result")
-def receive_election_result(election_result: ElectionResult):
+async def receive_election_result(election_result: ElectionResult, background_tasks: BackgroundTasks):
     """Receive and store the final result for an election.
+    The board of the election is frozen afterwards, so a snapshot is built once the response is sent.
     Args:
         election_result (ElectionResult): Election result data to be stored.
     """
     print(f"{PURPLE}Received election result for {election_result.electionid}. Saving to database...")
-    db.save_election_result(election_result)
+    timings = await db.save_election_result(election_result)
+    cache.invalidate(("election-result", election_result.electionid))
+    print_stage_timings("Election result saving", timings)
+    if snapshots.enabled:
+        background_tasks.add_task(build_snapshot, election_result.electionid)
+
+
+async def build_snapshot(election_id):
+    """Build the snapshot of an election in the background, logging the time it took."""
+    try:
+        start = time.perf_counter()
+        counts = await snapshots.build(election_id)
+        print(f"{PINK}Snapshot build time (election {election_id}, {counts['ballots']} ballots):", round((time.perf_counter() - start) * 1000, 3), "ms")
+    except SnapshotStale as e:
+        print(f"{RED}[BB] snapshot for election {election_id} not kept: {e}")
+    except SnapshotUnavailable:
+        pass # Not tallied yet, e.g. an imported election.
+    except Exception as e:
+        print(f"{RED}[BB] building snapshot for election {election_id} failed: {e}")
 
 
 @app.get("/election-result")
-def send_election_result(
+async def send_election_result(
+    request: Request,
     election_id: int = Query(..., description="ID of the election")
 ):
     """Retrieve the stored election result for a given election.
@@ -341,27 +943,36 @@ def send_election_result(
     Raises:
         HTTPException: If no result exists for the given election.
     """
-    election_result = db.fetch_election_result(election_id)
-    if election_result is None:
+    async def load():
+        election_result = await db.fetch_election_result(election_id)
+        # Results are only cached once they have been posted.
+        return None if election_result is None else election_result.model_dump(mode="json")
+
+    response = await cached_json_response(request, ("election-result", election_id), load)
+    if response is None:
         raise HTTPException(status_code=404, detail="Election result not Found")
-    return election_result
+    return response
 
 @app.get("/ballot")
-def get_ballot(
+async def get_ballot(
     election_id: int = Query(..., description="ID of the election"),
     voter_id: int = Query(..., description="ID of the voter"),
     image_filename: str = Query(..., description="Image filename associated with the ballot")
 ):
-    ballot: Ballot = db.fetch_ballot(election_id, voter_id, image_filename)
+    snapshot = snapshots.get(election_id)
+    if snapshot is not None:
+        ballot: Ballot = snapshot.ballot(voter_id, image_filename)
+    else:
+        ballot: Ballot = await db.fetch_ballot(election_id, voter_id, image_filename)
     print(f"ballot fetched for image: {image_filename}:", ballot)
     return ballot
 
 @app.get("/preceding-ballots")
-def get_preceding_ballots(
+async def get_preceding_ballots(
     election_id: int = Query(..., description="ID of the election"),
     voter_id: int = Query(..., description="ID of the voter"),
     timestamp: str = Query(..., description="Timestamp associated with the ballot")
 ):
-    last_ballot, previous_last_ballot = db.fetch_preceeding_ballots(voter_id, election_id, timestamp)
+    last_ballot, previous_last_ballot = await db.fetch_preceeding_ballots(voter_id, election_id, timestamp)
 
     return {"last_ballot": last_ballot, "previous_last_ballot": previous_last_ballot}
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""Export and import of the full board of an election as Parquet files.
+
+An export is a directory holding one Parquet file per table plus ``manifest.json``. It contains the
+election, its candidates and voters, all ballot tables (ballots, proofs, casts, images, CBR heads and CBRs),
+the result, the encrypted aggregate and the Merkle log, so an imported election is served exactly like
+the original one. The ElGamal parameters and TS/VS public keys are exported for offline audits, but
+not imported: the target BB keeps its own. The change feed is not exported.
+
+Rows are streamed in both directions with binary ``COPY``, in batches of ``STREAM_BATCH_SIZE`` rows:
+an export reads all tables from one REPEATABLE READ snapshot, an import writes them in one transaction.
+
+Usage (with the same POSTGRES_* environment as the BB):
+    python boardexportBB.py export <election id> <directory>
+    python boardexportBB.py import <directory>
+"""
+import argparse
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+import pyarrow as pa
+import pyarrow.parquet as pq
+from psycopg import sql
+import dbcalls as db
+
+FORMAT_VERSION = 1
+EXPORT_DIR = os.getenv("BB_EXPORT_DIR", "/exports") # Directory the export/import endpoints read and write.
+CT_PAIR = pa.list_(pa.binary())
+
+
+@dataclass(frozen=True)
+class BoardTable:
+    """One exported table: the rows of an election, with their PostgreSQL and Arrow types."""
+    name: str                   # File name without extension.
+    table: str                  # Table the rows are imported into.
+    columns: tuple              # (column, PostgreSQL type, Arrow type)
+    where: str                  # Selects the rows of the election (%s is the election id, if used).
+    shared: bool = False        # Rows may already exist (other elections); they are imported with ON CONFLICT DO NOTHING.
+    key: tuple = ()             # Key columns of a shared table, existing rows with the same key must be identical.
+    imported: bool = True
+
+
+BOARD_TABLES = (
+    BoardTable("elections", "Elections",
+               (("ID", "int4", pa.int32()), ("Name", "varchar", pa.string()),
+                ("ElectionStart", "timestamptz", pa.timestamp("us", tz="UTC")), ("ElectionEnd", "timestamptz", pa.timestamp("us", tz="UTC"))),
+               "ID = %s"),
+    BoardTable("candidates", "Candidates",
+               (("ID", "int4", pa.int32()), ("Name", "varchar", pa.string())),
+               "ID IN (SELECT CandidateID FROM CandidateRunsInElection WHERE ElectionID = %s)", shared=True, key=("ID",)),
+    BoardTable("candidate_runs", "CandidateRunsInElection",
+               (("CandidateID", "int4", pa.int32()), ("ElectionID", "int4", pa.int32()),
+                ("Result", "int4", pa.int32()), ("TallyProof", "bytea", pa.binary())),
+               "ElectionID = %s"),
+    BoardTable("voters", "Voters",
+               (("ID", "int4", pa.int32()), ("Name", "varchar", pa.string())),
+               "ID IN (SELECT VoterID FROM VoterParticipatesInElection WHERE ElectionID = %s)", shared=True, key=("ID",)),
+    BoardTable("voter_participation", "VoterParticipatesInElection",
+               (("ElectionID", "int4", pa.int32()), ("VoterID", "int4", pa.int32()), ("PublicKey", "bytea", pa.binary())),
+               "ElectionID = %s"),
+    BoardTable("ballots", "Ballots",
+               (("ElectionID", "int4", pa.int32()), ("ID", "int4", pa.int32()),
+                ("CtCandidate", "bytea[]", pa.list_(CT_PAIR)), ("CtVoterList", "bytea[]", CT_PAIR),
+                ("CtVotingServerList", "bytea[]", CT_PAIR), ("BallotHash", "text", pa.string())),
+               "ElectionID = %s"),
+    BoardTable("ballot_proofs", "BallotProofs",
+               (("ElectionID", "int4", pa.int32()), ("BallotID", "int4", pa.int32()), ("Proof", "bytea", pa.binary())),
+               "ElectionID = %s"),
+    BoardTable("voter_casts_ballot", "VoterCastsBallot",
+               (("ElectionID", "int4", pa.int32()), ("BallotID", "int4", pa.int32()),
+                ("VoterID", "int4", pa.int32()), ("VoteTimestamp", "timestamp", pa.timestamp("us"))),
+               "ElectionID = %s"),
+    BoardTable("images", "Images",
+               (("ElectionID", "int4", pa.int32()), ("BallotID", "int4", pa.int32()), ("ImageFilename", "varchar", pa.string())),
+               "ElectionID = %s"),
+    BoardTable("voter_ballot_heads", "VoterBallotHead",
+               (("ElectionID", "int4", pa.int32()), ("VoterID", "int4", pa.int32()), ("LastBallotID", "int4", pa.int32()),
+                ("PreviousLastBallotID", "int4", pa.int32()), ("CBRLength", "int4", pa.int32())),
+               "ElectionID = %s"),
+    BoardTable("voter_cbrs", "VoterCBR",
+               (("ElectionID", "int4", pa.int32()), ("VoterID", "int4", pa.int32()), ("CBRIndex", "int4", pa.int32()),
+                ("ImageFilename", "varchar", pa.string()), ("VoteTimestamp", "timestamp", pa.timestamp("us")),
+                ("BallotID", "int4", pa.int32())),
+               "ElectionID = %s"),
+    BoardTable("encrypted_aggregate", "EncryptedAggregate",
+               (("ElectionID", "int4", pa.int32()), ("CandidateIndex", "int4", pa.int32()),
+                ("C0", "bytea", pa.binary()), ("C1", "bytea", pa.binary())),
+               "ElectionID = %s"),
+    BoardTable("merkle_heads", "MerkleHeads",
+               (("ElectionID", "int4", pa.int32()), ("TreeSize", "int4", pa.int32())),
+               "ElectionID = %s"),
+    BoardTable("merkle_nodes", "MerkleNodes",
+               (("ElectionID", "int4", pa.int32()), ("Level", "int2", pa.int16()),
+                ("NodeIndex", "int4", pa.int32()), ("Hash", "bytea", pa.binary())),
+               "ElectionID = %s"),
+    BoardTable("global_info", "GlobalInfo",
+               (("PublicKeyTallyingServer", "bytea", pa.binary()), ("PublicKeyVotingServer", "bytea", pa.binary()),
+                ("GroupCurve", "int4", pa.int32()), ("Generator", "bytea", pa.binary()), ("OrderP", "bytea", pa.binary())),
+               "ID = 0", imported=False),
+)
+
+
+class ImportConflict(Exception):
+    """The election of an export already exists on the BB, or a candidate or voter of it exists with other data."""
+
+
+def arrow_schema(board_table):
+    return pa.schema([(column, arrow_type) for column, _, arrow_type in board_table.columns])
+
+
+def column_list(board_table):
+    return sql.SQL(", ").join(sql.Identifier(column.lower()) for column, _, _ in board_table.columns)
+
+
+async def export_table(cur, board_table, election_id, path):
+    """Stream the rows of one table of an election into a Parquet file.
+    Returns:
+        int: Number of rows written.
+    """
+    query = sql.SQL("COPY (SELECT {} FROM {} WHERE {}) TO STDOUT (FORMAT BINARY)").format(
+        column_list(board_table), sql.Identifier(board_table.table.lower()), sql.SQL(board_table.where))
+    schema = arrow_schema(board_table)
+    num_rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        async with cur.copy(query, (election_id,) if "%s" in board_table.where else None) as copy:
+            copy.set_types([pg_type for _, pg_type, _ in board_table.columns])
+            rows = []
+            async for row in copy.rows():
+                rows.append(row)
+                if len(rows) == db.STREAM_BATCH_SIZE:
+                    writer.write_batch(pa.record_batch([list(column) for column in zip(*rows)], schema=schema))
+                    num_rows += len(rows)
+                    rows = []
+            if rows:
+                writer.write_batch(pa.record_batch([list(column) for column in zip(*rows)], schema=schema))
+                num_rows += len(rows)
+    return num_rows
+
+
+async def export_election(election_id, directory):
+    """Export the board of an election into a directory of Parquet files.
+    Args:
+        election_id (int): Id of the election.
+        directory (str): Target directory, created if needed.
+    Returns:
+        dict: Number of rows per table, and the duration of each table's export in ms under ``"timings"``.
+    Raises:
+        LookupError: If the election does not exist.
+    """
+    os.makedirs(directory, exist_ok=True)
+    timings = db.StageTimings()
+    counts = {}
+
+    async with db.pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                await cur.execute("SELECT 1 FROM Elections WHERE ID = %s", (election_id,))
+                if await cur.fetchone() is None:
+                    raise LookupError(f"election {election_id} does not exist")
+
+                for board_table in BOARD_TABLES:
+                    counts[board_table.name] = await export_table(
+                        cur, board_table, election_id, os.path.join(directory, f"{board_table.name}.parquet"))
+                    timings.lap(board_table.name)
+
+    manifest = {"version": FORMAT_VERSION, "electionid": election_id, "tables": counts}
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return {**counts, "timings": timings.stages}
+
+
+async def import_table(cur, board_table, path):
+    """Stream the rows of a Parquet file into a table with binary COPY.
+    Shared tables are copied into a temporary staging table first, as COPY cannot skip existing rows.
+    Returns:
+        int: Number of rows read.
+    Raises:
+        ImportConflict: If a row of a shared table exists with the same key but different data.
+    """
+    target = sql.Identifier(board_table.table.lower())
+    if board_table.shared:
+        staging = sql.Identifier(f"{board_table.name}_staging")
+        await cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP").format(staging, target))
+        copy_target = staging
+    else:
+        copy_target = target
+
+    num_rows = 0
+    query = sql.SQL("COPY {} ({}) FROM STDIN (FORMAT BINARY)").format(copy_target, column_list(board_table))
+    async with cur.copy(query) as copy:
+        copy.set_types([pg_type for _, pg_type, _ in board_table.columns])
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=db.STREAM_BATCH_SIZE):
+            for row in zip(*(column.to_pylist() for column in batch.columns)):
+                await copy.write_row(row)
+            num_rows += batch.num_rows
+
+    if board_table.shared:
+        await cur.execute(sql.SQL("INSERT INTO {target} ({columns}) SELECT {columns} FROM {staging} ON CONFLICT DO NOTHING").format(
+            target=target, columns=column_list(board_table), staging=copy_target))
+
+        # A kept row must be the one of the export, otherwise e.g. another voter would be aliased into its ballots.
+        columns = [sql.Identifier(column.lower()) for column, _, _ in board_table.columns]
+        keys = [sql.Identifier(column.lower()) for column in board_table.key]
+        await cur.execute(sql.SQL("""
+                    SELECT {staged_keys} FROM {staging} s JOIN {target} t ON {join}
+                    WHERE ({staged}) IS DISTINCT FROM ({existing})
+                    ORDER BY {staged_keys} LIMIT 10;
+                    """).format(
+            staged_keys=sql.SQL(", ").join(sql.SQL("s.{}").format(key) for key in keys),
+            staging=copy_target,
+            target=target,
+            join=sql.SQL(" AND ").join(sql.SQL("s.{key} = t.{key}").format(key=key) for key in keys),
+            staged=sql.SQL(", ").join(sql.SQL("s.{}").format(column) for column in columns),
+            existing=sql.SQL(", ").join(sql.SQL("t.{}").format(column) for column in columns),
+        ))
+        conflicts = await cur.fetchall()
+        if conflicts:
+            raise ImportConflict(f"{board_table.table} with {'/'.join(board_table.key)} "
+                                 f"{', '.join('/'.join(map(str, key)) for key in conflicts)} already exist with different data")
+    return num_rows
+
+
+async def import_election(directory):
+    """Import an exported election board in a single transaction.
+    Args:
+        directory (str): Directory written by ``export_election``.
+    Returns:
+        dict: ``electionid``, the number of rows per table, and the duration of each table's import in ms under ``"timings"``.
+    Raises:
+        ImportConflict: If the election already exists, or one of its candidates or voters exists with different data.
+        ValueError: If the export has an unknown format version.
+    """
+    with open(os.path.join(directory, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest["version"] != FORMAT_VERSION:
+        raise ValueError(f"unsupported export format version {manifest['version']}")
+    election_id = manifest["electionid"]
+    timings = db.StageTimings()
+    counts = {}
+
+    async with db.pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT 1 FROM Elections WHERE ID = %s", (election_id,))
+                if await cur.fetchone() is not None:
+                    raise ImportConflict(f"election {election_id} already exists")
+                await db.create_election_partitions(cur, election_id)
+
+                for board_table in BOARD_TABLES:
+                    if board_table.imported:
+                        counts[board_table.name] = await import_table(cur, board_table, os.path.join(directory, f"{board_table.name}.parquet"))
+                        timings.lap(board_table.name)
+
+                # Ballot ids are copied as they are, so the shared sequence must not hand them out again.
+                await cur.execute("""
+                            SELECT setval('ballots_id_seq', GREATEST(MAX(ID), (SELECT last_value FROM ballots_id_seq)))
+                            FROM Ballots;
+                            """)
+
+    timings.lap("commit")
+    return {"electionid": election_id, **counts, "timings": timings.stages}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Export or import the board of an election as Parquet files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Export an election")
+    export_parser.add_argument("election_id", type=int)
+    export_parser.add_argument("directory")
+    import_parser = commands.add_parser("import", help="Import an exported election")
+    import_parser.add_argument("directory")
+    args = parser.parse_args()
+
+    async with db.pool:
+        if args.command == "export":
+            result = await export_election(args.election_id, args.directory)
+        else:
+            result = await import_election(args.directory)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
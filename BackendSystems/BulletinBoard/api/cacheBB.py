@@ -0,0 +1,96 @@
+"""In-process cache for data that never changes once it is written to the BB.
+
+ElGamal parameters, TS/VS public keys, candidate lists, voter rosters, election dates and
+posted election results are read by every VS obfuscation, VA vote and verification, but are
+only written once. Their JSON responses are cached here together with an ETag, and the entry
+is invalidated by the endpoint that writes the corresponding data.
+
+Concurrent misses for the same key are coalesced (single-flight): only the first request
+queries the database, the others wait for its result.
+"""
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    value: object
+    etag: str
+
+
+def compute_etag(value) -> str:
+    """Compute a strong ETag for a JSON-serialisable value.
+    Args:
+        value: The JSON-serialisable response body.
+    Returns:
+        str: Quoted SHA-256 hex digest of the canonical JSON encoding.
+    """
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return f'"{hashlib.sha256(payload.encode("utf-8")).hexdigest()}"'
+
+
+class ImmutableCache:
+    """Cache of JSON responses keyed by e.g. ``("candidates", election_id)``."""
+
+    def __init__(self):
+        self._entries: dict = {}
+        self._inflight: dict = {}
+        self._generations: dict = {} # Bumped on invalidation, so loads started before a write are not cached.
+
+    async def get(self, key, loader) -> CacheEntry | None:
+        """Return the cached entry for a key, loading it on a miss.
+        Args:
+            key: Hashable cache key.
+            loader: Async callable returning the JSON-serialisable value, or ``None`` if the
+                data has not been written yet. ``None`` is returned as is and never cached.
+        Returns:
+            CacheEntry | None: The entry for the key, or ``None`` if the loader returned ``None``.
+        Raises:
+            Exception: Whatever the loader raised; failures are not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generations.get(key, 0)
+        try:
+            value = await loader()
+            entry = None if value is None else CacheEntry(value, compute_etag(value))
+            if entry is not None and self._generations.get(key, 0) == generation:
+                self._entries[key] = entry
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception() # Mark as retrieved, as there might be no other waiters.
+            raise
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, *keys):
+        """Drop cached entries after the data behind them has been written.
+        Args:
+            *keys: Cache keys to invalidate.
+        """
+        for key in keys:
+            self._entries.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_prefix(self, prefix: tuple):
+        """Drop all cached entries whose tuple key starts with a prefix, e.g. every page of a paginated roster.
+        Args:
+            prefix (tuple): Leading elements of the keys to invalidate, e.g. ``("voters", election_id)``.
+        """
+        keys = [key for key in (*self._entries, *self._inflight) if isinstance(key, tuple) and key[:len(prefix)] == prefix]
+        self.invalidate(*keys)
+
+
+cache = ImmutableCache()
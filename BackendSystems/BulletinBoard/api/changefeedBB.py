@@ -0,0 +1,78 @@
+"""Push side of the Bulletin Board change feed.
+
+Inserting ballots or an election result records a row in "BoardChanges" and sends
+``NOTIFY board_changes, '<election id>'`` when the transaction commits. One dedicated connection
+LISTENs on that channel and wakes the ``/changes/stream`` subscribers of the election, which then
+read only the changes after their own cursor.
+
+Subscribers also re-read after a keepalive timeout and after the listener reconnects, so a lost
+notification only delays a change, it is never skipped.
+"""
+import asyncio
+import os
+import psycopg
+from psycopg import sql
+from dbcalls import CONNECTION_INFO, CHANGES_CHANNEL
+from coloursBB import RED
+
+RECONNECT_DELAY_S = float(os.getenv("BB_CHANGES_RECONNECT_DELAY_S", "1"))
+
+
+class ChangeListener:
+    """Wakes waiting subscribers when changes for their election are committed."""
+
+    def __init__(self, conninfo, channel):
+        self._conninfo = conninfo
+        self._channel = channel
+        self._events: dict = {} # election id -> event set on the next notification
+        self._task = None
+
+    async def start(self):
+        """Start listening in a background task."""
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop listening and close the connection."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def waiter(self, election_id) -> asyncio.Event:
+        """Return an event that is set on the next notification for an election.
+        Take it before reading the changes, so a notification arriving in between is not missed.
+        Args:
+            election_id (int): Id of the election.
+        Returns:
+            asyncio.Event: Event to wait on.
+        """
+        return self._events.setdefault(election_id, asyncio.Event())
+
+    def _wake(self, election_id):
+        event = self._events.pop(election_id, None)
+        if event is not None:
+            event.set()
+
+    def _wake_all(self):
+        for election_id in list(self._events):
+            self._wake(election_id)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._conninfo, autocommit=True) as conn:
+                    await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self._channel)))
+                    self._wake_all() # Changes committed while not listening.
+                    async for notify in conn.notifies():
+                        self._wake(int(notify.payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"{RED}[BB] change feed listener failed, reconnecting: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_S)
+
+
+listener = ChangeListener(CONNECTION_INFO, CHANGES_CHANNEL)
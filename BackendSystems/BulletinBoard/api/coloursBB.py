@@ -5,4 +5,5 @@ GREEN = "\033[32m"
 YELLOW = "\033[33m"
 BLUE = "\033[34m"
 PURPLE = "\033[35m"
-CYAN = "\033[36m"
\ No newline at end of file
+CYAN = "\033[36m"
+PINK = "\033[38;2;255;105;180m"
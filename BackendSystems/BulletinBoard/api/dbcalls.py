@@ -1,14 +1,20 @@
 """This file has all database calls for the Bulletin Board.
 
 It handles all "read" and "write" operations to the PostgreSQL database.
+All calls are async and share one ``AsyncConnectionPool``, so database round trips
+do not block the event loop while other requests are being handled.
 """
 
 import os
-from modelsBB import NewElectionData, VoterKeyList, Ballot, ElectionResult, Elections, Election, IndexImageCBR, IndexImage, CandidateResult
+import time
+from modelsBB import NewElectionData, VoterKeyList, Ballot, ElectionResult, Elections, Election, IndexImageCBR, IndexImage, CandidateResult, BallotReceipt, ProofContext, Candidate, BoardChange, Heads, VoterHead
 import base64
 from hashBB import hash_ballot
-import json
-from psycopg_pool import ConnectionPool
+from aggregateBB import group_for, update_aggregate, zero_aggregate
+import merkleBB
+from psycopg import sql
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
 
 
 DB_NAME = os.getenv("POSTGRES_DB", "appdb")
@@ -18,7 +24,26 @@ DB_HOST = os.getenv("POSTGRES_HOST", "db")  # docker service name
 DB_PORT = int(os.getenv("POSTGRES_PORT", "5432"))
 CONNECTION_INFO = f"dbname={DB_NAME} user={DB_USER} password={DB_PASS} host={DB_HOST} port={DB_PORT}" # all info that psycopg needs to connect to db
 
-pool = ConnectionPool(conninfo=CONNECTION_INFO, open=True)
+POOL_MIN_SIZE = int(os.getenv("BB_POOL_MIN_SIZE", "4"))
+POOL_MAX_SIZE = int(os.getenv("BB_POOL_MAX_SIZE", "20"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("BB_STATEMENT_TIMEOUT_MS", "30000")) # 0 disables the timeout.
+STREAM_BATCH_SIZE = int(os.getenv("BB_STREAM_BATCH_SIZE", "2000")) # Rows fetched per round trip by server-side cursors.
+PREPARE_THRESHOLD = int(os.getenv("BB_PREPARE_THRESHOLD", "1")) # Executions of a query on a connection before it is prepared server-side.
+
+# The pool is opened and closed in the lifespan of the FastAPI app (apiBB.py), as it needs a running event loop.
+pool = AsyncConnectionPool(
+    conninfo=CONNECTION_INFO,
+    min_size=POOL_MIN_SIZE,
+    max_size=POOL_MAX_SIZE,
+    kwargs={"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}", "prepare_threshold": PREPARE_THRESHOLD},
+    open=False,
+)
+
+CHANGES_CHANNEL = "board_changes" # NOTIFY channel for the change feed, the payload is the election id.
+
+# Tables partitioned by ElectionID (see schema.sql). "Ballots" is referenced by the others, so it is listed first:
+# partitions are created in this order and detached in reverse order.
+PARTITIONED_BALLOT_TABLES = ("ballots", "ballotproofs", "votercastsballot", "images", "voterballothead", "votercbr")
 
 ## ---------------- WRITING TO DB ---------------- ##
 #SQL statements for insertion/ updating
@@ -29,17 +54,32 @@ VALUES (%s, %s, %s, %s)
 ON CONFLICT (ID) DO NOTHING;
 """
 
+# The ballot hash is the idempotency key of a ballot: a retried post inserts nothing and returns no row,
+# and the id of the stored ballot is looked up instead (see insert_ballots).
 SQL_INSERT_BALLOT = """
-INSERT INTO Ballots (CtCandidate, CtVoterList, CtVotingServerList, Proof, BallotHash)
+INSERT INTO Ballots (ElectionID, CtCandidate, CtVoterList, CtVotingServerList, BallotHash)
 VALUES (%s, %s, %s, %s, %s)
-ON CONFLICT (ID) DO NOTHING
+ON CONFLICT (ElectionID, BallotHash) DO NOTHING
 RETURNING ID;
 """
 
+SQL_SELECT_BALLOT_IDS_BY_HASH = """
+SELECT b.ElectionID, b.BallotHash, b.ID
+FROM unnest(%s::int[], %s::text[]) AS k(ElectionID, BallotHash)
+JOIN Ballots b
+ON b.ElectionID = k.ElectionID AND b.BallotHash = k.BallotHash;
+"""
+
+SQL_INSERT_BALLOT_PROOF = """
+INSERT INTO BallotProofs (ElectionID, BallotID, Proof)
+VALUES (%s, %s, %s)
+ON CONFLICT (ElectionID, BallotID) DO NOTHING;
+"""
+
 SQL_INSERT_RELATION_VOTERCASTBALLOT = """
 INSERT INTO VoterCastsBallot (BallotID, VoterID, ElectionID, VoteTimestamp)
 VALUES (%s, %s, %s, %s)
-ON CONFLICT (BallotID) DO NOTHING;
+ON CONFLICT (ElectionID, BallotID) DO NOTHING;
 """
 
 SQL_INSERT_CANDIDATE = """
@@ -54,100 +94,591 @@ VALUES (%s, %s)
 ON CONFLICT (CandidateID, ElectionID) DO NOTHING;
 """
 
-SQL_INSERT_VOTER = """
+# Voters are COPYed into a staging table first, as COPY itself cannot skip voters that already exist.
+SQL_CREATE_VOTER_STAGING = """
+CREATE TEMP TABLE VoterStaging (ID INT, Name VARCHAR(50)) ON COMMIT DROP;
+"""
+
+SQL_INSERT_STAGED_VOTERS = """
 INSERT INTO Voters (ID, Name)
-VALUES (%s, %s)
+SELECT ID, Name FROM VoterStaging
 ON CONFLICT (ID) DO NOTHING;
 """
 
 SQL_INSERT_IMAGES = """
-INSERT INTO Images (ImageFilename, BallotID)
-VALUES (%s, %s)
-ON CONFLICT (BallotID) DO NOTHING;
+INSERT INTO Images (ElectionID, ImageFilename, BallotID)
+VALUES (%s, %s, %s)
+ON CONFLICT (ElectionID, BallotID) DO NOTHING;
+"""
+
+# Ballots for a voter are posted in timestamp order (the VS casts them one at a time per voter),
+# so every new ballot becomes the head of the voter's CBR.
+SQL_ADVANCE_VOTER_BALLOT_HEAD = """
+INSERT INTO VoterBallotHead (ElectionID, VoterID, LastBallotID, PreviousLastBallotID, CBRLength)
+VALUES (%s, %s, %s, NULL, 1)
+ON CONFLICT (ElectionID, VoterID) DO UPDATE
+SET PreviousLastBallotID = VoterBallotHead.LastBallotID,
+    LastBallotID = EXCLUDED.LastBallotID,
+    CBRLength = VoterBallotHead.CBRLength + 1
+RETURNING PreviousLastBallotID, CBRLength;
+"""
+
+SQL_INSERT_VOTER_CBR = """
+INSERT INTO VoterCBR (ElectionID, VoterID, CBRIndex, ImageFilename, VoteTimestamp, BallotID)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (ElectionID, VoterID, CBRIndex) DO NOTHING;
 """
 
-def load_election_into_db(payload: NewElectionData):
+SQL_INIT_ENCRYPTED_AGGREGATE = """
+INSERT INTO EncryptedAggregate (ElectionID, CandidateIndex)
+SELECT %s, generate_series(0, COUNT(*) - 1)
+FROM CandidateRunsInElection
+WHERE ElectionID = %s
+ON CONFLICT (ElectionID, CandidateIndex) DO NOTHING;
+"""
+
+SQL_LOCK_ENCRYPTED_AGGREGATE = """
+SELECT C0, C1
+FROM EncryptedAggregate
+WHERE ElectionID = %s
+ORDER BY CandidateIndex
+FOR UPDATE;
+"""
+
+SQL_UPSERT_ENCRYPTED_AGGREGATE = """
+INSERT INTO EncryptedAggregate (ElectionID, CandidateIndex, C0, C1)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (ElectionID, CandidateIndex) DO UPDATE
+SET C0 = EXCLUDED.C0, C1 = EXCLUDED.C1;
+"""
+
+# Also locks the head row until commit, so leaves are appended to an election's log one transaction at a time.
+SQL_LOCK_MERKLE_HEAD = """
+INSERT INTO MerkleHeads (ElectionID)
+VALUES (%s)
+ON CONFLICT (ElectionID) DO UPDATE
+SET TreeSize = MerkleHeads.TreeSize
+RETURNING TreeSize;
+"""
+
+SQL_INSERT_MERKLE_NODE = """
+INSERT INTO MerkleNodes (ElectionID, Level, NodeIndex, Hash)
+VALUES (%s, %s, %s, %s);
+"""
+
+SQL_INSERT_BOARD_CHANGE = """
+INSERT INTO BoardChanges (ElectionID, Kind, Payload)
+VALUES (%s, %s, %s);
+"""
+
+class StageTimings:
+    """Wall-clock time per stage of a bulk load, for performance logging."""
+
+    def __init__(self):
+        self.stages: dict = {} # stage name -> ms
+        self._start = time.perf_counter_ns()
+
+    def lap(self, stage):
+        """Record the time since the previous lap as the duration of a stage."""
+        now = time.perf_counter_ns()
+        self.stages[stage] = (now - self._start) / 1000000
+        self._start = now
+
+async def load_election_into_db(payload: NewElectionData):
     """Load a newly received election + election related data.
 
-    Writes election with its candidates, and voters to the database.
-    "Candidate runs in election" relationships are also created.
+    Writes election with its candidates, and voters to the database in a single transaction.
+    "Candidate runs in election" relationships are also created. Voters are streamed in with COPY,
+    candidates (a handful per election) with executemany.
     Args:
         payload (NewElectionData): Pydantic model containing election info,
             participating candidates, and voters.
+    Returns:
+        dict: Duration of each stage in ms.
     """
     eid = payload.election.id
+    timings = StageTimings()
 
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
             # Insert NewElection
-            cur.execute(
+            await cur.execute(
                 SQL_INSERT_ELECTION,
                 (eid, payload.election.name, payload.election.start, payload.election.end),
             )
             # Insert Candidates + relation
-            for c in payload.candidates:
-                cur.execute(SQL_INSERT_CANDIDATE, (c.id, c.name))
-                cur.execute(SQL_LINK_CANDIDATE_RUNS, (c.id, eid))
+            await cur.executemany(SQL_INSERT_CANDIDATE, [(c.id, c.name) for c in payload.candidates])
+            await cur.executemany(SQL_LINK_CANDIDATE_RUNS, [(c.id, eid) for c in payload.candidates])
+            timings.lap("election and candidates")
+
             # Insert Voters + relation (no keys yet)
-            for v in payload.voters:
-                cur.execute(SQL_INSERT_VOTER, (v.id, v.name))
+            await cur.execute(SQL_CREATE_VOTER_STAGING)
+            async with cur.copy("COPY VoterStaging (ID, Name) FROM STDIN") as copy:
+                for v in payload.voters:
+                    await copy.write_row((v.id, v.name))
+            await cur.execute(SQL_INSERT_STAGED_VOTERS)
+            timings.lap("voters")
+
+            # Encrypted running tally starts as an empty sum for every candidate.
+            await cur.execute(SQL_INIT_ENCRYPTED_AGGREGATE, (eid, eid))
+            await cur.execute("INSERT INTO MerkleHeads (ElectionID) VALUES (%s) ON CONFLICT (ElectionID) DO NOTHING", (eid,))
+            await create_election_partitions(cur, eid)
+            timings.lap("aggregate, merkle log and partitions")
+
+    timings.lap("commit")
+    return timings.stages
+
+def partition_name(table, election_id):
+    """Name of the partition of a ballot table holding one election, e.g. ``ballots_e1``."""
+    return f"{table}_e{election_id}"
+
+async def create_election_partitions(cur, election_id):
+    """Create the partitions of the ballot tables for an election, if they do not exist yet.
+    Args:
+        cur: Open psycopg cursor.
+        election_id: Id of the election.
+    """
+    for table in PARTITIONED_BALLOT_TABLES:
+        await cur.execute(
+            sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES IN ({})").format(
+                sql.Identifier(partition_name(table, election_id)), sql.Identifier(table), sql.Literal(election_id)
+            )
+        )
+
+async def detach_election_partitions(election_id):
+    """Detach the partitions of the ballot tables for a finished election.
+
+    The detached partitions stay in the database as standalone tables (e.g. ``ballots_e1``), which can be
+    archived with ``pg_dump -t`` and dropped, without touching the ballots of other elections.
+    Their foreign keys are re-pointed from the partitioned "Ballots" table to the detached ``ballots_e<id>``,
+    so the detached tables stay consistent with each other.
+    Args:
+        election_id: Id of the election.
+    """
+    ballots_partition = partition_name("ballots", election_id)
+
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            for table in reversed(PARTITIONED_BALLOT_TABLES):
+                partition = partition_name(table, election_id)
+                await cur.execute(
+                    sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(sql.Identifier(table), sql.Identifier(partition))
+                )
+                if table == "ballots":
+                    continue
+
+                # The referencing columns are read from the catalog, e.g. (ElectionID, LastBallotID) for "VoterBallotHead".
+                await cur.execute("""
+                            SELECT c.conname, array_agg(a.attname ORDER BY k.position)
+                            FROM pg_constraint c
+                            CROSS JOIN unnest(c.conkey) WITH ORDINALITY AS k(attnum, position)
+                            JOIN pg_attribute a
+                            ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                            WHERE c.conrelid = %s::regclass AND c.confrelid = 'ballots'::regclass AND c.contype = 'f'
+                            GROUP BY c.conname;
+                            """, (partition,))
+                for constraint_name, columns in await cur.fetchall():
+                    await cur.execute(
+                        sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(sql.Identifier(partition), sql.Identifier(constraint_name))
+                    )
+                    await cur.execute(
+                        sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} FOREIGN KEY ({}) REFERENCES {} ({}, {})").format(
+                            sql.Identifier(partition),
+                            sql.Identifier(constraint_name),
+                            sql.SQL(", ").join(sql.Identifier(column) for column in columns),
+                            sql.Identifier(ballots_partition),
+                            sql.Identifier("electionid"),
+                            sql.Identifier("id"),
+                        )
+                    )
 
 
-def load_ballot_into_db(pyBallot: Ballot):
+async def load_ballot_into_db(pyBallot: Ballot, ballot_hash=None):
     """Loads a ballot and the ballots relations to the DB.
 
-    The ballot ciphertexts, proof and hash are stored in the "Ballots" table,
+    The ballot ciphertexts and hash are stored in the "Ballots" table, the proof in "BallotProofs",
     and the relationship between voter, election, and ballot is stored
     in the "VoterCastsBallot" relation. The corresponding image filename related to the ballot is stored
-    in the "Images" table.
+    in the "Images" table. The voter's row in "VoterBallotHead" is advanced in the same transaction.
     Args:
         pyBallot (Ballot): Pydantic model representing a ballot.
+        ballot_hash (str, optional): Hash of the ballot, if already computed and checked.
+    Returns:
+        int: Id of the stored ballot.
     """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            (ballot_id,) = await insert_ballots(cur, [pyBallot], [ballot_hash])
 
-    election_id = pyBallot.electionid
-    ctv = json.dumps(pyBallot.ctv) # json string of base64 encoding
-    ctlv = json.dumps(pyBallot.ctlv)
-    ctlid = json.dumps(pyBallot.ctlid)
-    proof = base64.b64decode(pyBallot.proof)
-    
-    hashed_ballot = hash_ballot(pyBallot) 
-    timestamp = pyBallot.timestamp
+    return ballot_id
 
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            
-            cur.execute(
-                SQL_INSERT_BALLOT,
-                (ctv, ctlv, ctlid, proof, hashed_ballot),
-            )
-            ballot_id = cur.fetchone()[0]
 
-            cur.execute(
-                SQL_INSERT_RELATION_VOTERCASTBALLOT,
-                (ballot_id, pyBallot.voterid, election_id, timestamp)
-            )
-            cur.execute(
-                SQL_INSERT_IMAGES,
-                (pyBallot.imagepath, ballot_id)
-            )
+async def load_ballots_into_db(ballots: list[Ballot], ballot_hashes=None):
+    """Loads a batch of ballots and their relations to the DB in a single transaction.
 
-def save_elgamalparams(GROUP, GENERATOR, ORDER):
+    All ballots are first written with one multi-row insert per table. If that fails, the transaction
+    is rolled back and the batch is retried ballot by ballot in a second transaction, each ballot inside
+    its own savepoint, so a single bad ballot only rejects itself and the remaining ballots are still
+    committed together.
+    Args:
+        ballots (list[Ballot]): Pydantic models representing the ballots.
+        ballot_hashes (list[str | None], optional): Hash of each ballot, if already computed and checked.
+    Returns:
+        list[BallotReceipt]: Ballot id or error for each ballot, in the order they were received.
+    """
+    receipts: list[BallotReceipt] = []
+    if ballot_hashes is None:
+        ballot_hashes = [None] * len(ballots)
+
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            try:
+                async with conn.transaction(): # rolled back as a whole if the batch insert fails.
+                    ballot_ids = await insert_ballots(cur, ballots, ballot_hashes)
+                return [BallotReceipt(index=idx, ballotid=ballot_id) for idx, ballot_id in enumerate(ballot_ids)]
+            except Exception as e:
+                print(f"[BB] batch insert failed, retrying ballots individually: {e}")
+
+            async with conn.transaction(): # the ballots that can be stored are committed together.
+                for idx, (pyBallot, ballot_hash) in enumerate(zip(ballots, ballot_hashes)):
+                    try:
+                        async with conn.transaction(): # savepoint, rolled back on its own if the ballot fails.
+                            (ballot_id,) = await insert_ballots(cur, [pyBallot], [ballot_hash])
+                        receipts.append(BallotReceipt(index=idx, ballotid=ballot_id))
+                    except Exception as e:
+                        receipts.append(BallotReceipt(index=idx, error=str(e)))
+
+    return receipts
+
+
+async def insert_ballots(cur, ballots: list[Ballot], ballot_hashes=None):
+    """Insert ballots into "Ballots", "BallotProofs", "VoterCastsBallot" and "Images", advance "VoterBallotHead",
+    append to "VoterCBR", update "EncryptedAggregate", append the ballot hashes to the Merkle log and record the ballots
+    in the change feed using the given cursor.
+
+    Each table is written with a single executemany, and everything runs in pipeline mode, so statements are
+    only flushed to the server when a result (ballot ids, replaced ballots, locked rows) is needed.
+    Committing is left to the caller.
+
+    Inserting is idempotent: a ballot whose hash is already stored for the election (e.g. a retried post)
+    is not inserted again and has no side effects, its existing id is returned instead.
+    Args:
+        cur: Open psycopg cursor.
+        ballots (list[Ballot]): Pydantic models representing the ballots.
+        ballot_hashes (list[str | None], optional): Hash of each ballot, if already computed and checked by the
+            caller (see ``apiBB.check_ballot_hash``); missing hashes are computed and checked here.
+    Returns:
+        list[int]: Ids of the stored ballots, in the same order as ``ballots``.
+    Raises:
+        ValueError: If a ballot carries a hash that does not match its contents.
+    """
+    ballot_rows = []
+    for pyBallot, hashed_ballot in zip(ballots, ballot_hashes or [None] * len(ballots)):
+        ctv, ctlv, ctlid = deserialise_ballot_cts(pyBallot)
+        if hashed_ballot is None:
+            hashed_ballot = hash_ballot(pyBallot)
+            if pyBallot.hash is not None and pyBallot.hash != hashed_ballot:
+                raise ValueError(f"ballot hash {pyBallot.hash} does not match the ballot of voter {pyBallot.voterid}")
+        ballot_rows.append((pyBallot.electionid, ctv, ctlv, ctlid, hashed_ballot))
+
+    # In pipeline mode statements whose results are not needed right away share a round trip. Inserts without
+    # results go through write_cur, as psycopg cannot fetch an executemany's RETURNING rows on a cursor whose
+    # previous executemany returned nothing.
+    async with cur.connection.pipeline(), cur.connection.cursor() as write_cur:
+        await cur.executemany(SQL_INSERT_BALLOT, ballot_rows, returning=True)
+        ballot_ids = []
+        while True:
+            row = await cur.fetchone()
+            ballot_ids.append(row[0] if row else None) # None: already stored, or repeated within the batch.
+            if not cur.nextset():
+                break
+
+        if None in ballot_ids:
+            duplicates = [(election_id, ballot_hash) for (election_id, _, _, _, ballot_hash), ballot_id in zip(ballot_rows, ballot_ids) if ballot_id is None]
+            await cur.execute(SQL_SELECT_BALLOT_IDS_BY_HASH, ([e for e, _ in duplicates], [h for _, h in duplicates]))
+            stored_ids = {(election_id, ballot_hash): ballot_id for election_id, ballot_hash, ballot_id in await cur.fetchall()}
+            all_ids = [ballot_id if ballot_id is not None else stored_ids[(election_id, ballot_hash)]
+                       for (election_id, _, _, _, ballot_hash), ballot_id in zip(ballot_rows, ballot_ids)]
+
+            # Only the newly inserted ballots are added to the other tables.
+            new = [i for i, ballot_id in enumerate(ballot_ids) if ballot_id is not None]
+            if not new:
+                return all_ids
+            ballots = [ballots[i] for i in new]
+            ballot_rows = [ballot_rows[i] for i in new]
+            ballot_ids = [ballot_ids[i] for i in new]
+        else:
+            all_ids = ballot_ids
+
+        await write_cur.executemany(
+            SQL_INSERT_BALLOT_PROOF,
+            [(pyBallot.electionid, ballot_id, base64.b64decode(pyBallot.proof)) for ballot_id, pyBallot in zip(ballot_ids, ballots)]
+        )
+
+        await write_cur.executemany(
+            SQL_INSERT_RELATION_VOTERCASTBALLOT,
+            [(ballot_id, pyBallot.voterid, pyBallot.electionid, pyBallot.timestamp) for ballot_id, pyBallot in zip(ballot_ids, ballots)]
+        )
+        await write_cur.executemany(
+            SQL_INSERT_IMAGES,
+            [(pyBallot.electionid, pyBallot.imagepath, ballot_id) for ballot_id, pyBallot in zip(ballot_ids, ballots)]
+        )
+        # Head and CBR rows are locked in (election, voter) order, so concurrent batches touching the same voters
+        # cannot deadlock. The sort is stable: ballots of the same voter keep their order, and with it their CBR index.
+        voter_order = sorted(range(len(ballots)), key=lambda i: (ballots[i].electionid, ballots[i].voterid))
+        await cur.executemany(
+            SQL_ADVANCE_VOTER_BALLOT_HEAD,
+            [(ballots[i].electionid, ballots[i].voterid, ballot_ids[i]) for i in voter_order],
+            returning=True
+        )
+        replaced_ballot_ids, cbr_lengths = [None] * len(ballots), [None] * len(ballots)
+        for i in voter_order: # results come back in voter order, stored at the position of their ballot
+            replaced_ballot_ids[i], cbr_lengths[i] = await cur.fetchone()
+            cur.nextset()
+
+        # The new ballot is the last one on the voter's CBR, so its index is the new CBR length - 1.
+        await write_cur.executemany(
+            SQL_INSERT_VOTER_CBR,
+            [(ballots[i].electionid, ballots[i].voterid, cbr_lengths[i] - 1, ballots[i].imagepath, ballots[i].timestamp, ballot_ids[i])
+             for i in voter_order]
+        )
+
+        await update_encrypted_aggregates(cur, ballots, [ctv for _, ctv, _, _, _ in ballot_rows], replaced_ballot_ids)
+        leaf_indices = await append_merkle_leaves(cur, [(pyBallot.electionid, ballot_hash) for pyBallot, (_, _, _, _, ballot_hash) in zip(ballots, ballot_rows)])
+
+        await record_board_changes(cur, [
+            (pyBallot.electionid, "ballot", {
+                "voterid": pyBallot.voterid,
+                "ballotid": ballot_id,
+                "cbrindex": cbr_length - 1,
+                "imagefilename": pyBallot.imagepath,
+                "timestamp": pyBallot.timestamp.isoformat(),
+                "ballothash": ballot_hash,
+                "leafindex": leaf_index,
+            })
+            for pyBallot, ballot_id, cbr_length, (_, _, _, _, ballot_hash), leaf_index
+            in zip(ballots, ballot_ids, cbr_lengths, ballot_rows, leaf_indices)
+        ])
+
+        return all_ids
+
+async def update_encrypted_aggregates(cur, ballots: list[Ballot], ballot_ctvs, replaced_ballot_ids):
+    """Add the ctvs of new last ballots to "EncryptedAggregate" and subtract the ctvs of the ballots they replace.
+
+    The aggregate rows of an election are locked until the caller commits, so concurrent inserts
+    for the same election apply their changes one after the other. Elections are locked in id order.
+    Args:
+        cur: Open psycopg cursor.
+        ballots (list[Ballot]): The inserted ballots.
+        ballot_ctvs (list): ctv of each inserted ballot as stored in "Ballots".
+        replaced_ballot_ids (list): For each inserted ballot, the id of the voter's previous last ballot, or None for ballot0.
+    """
+    removed_ctvs = {} # (election id, ballot id) -> ctv
+    replaced = [(pyBallot.electionid, ballot_id) for pyBallot, ballot_id in zip(ballots, replaced_ballot_ids) if ballot_id is not None]
+    if replaced:
+        # Ballots are keyed by (ElectionID, ID): imported elections keep their ballot ids, which other elections may use too.
+        await cur.execute("""
+                    SELECT b.ElectionID, b.ID, b.CtCandidate
+                    FROM Ballots b
+                    JOIN unnest(%s::int[], %s::int[]) AS r(ElectionID, ID)
+                    ON b.ElectionID = r.ElectionID AND b.ID = r.ID
+                    WHERE b.ElectionID = ANY(%s) -- prunes the partitions scanned
+                    """, ([election_id for election_id, _ in replaced], [ballot_id for _, ballot_id in replaced],
+                          list({election_id for election_id, _ in replaced})))
+        removed_ctvs = {(election_id, ballot_id): ctv for election_id, ballot_id, ctv in await cur.fetchall()}
+
+    await cur.execute("SELECT GroupCurve FROM GlobalInfo WHERE ID = 0")
+    (group_curve,) = await cur.fetchone()
+    GROUP = group_for(group_curve)
+
+    changes = {} # election id -> (added ctvs, removed ctvs)
+    for pyBallot, ctv, replaced_id in zip(ballots, ballot_ctvs, replaced_ballot_ids):
+        added, removed = changes.setdefault(pyBallot.electionid, ([], []))
+        added.append(ctv)
+        if replaced_id is not None:
+            removed.append(removed_ctvs[(pyBallot.electionid, replaced_id)])
+
+    for election_id in sorted(changes):
+        added, removed = changes[election_id]
+        await cur.execute(SQL_LOCK_ENCRYPTED_AGGREGATE, (election_id,))
+        aggregate = [[c0, c1] for c0, c1 in await cur.fetchall()] or zero_aggregate(len(added[0]))
+
+        aggregate = update_aggregate(GROUP, aggregate, added, removed)
+        await cur.executemany(
+            SQL_UPSERT_ENCRYPTED_AGGREGATE,
+            [(election_id, i, c0, c1) for i, (c0, c1) in enumerate(aggregate)]
+        )
+
+async def rebuild_encrypted_aggregate(election_id):
+    """Recompute "EncryptedAggregate" for an election from the last ballot of every voter.
+    Used for elections that already had ballots before the aggregate was maintained on insert.
+    The aggregate rows stay locked while rebuilding, so ballots inserted meanwhile are applied afterwards.
+    Args:
+        election_id: Id of the election.
+    """
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute(SQL_INIT_ENCRYPTED_AGGREGATE, (election_id, election_id))
+                await cur.execute(SQL_LOCK_ENCRYPTED_AGGREGATE, (election_id,))
+                aggregate = zero_aggregate(len(await cur.fetchall()))
+
+                await cur.execute("SELECT GroupCurve FROM GlobalInfo WHERE ID = 0")
+                (group_curve,) = await cur.fetchone()
+                GROUP = group_for(group_curve)
+
+            async with conn.cursor(name="rebuild_encrypted_aggregate") as cur: # named cursor is kept server-side.
+                await cur.execute("""
+                            SELECT CtCandidate
+                            FROM VoterBallotHead h
+                            JOIN Ballots b
+                            ON b.ElectionID = h.ElectionID AND b.ID = h.LastBallotID
+                            WHERE h.ElectionID = %s;
+                            """, (election_id,))
+                while rows := await cur.fetchmany(STREAM_BATCH_SIZE):
+                    aggregate = update_aggregate(GROUP, aggregate, [ctv for (ctv,) in rows], [])
+
+            async with conn.cursor() as cur:
+                await cur.executemany(
+                    SQL_UPSERT_ENCRYPTED_AGGREGATE,
+                    [(election_id, i, c0, c1) for i, (c0, c1) in enumerate(aggregate)]
+                )
+
+async def append_merkle_leaves(cur, election_ballot_hashes):
+    """Append ballot hashes to the Merkle logs of their elections.
+
+    Only the O(log n) roots of the current perfect subtrees are read; the new leaves and the interior
+    nodes they complete are inserted with one executemany. The head row of each election stays locked
+    until the caller commits. Elections are locked in id order, after "EncryptedAggregate".
+    Args:
+        cur: Open psycopg cursor.
+        election_ballot_hashes (list): ``(election id, ballot hash)`` pairs, in the order they are appended.
+    Returns:
+        list[int]: Leaf index of each ballot hash in its election's log.
+    """
+    leaves = {} # election id -> leaf hashes
+    leaf_indices = []
+    for election_id, ballot_hash in election_ballot_hashes:
+        election_leaves = leaves.setdefault(election_id, [])
+        leaf_indices.append((election_id, len(election_leaves)))
+        election_leaves.append(merkleBB.leaf_hash(ballot_hash))
+
+    tree_sizes = {} # election id -> size before appending
+
+    for election_id in sorted(leaves):
+        await cur.execute(SQL_LOCK_MERKLE_HEAD, (election_id,))
+        (tree_size,) = await cur.fetchone()
+        tree_sizes[election_id] = tree_size
+        frontier_nodes = await fetch_merkle_nodes(cur, election_id, merkleBB.frontier(tree_size))
+
+        new_nodes = merkleBB.append_leaves(tree_size, frontier_nodes, leaves[election_id])
+        await cur.executemany(
+            SQL_INSERT_MERKLE_NODE,
+            [(election_id, level, index, node) for level, index, node in new_nodes]
+        )
+        await cur.execute(
+            "UPDATE MerkleHeads SET TreeSize = %s WHERE ElectionID = %s",
+            (tree_size + len(leaves[election_id]), election_id)
+        )
+
+    return [tree_sizes[election_id] + offset for election_id, offset in leaf_indices]
+
+async def record_board_changes(cur, changes):
+    """Record changes in the change feed and notify listeners of the affected elections on commit.
+
+    The MerkleHeads row of each election is locked first (inserting ballots already holds it),
+    so change ids within an election are assigned in commit order.
+    Args:
+        cur: Open psycopg cursor.
+        changes (list): ``(election id, kind, payload dict)`` per change, in order.
+    """
+    election_ids = sorted({election_id for election_id, _, _ in changes})
+    await cur.execute(
+        "SELECT ElectionID FROM MerkleHeads WHERE ElectionID = ANY(%s) ORDER BY ElectionID FOR UPDATE",
+        (election_ids,)
+    )
+
+    await cur.executemany(
+        SQL_INSERT_BOARD_CHANGE,
+        [(election_id, kind, Jsonb(payload)) for election_id, kind, payload in changes]
+    )
+    for election_id in election_ids:
+        await cur.execute("SELECT pg_notify(%s, %s)", (CHANGES_CHANNEL, str(election_id)))
+
+async def fetch_merkle_nodes(cur, election_id, keys):
+    """Fetch stored Merkle nodes of an election.
+    Args:
+        cur: Open psycopg cursor.
+        election_id: Id of the election.
+        keys (list[tuple[int, int]]): ``(level, index)`` of the nodes.
+    Returns:
+        dict: ``(level, index) -> hash`` for the nodes found.
+    """
+    if not keys:
+        return {}
+
+    await cur.execute("""
+                SELECT Level, NodeIndex, Hash
+                FROM MerkleNodes
+                WHERE ElectionID = %s
+                AND (Level, NodeIndex) IN (SELECT * FROM unnest(%s::smallint[], %s::int[]));
+                """, (election_id, [level for level, _ in keys], [index for _, index in keys]))
+
+    return {(level, index): node for level, index, node in await cur.fetchall()}
+
+async def rebuild_merkle_log(election_id):
+    """Rebuild the Merkle log of an election from its stored ballots, appended in ballot id order.
+    Used for elections that already had ballots before the log was maintained on insert.
+    The head row stays locked while rebuilding, so ballots inserted meanwhile are appended afterwards.
+    Args:
+        election_id: Id of the election.
+    """
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute(SQL_LOCK_MERKLE_HEAD, (election_id,))
+                await cur.execute("DELETE FROM MerkleNodes WHERE ElectionID = %s", (election_id,))
+                await cur.execute("UPDATE MerkleHeads SET TreeSize = 0 WHERE ElectionID = %s", (election_id,))
+
+            async with conn.cursor(name="rebuild_merkle_log") as read_cur: # named cursor is kept server-side.
+                await read_cur.execute("""
+                            SELECT BallotHash
+                            FROM Ballots
+                            WHERE ElectionID = %s
+                            ORDER BY ID;
+                            """, (election_id,))
+                async with conn.cursor() as cur:
+                    while rows := await read_cur.fetchmany(STREAM_BATCH_SIZE):
+                        await append_merkle_leaves(cur, [(election_id, ballot_hash) for (ballot_hash,) in rows])
+
+# Helper function for storing ct_bar values.
+def deserialise_ballot_cts(pyBallot: Ballot):
+    """Decode the base64 ciphertexts of a ballot to the raw EC points stored in "Ballots".
+    Returns:
+        tuple: (ctv, ctlv, ctlid) as lists of bytes, ctv holding one [c0, c1] pair per candidate.
+    """
+    ctv = [[base64.b64decode(c0), base64.b64decode(c1)] for c0, c1 in pyBallot.ctv]
+    ctlv = [base64.b64decode(c) for c in pyBallot.ctlv]
+    ctlid = [base64.b64decode(c) for c in pyBallot.ctlid]
+    return ctv, ctlv, ctlid
+
+async def save_elgamalparams(GROUP, GENERATOR, ORDER):
     """Load elgamal group parameters to the database for an election after receiving them from RA.
     Args:
         GROUP: Description or id of the group/curve.
         GENERATOR (bytes): Group generator in binary form.
         ORDER (bytes): Group order in binary form.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         UPDATE GlobalInfo
                         SET GroupCurve = %s, Generator = %s, OrderP = %s
                         WHERE ID = 0
                         """, (GROUP, GENERATOR, ORDER))
 
 
-def save_key_to_db(service, KEY):
+async def save_key_to_db(service, KEY):
     """Load the public key of TS or VS to the DB.
     Args:
         service (str): Service id, values are "TS" or "VS".
@@ -158,54 +689,66 @@ def save_key_to_db(service, KEY):
     elif service == "VS":
         column = "PublicKeyVotingServer"
         
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(f"""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(f"""
                         UPDATE GlobalInfo
                         SET {column} = %s
                         WHERE ID = 0
                         """, (KEY,))
 
 
-def save_voter_keys_to_db(voter_key_list: VoterKeyList):
+async def save_voter_keys_to_db(voter_key_list: VoterKeyList):
     """Load public key material for each voter in an election to DB.
+    The keys are streamed in with a single COPY, in one transaction.
     Args:
         voter_key_list (VoterKeyList): List of voter keys containing
             election id, voter id, and Base64-encoded public keys.
+    Returns:
+        dict: Duration of each stage in ms.
     """
     voter_keys : list = voter_key_list.voterkeylist
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            for voter_key in voter_keys:
-                cur.execute("""
-                            INSERT INTO VoterParticipatesInElection (ElectionID, VoterID, PublicKey)
-                            VALUES (%s, %s, %s)
-                            """, (voter_key.electionid, voter_key.voterid, base64.b64decode(voter_key.publickey))) # Decode base64 to retrieve byte object
+    timings = StageTimings()
+
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            async with cur.copy("COPY VoterParticipatesInElection (ElectionID, VoterID, PublicKey) FROM STDIN") as copy:
+                for voter_key in voter_keys:
+                    await copy.write_row((voter_key.electionid, voter_key.voterid, base64.b64decode(voter_key.publickey))) # Decode base64 to retrieve byte object
+            timings.lap("voter keys")
+
+    timings.lap("commit")
+    return timings.stages
 
 
-def save_election_result(election_result: ElectionResult):
+async def save_election_result(election_result: ElectionResult):
     """Load tally results and proofs for an election.
     For each candidate in the election, the final vote count and tally proof are saved in the
-    "CandidateRunsInElection" table.
+    "CandidateRunsInElection" table. All candidates are written in one transaction, together with the change feed entry.
     Args:
         election_result (ElectionResult): Pydantic model containing result an proof for each specific candidate in election.
+    Returns:
+        dict: Duration of each stage in ms.
     """
     election_id = election_result.electionid
-    
-    # Looping through all candidates to store the votecount and the proof for each candidate individually.
-    for candidate in election_result.result:
-        candidate_id = candidate.candidateid
-        vote_count = candidate.votes
-        proof_bin = base64.b64decode(candidate.proof)  # decoding proof to store as binary
-    
-        with pool.connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                            UPDATE CandidateRunsInElection
-                            SET Result = %s, Tallyproof = %s
-                            WHERE (ElectionID = %s AND CandidateID = %s)
-                            """, (vote_count, proof_bin, election_id, candidate_id) 
-                            )
+    timings = StageTimings()
+
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.executemany("""
+                        UPDATE CandidateRunsInElection
+                        SET Result = %s, Tallyproof = %s
+                        WHERE (ElectionID = %s AND CandidateID = %s)
+                        """, [(candidate.votes, base64.b64decode(candidate.proof), election_id, candidate.candidateid) # decoding proof to store as binary
+                              for candidate in election_result.result]
+                        )
+            timings.lap("candidate results")
+
+            await record_board_changes(cur, [(election_id, "result", {})])
+            timings.lap("change feed")
+
+    timings.lap("commit")
+    return timings.stages
 
 ## ---------------- READING FROM DB ---------------- ##
 #Calls to fetch/read from DB
@@ -215,88 +758,126 @@ async def fetch_params():
     Returns:
         (GROUP, GENERATOR, ORDER) where GENERATOR and ORDER are bytes.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT GroupCurve, Generator, OrderP
                         FROM GlobalInfo
                         WHERE ID = 0
                     """)
-            (GROUP, GENERATOR, ORDER) = cur.fetchone()
+            (GROUP, GENERATOR, ORDER) = await cur.fetchone()
     return GROUP, GENERATOR, ORDER
 
-def fetch_voters_for_election(election_id):
-    """Fetch all voters participating in a given election.
+async def fetch_voters_for_election(election_id, after_id=None, limit=None):
+    """Fetch a page of the voters participating in a given election, ordered by id.
     Args:
         election_id: Id of the election.
+        after_id (int | None): Only return voters with a higher id (keyset cursor), None to start at the first voter.
+        limit (int | None): Maximum number of voters to return, None for all.
     Returns:
         list[tuple]: List of (id and name) for voters.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT v.ID, v.Name
-                        FROM Voters v
-                        Join VoterParticipatesInElection ve on v.ID = ve.VoterID
-                        WHERE ve.ElectionID = %s;"""
-                        ,(election_id,))
-            records = cur.fetchall()
+                        FROM VoterParticipatesInElection ve
+                        JOIN Voters v on v.ID = ve.VoterID
+                        WHERE ve.ElectionID = %s AND (%s::int IS NULL OR ve.VoterID > %s)
+                        ORDER BY ve.VoterID
+                        LIMIT %s;"""
+                        ,(election_id, after_id, after_id, limit))
+            records = await cur.fetchall()
     return records
 
-def fetch_candidates_for_election(election_id): # Should cursor be given as parameter?
-    """Fetch all candidates running in a given election.
+async def fetch_voter_count(election_id):
+    """Count the voters participating in a given election.
+    Args:
+        election_id: Id of the election.
+    Returns:
+        int: Number of voters.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT COUNT(*) FROM VoterParticipatesInElection WHERE ElectionID = %s", (election_id,))
+            (voter_count,) = await cur.fetchone()
+    return voter_count
+
+async def fetch_voter_eligible(voter_id, election_id):
+    """Check whether a voter participates in a given election, with a primary key lookup.
+    Args:
+        voter_id: Id of the voter.
+        election_id: Id of the election.
+    Returns:
+        bool: True if the voter is eligible to vote in the election.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT 1 FROM VoterParticipatesInElection WHERE VoterID = %s AND ElectionID = %s",
+                (voter_id, election_id)
+            )
+            return await cur.fetchone() is not None
+
+async def fetch_candidates_for_election(election_id, after_id=None, limit=None): # Should cursor be given as parameter?
+    """Fetch a page of the candidates running in a given election, ordered by id.
+    The id order is also the order of the candidates in the ballot ctv.
     Args:
         election_id: Id of the election.
+        after_id (int | None): Only return candidates with a higher id (keyset cursor), None to start at the first candidate.
+        limit (int | None): Maximum number of candidates to return, None for all.
     Returns:
         list[tuple]: List of (id and name) for candidates.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT c.ID, c.Name
                         FROM Candidates c
                         JOIN CandidateRunsInElection cr on c.ID = cr.CandidateID
-                        WHERE cr.ElectionID = %s;""",
-                        (election_id,)
+                        WHERE cr.ElectionID = %s AND (%s::int IS NULL OR c.ID > %s)
+                        ORDER BY c.ID
+                        LIMIT %s;""",
+                        (election_id, after_id, after_id, limit)
                         )
             # Retrieve query results
-            records = cur.fetchall()
+            records = await cur.fetchall()
     return records
 
-def fetch_election_dates(election_id):
+async def fetch_election_dates(election_id):
     """Fetch election start and end dates from DB.
     Args:
         election_id: Id of the election.
     Returns:
         (ElectionStart, ElectionEnd) as datetime objects.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT ElectionStart, ElectionEnd
                         FROM Elections
                         WHERE ID = %s
                         """, (election_id,))
-            election_startdate, election_enddate = cur.fetchone()
+            election_startdate, election_enddate = await cur.fetchone()
     return election_startdate, election_enddate
 
-def fetch_public_keys_tsvs():
+async def fetch_public_keys_tsvs():
     """Fetch public keys for the Tallying Server and Voting Server.
     Returns:
         tuple: (public_key_ts_bin, public_key_vs_bin) as binary.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT PublicKeyTallyingServer, PublicKeyVotingServer
                         FROM GlobalInfo
                         WHERE ID = 0
                         """)
-            public_key_ts_bin, public_key_vs_bin = cur.fetchone()
+            public_key_ts_bin, public_key_vs_bin = await cur.fetchone()
 
     return public_key_ts_bin, public_key_vs_bin
 
-def fetch_voter_public_key(voter_id, election_id):
+async def fetch_voter_public_key(voter_id, election_id):
     """Fetch public key of a specific voter in a given election.
     Args:
         voter_id: Id of the voter.
@@ -304,161 +885,348 @@ def fetch_voter_public_key(voter_id, election_id):
     Returns:
         Public key in binary format.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT PublicKey
                         FROM VoterParticipatesInElection
                         WHERE VoterID = %s AND ElectionID = %s;
                         """, (voter_id, election_id))
-            (upk,) = cur.fetchone()
+            (upk,) = await cur.fetchone()
             
     return upk
 
-def fetch_last_and_previouslast_ballot(voter_id, election_id):
+async def fetch_last_and_previouslast_ballot(voter_id, election_id):
     """Fetch the last and previous last ballots for a voter in an election.
     Args:
         voter_id: Id of the voter.
         election_id: Id of the election.
     Returns:
         tuple: (last_ballot_b64, previous_last_ballot_b64) where each ballot is
-            represented as a tuple of base64-encoded ciphertexts and proof.
+            represented as a tuple of base64-encoded ciphertexts and an empty proof,
+            as proofs are only read when verifying ballots.
             Second element is None if only one ballot exists.
     """
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                        SELECT CtCandidate, CtVoterList, CtVotingServerList, Proof
-                        FROM VoterParticipatesInElection p
-                        JOIN VoterCastsBallot c 
-                        ON p.ElectionID = c.ElectionID AND p.VoterID = c.VoterID
-                        JOIN Ballots b
-                        ON b.ID = c.BallotID
-                        WHERE p.ElectionID = %s AND p.VoterID = %s
-                        ORDER BY c.VoteTimestamp DESC
-                        LIMIT 2;
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                        SELECT l.CtCandidate, l.CtVoterList, l.CtVotingServerList,
+                               pl.CtCandidate, pl.CtVoterList, pl.CtVotingServerList
+                        FROM VoterBallotHead h
+                        JOIN Ballots l
+                        ON l.ElectionID = h.ElectionID AND l.ID = h.LastBallotID
+                        LEFT JOIN Ballots pl
+                        ON pl.ElectionID = h.ElectionID AND pl.ID = h.PreviousLastBallotID
+                        WHERE h.ElectionID = %s AND h.VoterID = %s;
                         """, (election_id, voter_id))
-            rows = cur.fetchall()
+            row = await cur.fetchone()
 
-    # In case only one row is in the database (ballot0):
-    if len(rows) == 1:
-        last_ballot_b64 = serialise_ballot_cts(rows[0])
+    last_ballot_b64 = serialise_ballot_cts(row[0:3])
+
+    # In case only one ballot is in the database (ballot0):
+    if row[3] is None:
         return last_ballot_b64, None
 
-    last_ballot_b64 = serialise_ballot_cts(rows[0])
-    previous_last_ballot_b64 = serialise_ballot_cts(rows[1])
+    previous_last_ballot_b64 = serialise_ballot_cts(row[3:6])
 
     return last_ballot_b64, previous_last_ballot_b64
 
 # Helper function for sending ct_bar values.
 def serialise_ballot_cts(ballot_ct):
-    ct_v_b64 = ballot_ct[0]
-    ct_lv_b64 = ballot_ct[1]
-    ct_lid_b64 = ballot_ct[2]
+    """Encode stored ciphertexts, and the proof if it was read, as base64 for transfer.
+    Args:
+        ballot_ct (tuple): (CtCandidate, CtVoterList, CtVotingServerList[, Proof]) as read from the DB.
+    Returns:
+        tuple: (ct_v_b64, ct_lv_b64, ct_lid_b64, proof_b64) where proof_b64 is empty if no proof was read.
+    """
+    ct_v_b64 = [[base64.b64encode(c0).decode(), base64.b64encode(c1).decode()] for c0, c1 in ballot_ct[0]]
+    ct_lv_b64 = [base64.b64encode(c).decode() for c in ballot_ct[1]]
+    ct_lid_b64 = [base64.b64encode(c).decode() for c in ballot_ct[2]]
     
     # base64 encoding NIZK proof:
-    proof_b64 = base64.b64encode(ballot_ct[3]).decode()
+    proof_b64 = base64.b64encode(ballot_ct[3]).decode() if len(ballot_ct) > 3 else ""
     return (ct_v_b64, ct_lv_b64, ct_lid_b64, proof_b64)
 
-def fetch_cbr_length(voter_id, election_id):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                        SELECT COUNT(*)
-                        FROM VoterParticipatesInElection p
-                        JOIN VoterCastsBallot c 
-                        ON p.ElectionID = c.ElectionID AND p.VoterID = c.VoterID
-                        WHERE p.ElectionID = %s AND p.VoterID = %s
+async def fetch_cbr_length(voter_id, election_id):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                        SELECT CBRLength
+                        FROM VoterBallotHead
+                        WHERE ElectionID = %s AND VoterID = %s
                         """, (election_id, voter_id))
-            (cbr_length,) = cur.fetchone()  # fetchone returns a tuple like (count,)
+            row = await cur.fetchone()
+
+    # No head row means no ballots have been posted for the voter yet.
+    cbr_length = row[0] if row else 0
     return cbr_length
 
 # Fetches the CBR for a given voter in a given election sorted by oldest votes at the top.
-def fetch_cbr_for_voter_in_election(voter_id, election_id):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                        SELECT ImageFilename, c.VoteTimestamp
-                        FROM VoterParticipatesInElection p
-                        JOIN VoterCastsBallot c 
-                        ON p.ElectionID = c.ElectionID AND p.VoterID = c.VoterID
-                        JOIN Ballots b
-                        ON b.ID = c.BallotID
-                        JOIN Images i 
-                        ON i.BallotID = b.ID
-                        WHERE p.ElectionID = %s AND p.VoterID = %s
-                        ORDER BY c.VoteTimestamp ASC;
-                        """, (election_id, voter_id))
-            cbr = cur.fetchall()
+async def fetch_cbr_for_voter_in_election(voter_id, election_id, after_index=None, limit=None):
+    """Fetch index, image and timestamp of the ballots on a voter's CBR from "VoterCBR".
+    Args:
+        voter_id: Id of the voter.
+        election_id: Id of the election.
+        after_index: Optional keyset cursor; only ballots with a higher CBR index are returned.
+        limit: Optional maximum number of ballots to return.
+    Returns:
+        IndexImageCBR: CBR entries ordered by CBR index.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                        SELECT CBRIndex, ImageFilename, VoteTimestamp
+                        FROM VoterCBR
+                        WHERE ElectionID = %s AND VoterID = %s AND CBRIndex > %s
+                        ORDER BY CBRIndex ASC
+                        LIMIT %s;
+                        """, (election_id, voter_id, -1 if after_index is None else after_index, limit))
+            cbr = await cur.fetchall()
 
     cbr_images = [
-        IndexImage(cbrindex=idx, image=row[0], timestamp = row[1])
-        for idx, row in enumerate(cbr)
+        IndexImage(cbrindex=row[0], image=row[1], timestamp = row[2])
+        for row in cbr
     ]
 
     return IndexImageCBR(cbrimages=cbr_images)
 
-def fetch_ballot_hashes(election_id):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+async def fetch_ballot_hashes(election_id):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT BallotHash
                         FROM Ballots
-                        Join VoterCastsBallot vcb on vcb.BallotID = Ballots.ID
-                        WHERE vcb.ElectionID = %s;"""
+                        WHERE ElectionID = %s;"""
                         ,(election_id,))
-            ballot_hashes = cur.fetchall() # returns a list of tuples
+            ballot_hashes = await cur.fetchall() # returns a list of tuples
 
     # Extracts the first element of each tuple
     ballothash_list = [row[0] for row in ballot_hashes]
     
     return ballothash_list
 
+async def fetch_existing_ballot_hashes(election_id, ballot_hashes):
+    """Look up which of the given ballot hashes are already on the BB for an election.
+
+    Uses the unique index on (ElectionID, BallotHash), so the cost depends on the number of
+    hashes looked up and not on the size of the board.
+    Args:
+        election_id: Id of the election.
+        ballot_hashes (list[str]): Ballot hashes to look up.
+    Returns:
+        set[str]: The subset of ``ballot_hashes`` that already exist.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                        SELECT BallotHash
+                        FROM Ballots
+                        WHERE BallotHash = ANY(%s) AND ElectionID = %s;"""
+                        ,(ballot_hashes, election_id))
+            rows = await cur.fetchall()
+
+    return {row[0] for row in rows}
+
 # Fetch image filename for specific ballot
-def fetch_imageFilename_for_ballot(cur, ballot_id):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+async def fetch_imageFilename_for_ballot(cur, ballot_id):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT ImageFilename
                         FROM Images 
                         WHERE BallotID = %s
                         """, (ballot_id,))
-            records = cur.fetchall()
+            records = await cur.fetchall()
     return records
 
-def fetch_last_ballot_ctvs(election_id):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                        SELECT DISTINCT ON (p.VoterID)
-                            CtCandidate
-                        FROM VoterParticipatesInElection p
-                        JOIN VoterCastsBallot c 
-                        ON p.ElectionID = c.ElectionID AND p.VoterID = c.VoterID
+async def fetch_last_ballot_ctvs(election_id):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                        SELECT CtCandidate
+                        FROM VoterBallotHead h
                         JOIN Ballots b
-                        ON b.ID = c.BallotID
-                        WHERE p.ElectionID = %s
-                        ORDER BY p.VoterID, c.VoteTimestamp DESC;
+                        ON b.ElectionID = h.ElectionID AND b.ID = h.LastBallotID
+                        WHERE h.ElectionID = %s
+                        ORDER BY h.VoterID;
                         """, (election_id,))
-            rows = cur.fetchall() 
+            rows = await cur.fetchall() 
 
-    # to only keep the first element, ctv, of each returned tuple as each tuple is returned as (ctv, )
-    last_ballot_ctvs_json  = [row[0] for row in rows] 
+    # to only keep the first element, ctv, of each returned tuple as each tuple is returned as (ctv, ), encoded as base64 for transfer.
+    last_ballot_ctvs_b64 = [[[base64.b64encode(c0).decode(), base64.b64encode(c1).decode()] for c0, c1 in row[0]] for row in rows]
     
-    return last_ballot_ctvs_json
+    return last_ballot_ctvs_b64
+
+async def stream_last_ballot_ctvs(election_id):
+    """Stream the last ballot ciphertexts for candidate choice (CTVs) for every voter in an election.
+
+    Rows are read through a server-side cursor in batches of ``STREAM_BATCH_SIZE``, so
+    memory use does not grow with the size of the electorate.
+    Args:
+        election_id: Id of the election.
+    Yields:
+        tuple: (voter_id, ctv_b64) where ctv_b64 holds one base64-encoded [c0, c1] pair per candidate.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor(name="last_ballot_ctvs") as cur: # named cursor is kept server-side.
+            cur.itersize = STREAM_BATCH_SIZE
+            await cur.execute("""
+                        SELECT h.VoterID, CtCandidate
+                        FROM VoterBallotHead h
+                        JOIN Ballots b
+                        ON b.ElectionID = h.ElectionID AND b.ID = h.LastBallotID
+                        WHERE h.ElectionID = %s
+                        ORDER BY h.VoterID;
+                        """, (election_id,))
+            async for voter_id, ctv in cur:
+                yield voter_id, [[base64.b64encode(c0).decode(), base64.b64encode(c1).decode()] for c0, c1 in ctv]
+
+async def fetch_encrypted_aggregate(election_id):
+    """Fetch the per-candidate sum of the last ballot ctvs of all voters in an election.
+    Args:
+        election_id: Id of the election.
+    Returns:
+        list: One base64-encoded [c0, c1] pair per candidate, in ballot ctv order.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            return await read_encrypted_aggregate(cur, election_id)
+
+async def read_encrypted_aggregate(cur, election_id):
+    """Fetch the encrypted aggregate of an election (see ``fetch_encrypted_aggregate``) using the given cursor.
+    Args:
+        cur: Open psycopg cursor.
+        election_id: Id of the election.
+    Returns:
+        list: One base64-encoded [c0, c1] pair per candidate, in ballot ctv order.
+    """
+    await cur.execute("""
+                SELECT C0, C1
+                FROM EncryptedAggregate
+                WHERE ElectionID = %s
+                ORDER BY CandidateIndex;
+                """, (election_id,))
+    rows = await cur.fetchall()
+
+    return [[base64.b64encode(c0).decode(), base64.b64encode(c1).decode()] for c0, c1 in rows]
+
+async def fetch_merkle_tree_size(cur, election_id, tree_size=None):
+    """Fetch the current size of an election's Merkle log and check a requested size against it.
+    Args:
+        cur: Open psycopg cursor.
+        election_id: Id of the election.
+        tree_size (int | None): Requested tree size, defaults to the current size.
+    Returns:
+        int | None: The tree size to use, or ``None`` if the election has no log or the requested size exceeds it.
+    """
+    await cur.execute("SELECT TreeSize FROM MerkleHeads WHERE ElectionID = %s", (election_id,))
+    row = await cur.fetchone()
+    if row is None or (tree_size is not None and not 0 <= tree_size <= row[0]):
+        return None
+
+    return row[0] if tree_size is None else tree_size
+
+async def fetch_merkle_root(election_id, tree_size=None):
+    """Fetch the root of an election's Merkle log.
+    Args:
+        election_id: Id of the election.
+        tree_size (int | None): Size of the (earlier) tree to return the root for, defaults to the current size.
+    Returns:
+        tuple | None: ``(tree size, root)``, or ``None`` if the election has no log of that size.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            tree_size = await fetch_merkle_tree_size(cur, election_id, tree_size)
+            if tree_size is None:
+                return None
+            nodes = await fetch_merkle_nodes(cur, election_id, merkleBB.frontier(tree_size))
+
+    return tree_size, merkleBB.range_hash(0, tree_size, nodes)
+
+async def fetch_merkle_inclusion_proof(election_id, ballot_hash, tree_size=None):
+    """Fetch the RFC 6962 audit path proving that a ballot hash is in an election's Merkle log.
+    Args:
+        election_id: Id of the election.
+        ballot_hash (str): Hash of the ballot.
+        tree_size (int | None): Size of the tree to prove inclusion in, defaults to the current size.
+    Returns:
+        tuple | None: ``(leaf index, tree size, audit path)``, or ``None`` if the ballot is not in the tree.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            tree_size = await fetch_merkle_tree_size(cur, election_id, tree_size)
+            if tree_size is None:
+                return None
+
+            await cur.execute(
+                "SELECT NodeIndex FROM MerkleNodes WHERE ElectionID = %s AND Level = 0 AND Hash = %s",
+                (election_id, merkleBB.leaf_hash(ballot_hash))
+            )
+            row = await cur.fetchone()
+            if row is None or row[0] >= tree_size:
+                return None
+            leaf_index = row[0]
+
+            ranges = merkleBB.inclusion_ranges(leaf_index, tree_size)
+            nodes = await fetch_merkle_nodes(cur, election_id, [key for start, end in ranges for key in merkleBB.perfect_subtrees(start, end)])
+
+    return leaf_index, tree_size, [merkleBB.range_hash(start, end, nodes) for start, end in ranges]
+
+async def fetch_merkle_consistency_proof(election_id, first, second):
+    """Fetch the RFC 6962 proof that the Merkle log of size ``first`` is a prefix of the log of size ``second``.
+    Args:
+        election_id: Id of the election.
+        first (int): Size of the older tree.
+        second (int): Size of the newer tree.
+    Returns:
+        list[bytes] | None: The proof, or ``None`` if the election has no log of size ``second``.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            if await fetch_merkle_tree_size(cur, election_id, second) is None:
+                return None
+            if first in (0, second):
+                return []
+
+            ranges = merkleBB.consistency_ranges(first, second)
+            nodes = await fetch_merkle_nodes(cur, election_id, [key for start, end in ranges for key in merkleBB.perfect_subtrees(start, end)])
+
+    return [merkleBB.range_hash(start, end, nodes) for start, end in ranges]
+
+async def fetch_board_changes(election_id, since=0, limit=None):
+    """Fetch the changes recorded for an election after a cursor.
+    Args:
+        election_id: Id of the election.
+        since (int): Cursor of the last change already seen, 0 for all changes.
+        limit (int | None): Maximum number of changes to return.
+    Returns:
+        list[BoardChange]: The changes, oldest first.
+    """
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                        SELECT ID, Kind, Payload, CreatedAt
+                        FROM BoardChanges
+                        WHERE ElectionID = %s AND ID > %s
+                        ORDER BY ID
+                        LIMIT %s;
+                        """, (election_id, since, limit))
+            rows = await cur.fetchall()
+
+    return [BoardChange(id=change_id, kind=kind, data=payload, timestamp=created_at) for change_id, kind, payload, created_at in rows]
 
 # Fetch elections for a given voter
-def fetch_elections_for_voter(voter_id):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+async def fetch_elections_for_voter(voter_id):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT ID, Name, ElectionStart, ElectionEnd
                         FROM Elections e
                         JOIN VoterParticipatesInElection p
                         ON p.ElectionID = e.ID
                         WHERE VoterID = %s
                         """, (voter_id,))
-            records = cur.fetchall()
+            records = await cur.fetchall()
 
     elections = Elections(
         elections = [Election (id=election_id, name=name, start=start, end=end) for election_id, name, start, end in records]
@@ -468,15 +1236,25 @@ def fetch_elections_for_voter(voter_id):
 
 
 # Fetch elections for a given voter
-def fetch_election_result(election_id):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                        SELECT CandidateID, Result, TallyProof
-                        FROM CandidateRunsInElection 
-                        WHERE ElectionID = %s
-                        """, (election_id,))
-            records = cur.fetchall()
+async def fetch_election_result(election_id):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            return await read_election_result(cur, election_id)
+
+async def read_election_result(cur, election_id):
+    """Fetch the result of an election using the given cursor.
+    Args:
+        cur: Open psycopg cursor.
+        election_id: Id of the election.
+    Returns:
+        ElectionResult | None: The result, or None if it has not been posted.
+    """
+    await cur.execute("""
+                SELECT CandidateID, Result, TallyProof
+                FROM CandidateRunsInElection 
+                WHERE ElectionID = %s
+                """, (election_id,))
+    records = await cur.fetchall()
 
     # If result is not available return None.
     if not records or any(result is None or proof is None for _, result, proof in records):
@@ -500,23 +1278,25 @@ def fetch_election_result(election_id):
 
     return election_result
 
-def fetch_ballot(election_id, voter_id, image_filename):
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
+async def fetch_ballot(election_id, voter_id, image_filename):
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
                         SELECT PublicKey, CtCandidate, CtVoterList, CtVotingServerList, Proof, VoteTimestamp
                         FROM VoterParticipatesInElection p
                         JOIN VoterCastsBallot c 
                         ON p.ElectionID = c.ElectionID AND p.VoterID = c.VoterID
                         JOIN Ballots b
-                        ON b.ID = c.BallotID
+                        ON b.ElectionID = c.ElectionID AND b.ID = c.BallotID
+                        JOIN BallotProofs bp
+                        ON bp.ElectionID = c.ElectionID AND bp.BallotID = c.BallotID
                         JOIN Images i
-                        ON i.BallotID = c.BallotID
+                        ON i.ElectionID = c.ElectionID AND i.BallotID = c.BallotID
                         WHERE c.ElectionID = %s
                             AND c.VoterID = %s
                             AND i.ImageFilename = %s
                         """, (election_id, voter_id, image_filename))
-            row = cur.fetchone()
+            row = await cur.fetchone()
 
     if not row:
         return None
@@ -535,26 +1315,26 @@ def fetch_ballot(election_id, voter_id, image_filename):
 
     return ballot
 
-def fetch_preceeding_ballots(voter_id, election_id, timestamp):
+async def fetch_preceeding_ballots(voter_id, election_id, timestamp):
     """
     Fetch the two ballots immediately preceding the given timestamp
     for a voter in an election.
     """
 
-    with pool.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("""
-                        SELECT CtCandidate, CtVoterList, CtVotingServerList, Proof
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                        SELECT CtCandidate, CtVoterList, CtVotingServerList
                         FROM VoterParticipatesInElection p
                         JOIN VoterCastsBallot c 
                         ON p.ElectionID = c.ElectionID AND p.VoterID = c.VoterID
                         JOIN Ballots b
-                        ON b.ID = c.BallotID
+                        ON b.ElectionID = c.ElectionID AND b.ID = c.BallotID
                         WHERE p.ElectionID = %s AND p.VoterID = %s AND c.VoteTimestamp < %s
                         ORDER BY c.VoteTimestamp DESC
                         LIMIT 2;
                         """, (election_id, voter_id, timestamp))
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
 
     # In case only one row is in the database (ballot0):
     if len(rows) == 1:
@@ -565,3 +1345,207 @@ def fetch_preceeding_ballots(voter_id, election_id, timestamp):
     previous_last_ballot_b64 = serialise_ballot_cts(rows[1])
 
     return last_ballot_b64, previous_last_ballot_b64
+
+async def fetch_proof_context(voter_id, election_id, before=None):
+    """Fetch everything needed to build or verify one ballot for a voter in a single transaction.
+
+    Reads the ElGamal parameters, TS/VS public keys, candidates, the voter public key, the CBR length
+    and the last and previous last ballots from one REPEATABLE READ snapshot, so the values are consistent
+    with each other even while new ballots are being posted.
+
+    Args:
+        voter_id: Id of the voter.
+        election_id: Id of the election.
+        before: Optional timestamp. If given, the CBR length and the two ballots preceding this
+            timestamp are returned instead of the current ones (used when verifying a posted ballot).
+    Returns:
+        ProofContext | None: The proof context, or None if the voter does not participate in the election.
+    """
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+                await cur.execute("""
+                            SELECT PublicKey
+                            FROM VoterParticipatesInElection
+                            WHERE VoterID = %s AND ElectionID = %s;
+                            """, (voter_id, election_id))
+                voter_row = await cur.fetchone()
+                if voter_row is None:
+                    return None
+
+                election_context = await fetch_election_context(cur, election_id)
+
+                if before is None:
+                    await cur.execute("""
+                                SELECT h.CBRLength,
+                                       l.CtCandidate, l.CtVoterList, l.CtVotingServerList,
+                                       pl.CtCandidate, pl.CtVoterList, pl.CtVotingServerList
+                                FROM VoterBallotHead h
+                                JOIN Ballots l
+                                ON l.ElectionID = h.ElectionID AND l.ID = h.LastBallotID
+                                LEFT JOIN Ballots pl
+                                ON pl.ElectionID = h.ElectionID AND pl.ID = h.PreviousLastBallotID
+                                WHERE h.ElectionID = %s AND h.VoterID = %s;
+                                """, (election_id, voter_id))
+                    head = await cur.fetchone()
+                    cbr_length = head[0] if head else 0
+                    ballot_rows = [head[1:4]] if head else []
+                    if head and head[4] is not None:
+                        ballot_rows.append(head[4:7])
+                else:
+                    await cur.execute("""
+                                SELECT COUNT(*)
+                                FROM VoterCastsBallot
+                                WHERE ElectionID = %s AND VoterID = %s AND VoteTimestamp < %s;
+                                """, (election_id, voter_id, before))
+                    (cbr_length,) = await cur.fetchone()
+
+                    await cur.execute("""
+                                SELECT CtCandidate, CtVoterList, CtVotingServerList
+                                FROM VoterCastsBallot c
+                                JOIN Ballots b
+                                ON b.ElectionID = c.ElectionID AND b.ID = c.BallotID
+                                WHERE c.ElectionID = %s AND c.VoterID = %s AND c.VoteTimestamp < %s
+                                ORDER BY c.VoteTimestamp DESC
+                                LIMIT 2;
+                                """, (election_id, voter_id, before))
+                    ballot_rows = await cur.fetchall()
+
+    ballots_b64 = [serialise_ballot_cts(row) for row in ballot_rows]
+
+    proof_context: ProofContext = ProofContext(
+        **election_context,
+        voter_public_key=base64.b64encode(voter_row[0]).decode(),
+        cbr_length=cbr_length,
+        last_ballot=ballots_b64[0] if len(ballots_b64) > 0 else None,
+        previous_last_ballot=ballots_b64[1] if len(ballots_b64) > 1 else None
+    )
+
+    return proof_context
+
+async def fetch_election_context(cur, election_id):
+    """Fetch the ElGamal parameters, TS/VS public keys and candidates shared by all ballots of an election.
+    Args:
+        cur: Open psycopg cursor.
+        election_id: Id of the election.
+    Returns:
+        dict: ``group``, ``generator``, ``order``, ``publickey_ts``, ``publickey_vs`` (binary values base64-encoded)
+        and ``candidates`` ordered by id.
+    """
+    await cur.execute("""
+                SELECT GroupCurve, Generator, OrderP, PublicKeyTallyingServer, PublicKeyVotingServer
+                FROM GlobalInfo
+                WHERE ID = 0
+                """)
+    GROUP, GENERATOR, ORDER, public_key_ts_bin, public_key_vs_bin = await cur.fetchone()
+
+    await cur.execute("""
+                SELECT c.ID, c.Name
+                FROM Candidates c
+                JOIN CandidateRunsInElection cr on c.ID = cr.CandidateID
+                WHERE cr.ElectionID = %s
+                ORDER BY c.ID;""",
+                (election_id,))
+    candidates = [Candidate(id=cid, name=name) for cid, name in await cur.fetchall()]
+
+    return {
+        "group": GROUP,
+        "generator": base64.b64encode(GENERATOR).decode(),
+        "order": base64.b64encode(ORDER).decode(),
+        "publickey_ts": base64.b64encode(public_key_ts_bin).decode(),
+        "publickey_vs": base64.b64encode(public_key_vs_bin).decode(),
+        "candidates": candidates,
+    }
+
+async def fetch_heads(election_id, voter_ids):
+    """Fetch the current CBR heads of many voters, together with the election context, in a single transaction.
+
+    The public key, CBR length and last and previous last ballots of all voters are read with one query.
+    Args:
+        election_id: Id of the election.
+        voter_ids (list[int]): Ids of the voters.
+    Returns:
+        Heads: The election context and one head per voter participating in the election, in the order of ``voter_ids``.
+    """
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor() as cur:
+                await cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                election_context = await fetch_election_context(cur, election_id)
+
+                await cur.execute("""
+                            SELECT p.VoterID, p.PublicKey, COALESCE(h.CBRLength, 0),
+                                   l.CtCandidate, l.CtVoterList, l.CtVotingServerList,
+                                   pl.CtCandidate, pl.CtVoterList, pl.CtVotingServerList
+                            FROM unnest(%s::int[]) WITH ORDINALITY AS v(VoterID, Position)
+                            JOIN VoterParticipatesInElection p
+                            ON p.ElectionID = %s AND p.VoterID = v.VoterID
+                            LEFT JOIN VoterBallotHead h
+                            ON h.ElectionID = p.ElectionID AND h.VoterID = p.VoterID
+                            LEFT JOIN Ballots l
+                            ON l.ElectionID = h.ElectionID AND l.ID = h.LastBallotID
+                            LEFT JOIN Ballots pl
+                            ON pl.ElectionID = h.ElectionID AND pl.ID = h.PreviousLastBallotID
+                            ORDER BY v.Position;
+                            """, (voter_ids, election_id))
+                rows = await cur.fetchall()
+
+    heads = []
+    for voter_id, public_key, cbr_length, *ballot_cts in rows:
+        last_ballot_cts, previous_last_ballot_cts = ballot_cts[:3], ballot_cts[3:]
+        heads.append(VoterHead(
+            voterid=voter_id,
+            voter_public_key=base64.b64encode(public_key).decode(),
+            cbr_length=cbr_length,
+            last_ballot=serialise_ballot_cts(last_ballot_cts) if last_ballot_cts[0] is not None else None,
+            previous_last_ballot=serialise_ballot_cts(previous_last_ballot_cts) if previous_last_ballot_cts[0] is not None else None,
+        ))
+
+    return Heads(**election_context, heads=heads)
+
+## ---------------- SNAPSHOT SOURCES ---------------- ##
+# Read once per tallied election by snapshotBB.py, which writes the rows to memory-mapped Arrow files.
+
+async def stream_cbr_ballots(conn, election_id):
+    """Stream every ballot on the CBRs of an election, ordered by voter and CBR index.
+    Args:
+        conn: Open psycopg connection, inside a transaction.
+        election_id: Id of the election.
+    Yields:
+        list[tuple]: Batches of at most ``STREAM_BATCH_SIZE`` rows of (VoterID, CBRIndex, BallotID, VoteTimestamp,
+        ImageFilename, BallotHash, CtCandidate, CtVoterList, CtVotingServerList, Proof).
+    """
+    async with conn.cursor(name="snapshot_cbr_ballots") as cur: # named cursor is kept server-side.
+        await cur.execute("""
+                    SELECT v.VoterID, v.CBRIndex, v.BallotID, v.VoteTimestamp, v.ImageFilename, b.BallotHash,
+                           b.CtCandidate, b.CtVoterList, b.CtVotingServerList, bp.Proof
+                    FROM VoterCBR v
+                    JOIN Ballots b
+                    ON b.ElectionID = v.ElectionID AND b.ID = v.BallotID
+                    JOIN BallotProofs bp
+                    ON bp.ElectionID = v.ElectionID AND bp.BallotID = v.BallotID
+                    WHERE v.ElectionID = %s
+                    ORDER BY v.VoterID, v.CBRIndex;
+                    """, (election_id,))
+        while rows := await cur.fetchmany(STREAM_BATCH_SIZE):
+            yield rows
+
+async def stream_voter_keys(conn, election_id):
+    """Stream the public keys of the voters in an election, ordered by voter id.
+    Args:
+        conn: Open psycopg connection, inside a transaction.
+        election_id: Id of the election.
+    Yields:
+        list[tuple]: Batches of at most ``STREAM_BATCH_SIZE`` (VoterID, PublicKey) rows.
+    """
+    async with conn.cursor(name="snapshot_voter_keys") as cur:
+        await cur.execute("""
+                    SELECT VoterID, PublicKey
+                    FROM VoterParticipatesInElection
+                    WHERE ElectionID = %s
+                    ORDER BY VoterID;
+                    """, (election_id,))
+        while rows := await cur.fetchmany(STREAM_BATCH_SIZE):
+            yield rows
@@ -0,0 +1,90 @@
+"""Group commit for single-ballot posts to the Bulletin Board.
+
+Every ``/receive-ballot`` request normally runs in its own transaction, so each ballot pays for
+a commit (WAL flush). When ``BB_GROUP_COMMIT_WINDOW_MS`` is set, ballots arriving within that
+window (or until ``BB_GROUP_COMMIT_MAX_BATCH`` are waiting) are written together with
+``load_ballots_into_db``, i.e. one transaction with per-ballot savepoints as fallback, and each
+request still gets its own ballot id or error. Batches are committed one at a time; ballots
+arriving meanwhile make up the next batch.
+"""
+import asyncio
+import os
+import dbcalls as db
+
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("BB_GROUP_COMMIT_WINDOW_MS", "0")) # 0 disables group commit.
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("BB_GROUP_COMMIT_MAX_BATCH", "64"))
+
+
+class BallotRejected(Exception):
+    """A ballot of a group-committed batch could not be stored."""
+
+
+class GroupCommitQueue:
+    """Coalesces concurrent single-ballot writes into shared transactions."""
+
+    def __init__(self, window_ms, max_batch):
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: list = [] # (ballot, ballot hash, future) in arrival order
+        self._full = asyncio.Event()
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_s > 0 and self.max_batch > 1
+
+    async def submit(self, pyBallot, ballot_hash=None) -> int:
+        """Store a ballot, sharing the transaction with other ballots submitted in the same window.
+        Args:
+            pyBallot (Ballot): The ballot to store.
+            ballot_hash (str, optional): Hash of the ballot, if already computed and checked.
+        Returns:
+            int: Id of the stored ballot.
+        Raises:
+            BallotRejected: If the ballot could not be stored.
+        """
+        if not self.enabled:
+            return await db.load_ballot_into_db(pyBallot, ballot_hash)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((pyBallot, ballot_hash, future))
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        # A cancelled request does not cancel the write, the ballot is committed with its batch.
+        return await asyncio.shield(future)
+
+    async def _run(self):
+        while self._pending:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window_s)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if len(self._pending) >= self.max_batch:
+                self._full.set()
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        try:
+            receipts = await db.load_ballots_into_db([pyBallot for pyBallot, _, _ in batch], [ballot_hash for _, ballot_hash, _ in batch])
+        except Exception as e:
+            receipts = None
+            error = e
+
+        for idx, (_, _, future) in enumerate(batch):
+            if receipts is None:
+                future.set_exception(error)
+            elif receipts[idx].error is not None:
+                future.set_exception(BallotRejected(receipts[idx].error))
+            else:
+                future.set_result(receipts[idx].ballotid)
+                continue
+            future.exception() # Mark as retrieved, the request might have been cancelled.
+
+
+ballot_writer = GroupCommitQueue(GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH)
@@ -0,0 +1,154 @@
+"""Append-only Merkle log over the ballot hashes posted to the Bulletin Board.
+
+The tree follows RFC 6962 (Certificate Transparency): leaves are ``SHA-256(0x00 || ballot hash)``
+and interior nodes are ``SHA-256(0x01 || left || right)``. Ballot hashes are appended per election
+in the order the ballots are stored.
+
+Only perfect subtrees are stored, as ``(level, index)`` nodes covering the leaves
+``[index * 2**level, (index + 1) * 2**level)``. They never change once written, so appending a
+leaf only adds nodes, and every root, inclusion proof and consistency proof is computed from
+O(log n) stored nodes. The functions in this module are pure; ``dbcalls.py`` reads and writes the nodes.
+"""
+import hashlib
+
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+
+def leaf_hash(ballot_hash: str) -> bytes:
+    """Hash a ballot hash (hex string) into a Merkle leaf.
+    Args:
+        ballot_hash (str): SHA-256 hex digest of the ballot, as stored in "Ballots".
+    Returns:
+        bytes: The leaf hash.
+    """
+    return hashlib.sha256(b"\x00" + bytes.fromhex(ballot_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Hash two child nodes into their parent."""
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def largest_power_of_two_below(n: int) -> int:
+    """Return the largest power of two strictly smaller than n (n > 1)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def frontier(tree_size: int) -> list[tuple[int, int]]:
+    """Return the perfect subtrees a tree of the given size decomposes into, largest first.
+    Args:
+        tree_size (int): Number of leaves.
+    Returns:
+        list[tuple[int, int]]: ``(level, index)`` of each subtree root.
+    """
+    return perfect_subtrees(0, tree_size)
+
+
+def perfect_subtrees(start: int, end: int) -> list[tuple[int, int]]:
+    """Decompose the leaf range ``[start, end)`` into stored perfect subtrees, left to right.
+    ``start`` must be a multiple of the largest subtree, which holds for every range used by RFC 6962 proofs.
+    Args:
+        start (int): First leaf of the range.
+        end (int): Leaf after the last leaf of the range.
+    Returns:
+        list[tuple[int, int]]: ``(level, index)`` of each subtree root.
+    """
+    subtrees = []
+    while start < end:
+        level = (end - start).bit_length() - 1
+        while start % (1 << level):
+            level -= 1
+        subtrees.append((level, start >> level))
+        start += 1 << level
+    return subtrees
+
+
+def range_hash(start: int, end: int, nodes: dict) -> bytes:
+    """Compute the Merkle tree hash of the leaf range ``[start, end)`` from stored nodes.
+    Args:
+        start (int): First leaf of the range.
+        end (int): Leaf after the last leaf of the range.
+        nodes (dict): ``(level, index) -> hash`` containing at least ``perfect_subtrees(start, end)``.
+    Returns:
+        bytes: The hash of the range, ``EMPTY_ROOT`` if it is empty.
+    """
+    subtrees = perfect_subtrees(start, end)
+    if not subtrees:
+        return EMPTY_ROOT
+
+    # Perfect subtrees shrink from left to right, so the hash is folded from the right.
+    result = nodes[subtrees[-1]]
+    for subtree in reversed(subtrees[:-1]):
+        result = node_hash(nodes[subtree], result)
+    return result
+
+
+def inclusion_ranges(leaf_index: int, tree_size: int) -> list[tuple[int, int]]:
+    """Leaf ranges whose hashes make up the RFC 6962 audit path of a leaf, from the leaf upwards.
+    Args:
+        leaf_index (int): Index of the leaf.
+        tree_size (int): Number of leaves in the tree the proof is for.
+    Returns:
+        list[tuple[int, int]]: ``(start, end)`` leaf ranges.
+    """
+    ranges = []
+    start, end = 0, tree_size
+    while end - start > 1:
+        k = largest_power_of_two_below(end - start)
+        if leaf_index < start + k:
+            ranges.append((start + k, end))
+            end = start + k
+        else:
+            ranges.append((start, start + k))
+            start = start + k
+    return list(reversed(ranges))
+
+
+def consistency_ranges(first: int, second: int) -> list[tuple[int, int]]:
+    """Leaf ranges whose hashes make up the RFC 6962 consistency proof between two tree sizes.
+    Args:
+        first (int): Size of the older tree, 0 < first <= second.
+        second (int): Size of the newer tree.
+    Returns:
+        list[tuple[int, int]]: ``(start, end)`` leaf ranges, in proof order.
+    """
+    ranges = []
+    start, end, m, complete = 0, second, first, True
+    while m != end - start:
+        k = largest_power_of_two_below(end - start)
+        if m <= k:
+            ranges.append((start + k, end))
+            end = start + k
+        else:
+            ranges.append((start, start + k))
+            m -= k
+            start = start + k
+            complete = False
+    if not complete:
+        ranges.append((start, end))
+    return list(reversed(ranges))
+
+
+def append_leaves(tree_size: int, frontier_nodes: dict, leaves: list[bytes]) -> list[tuple[int, int, bytes]]:
+    """Append leaves to a tree and return every node that becomes complete.
+    Args:
+        tree_size (int): Number of leaves before appending.
+        frontier_nodes (dict): ``(level, index) -> hash`` for ``frontier(tree_size)``.
+        leaves (list[bytes]): Leaf hashes to append, in order.
+    Returns:
+        list[tuple[int, int, bytes]]: New ``(level, index, hash)`` nodes, including the leaves.
+    """
+    nodes = dict(frontier_nodes)
+    new_nodes = []
+    for leaf in leaves:
+        level, index, current = 0, tree_size, leaf
+        nodes[(level, index)] = current
+        new_nodes.append((level, index, current))
+        # A right child completes its parent.
+        while index % 2 == 1:
+            current = node_hash(nodes[(level, index - 1)], current)
+            level, index = level + 1, index // 2
+            nodes[(level, index)] = current
+            new_nodes.append((level, index, current))
+        tree_size += 1
+    return new_nodes
@@ -65,9 +65,80 @@ class Ballot(BaseModel):
     proof: str                              # NIZK proof verifying the correct construction of the ballot.
     electionid: Optional[int] = None
     timestamp: Optional[datetime] = None
-    hash: Optional[str] = None              # Hash-value for ballot to ensure uniqueness on BB CBR.
+    hash: Optional[str] = None              # Hash-value for ballot to ensure uniqueness on BB CBR. If set, it must match and makes retried posts idempotent.
     imagepath: Optional[str] = None         # Filename for image associated with ballot.
 
+class BallotList(BaseModel):
+    """Container for a batch of ballots posted to the BB in one request."""
+    ballots: List[Ballot]
+
+class BallotReceipt(BaseModel):
+    """Outcome for a single ballot in a batch.
+    Either the id assigned to the stored ballot or the error that prevented it from being stored."""
+    index: int                              # Position of the ballot in the posted batch.
+    ballotid: Optional[int] = None          # Id of the stored ballot.
+    error: Optional[str] = None             # Error message if the ballot could not be stored.
+
+class BallotReceiptList(BaseModel):
+    """Container for the per-ballot outcomes of a batch."""
+    receipts: List[BallotReceipt]
+
+class BallotHashLookup(BaseModel):
+    """Ballot hashes to look up on the BB for a specific election."""
+    electionid: int
+    hashes: List[str]
+
+class ProofContext(BaseModel):
+    """Everything needed to build or verify one ballot for a voter, read from a single DB transaction.
+    Binary values are base64-encoded. Ballots are (ctv, ctlv, ctlid, proof) with an empty proof."""
+    group: int
+    generator: str                                  # base64-encoded group generator
+    order: str                                      # base64-encoded group order
+    publickey_ts: str                               # base64-encoded Tallying Server public key
+    publickey_vs: str                               # base64-encoded Voting Server public key
+    candidates: List[Candidate]
+    voter_public_key: str                           # base64-encoded voter public key for the election
+    cbr_length: int                                 # Number of ballots on the voter CBR (before the given timestamp, if any).
+    last_ballot: Optional[list] = None              # None if the voter has no ballots yet.
+    previous_last_ballot: Optional[list] = None     # None if the voter has at most one ballot.
+
+class HeadsRequest(BaseModel):
+    """Voters to fetch the CBR heads of in one request, e.g. all voters with a ballot due in the same tick."""
+    electionid: int
+    voterids: List[int]
+
+class VoterHead(BaseModel):
+    """Current head of one voter's CBR. Ballots are (ctv, ctlv, ctlid, proof) with an empty proof."""
+    voterid: int
+    voter_public_key: str                           # base64-encoded voter public key for the election
+    cbr_length: int
+    last_ballot: Optional[list] = None              # None if the voter has no ballots yet.
+    previous_last_ballot: Optional[list] = None     # None if the voter has at most one ballot.
+
+class Heads(BaseModel):
+    """Parameters, keys and candidates of an election, and the CBR heads of the requested voters,
+    read from a single DB transaction. Voters that do not participate in the election are left out."""
+    group: int
+    generator: str                                  # base64-encoded group generator
+    order: str                                      # base64-encoded group order
+    publickey_ts: str                               # base64-encoded Tallying Server public key
+    publickey_vs: str                               # base64-encoded Voting Server public key
+    candidates: List[Candidate]
+    heads: List[VoterHead]
+
+class BoardChange(BaseModel):
+    """A ballot or result posted to the BB, as recorded in the change feed."""
+    id: int                                 # Cursor of the change, increasing within an election.
+    kind: str                               # "ballot" or "result".
+    data: dict                              # Ballot: voterid, ballotid, cbrindex, imagefilename, timestamp, ballothash, leafindex.
+    timestamp: datetime                     # Time the change was recorded.
+
+class BoardChangeList(BaseModel):
+    """Changes for an election after a cursor, and the cursor to continue from."""
+    electionid: int
+    changes: List[BoardChange]
+    next: int                               # Pass as ``since`` to get the following changes.
+
 class CandidateResult(BaseModel):
     """Result for a single candiate.
     Contains number of votes received and NIZK proof.
@@ -0,0 +1,340 @@
+"""Frozen snapshots of tallied elections, served from memory-mapped Arrow files.
+
+Once the result of an election is posted its board no longer changes, while verification traffic
+(CBR images, ballots, proof contexts, hashes and tally inputs) peaks. The BB then writes the board
+of the election once into Arrow IPC files in ``BB_SNAPSHOT_DIR``:
+
+- ``election_<id>-<build>-ballots.arrow``: every ballot on a CBR, ordered by voter id and CBR index.
+- ``election_<id>-<build>-voters.arrow``: voter id, public key, and the row range of the voter's CBR.
+- ``election_<id>.json``: the manifest, naming the two files together with the result, encrypted aggregate
+  and election context. It is written last with ``os.replace``, so a snapshot is complete or absent.
+  It records the board version (the size of the election's Merkle log, which grows with every ballot) the
+  files were read at; a snapshot whose board changed while it was built is not kept.
+
+Every worker process maps the files on first use and answers the read endpoints from the page cache
+without touching PostgreSQL. A worker reloads when the manifest is replaced (rebuild) and drops the
+snapshot when the manifest is removed, which happens if a ballot is posted to the election after all.
+"""
+import asyncio
+import base64
+import json
+import os
+import uuid
+from datetime import timezone
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import dbcalls as db
+from modelsBB import Ballot, ElectionResult, IndexImage, IndexImageCBR, ProofContext
+
+SNAPSHOT_DIR = os.getenv("BB_SNAPSHOT_DIR", "/snapshots") # Empty disables snapshots.
+
+BALLOT_SCHEMA = pa.schema([
+    ("voter_id", pa.int32()),
+    ("cbr_index", pa.int32()),
+    ("ballot_id", pa.int32()),
+    ("timestamp", pa.timestamp("us")),
+    ("image_filename", pa.string()),
+    ("ballot_hash", pa.string()),
+    ("ct_candidate", pa.list_(pa.list_(pa.binary()))),   # [c0, c1] per candidate
+    ("ct_voter_list", pa.list_(pa.binary())),
+    ("ct_voting_server_list", pa.list_(pa.binary())),
+    ("proof", pa.binary()),
+])
+
+VOTER_SCHEMA = pa.schema([
+    ("voter_id", pa.int32()),
+    ("public_key", pa.binary()),
+    ("cbr_start", pa.int64()),      # First row of the voter's CBR in the ballots file.
+    ("cbr_length", pa.int32()),
+])
+
+
+class SnapshotUnavailable(Exception):
+    """A snapshot cannot be built because the election has no result yet."""
+
+
+class SnapshotStale(SnapshotUnavailable):
+    """Ballots were posted to the election while its snapshot was built."""
+
+
+def map_table(path) -> pa.Table:
+    """Map an Arrow IPC file into memory. The table's buffers point into the mapping, nothing is copied."""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+class ElectionSnapshot:
+    """Read access to the frozen board of one election."""
+
+    def __init__(self, election_id, manifest, directory):
+        self.election_id = election_id
+        self.result = ElectionResult(**manifest["result"])
+        self.encrypted_aggregate = manifest["encrypted_aggregate"]
+        self.context = manifest["context"]
+        self.ballots = map_table(os.path.join(directory, manifest["ballots"]))
+        self.voters = map_table(os.path.join(directory, manifest["voters"])).combine_chunks()
+        self._voter_ids = self.voters.column("voter_id").to_numpy()
+
+    def _voter(self, voter_id):
+        """Return (row in the voters file, first CBR row, CBR length) of a voter, or None if not in the election."""
+        row = int(np.searchsorted(self._voter_ids, voter_id))
+        if row == len(self._voter_ids) or self._voter_ids[row] != voter_id:
+            return None
+        return row, self.voters["cbr_start"][row].as_py(), self.voters["cbr_length"][row].as_py()
+
+    def _cbr(self, voter, columns):
+        """Return the given columns of a voter's CBR as Python lists, in CBR order."""
+        _, start, length = voter
+        rows = self.ballots.slice(start, length).select(columns)
+        return [rows.column(name).to_pylist() for name in columns]
+
+    def cbr_length(self, voter_id) -> int:
+        voter = self._voter(voter_id)
+        return voter[2] if voter else 0
+
+    def cbr(self, voter_id, after_index=None, limit=None) -> IndexImageCBR:
+        """Same as ``db.fetch_cbr_for_voter_in_election``."""
+        voter = self._voter(voter_id)
+        if voter is None:
+            return IndexImageCBR(cbrimages=[])
+        indices, images, timestamps = self._cbr(voter, ["cbr_index", "image_filename", "timestamp"])
+        cbr_images = [
+            IndexImage(cbrindex=index, image=image, timestamp=timestamp)
+            for index, image, timestamp in zip(indices, images, timestamps)
+            if after_index is None or index > after_index
+        ]
+        return IndexImageCBR(cbrimages=cbr_images[:limit])
+
+    def ballot(self, voter_id, image_filename) -> Ballot | None:
+        """Same as ``db.fetch_ballot``."""
+        voter = self._voter(voter_id)
+        if voter is None:
+            return None
+        (images,) = self._cbr(voter, ["image_filename"])
+        if image_filename not in images:
+            return None
+        row = self.ballots.slice(voter[1] + images.index(image_filename), 1).to_pylist()[0]
+        ctv_b64, ctlv_b64, ctlid_b64, proof_b64 = db.serialise_ballot_cts(
+            (row["ct_candidate"], row["ct_voter_list"], row["ct_voting_server_list"], row["proof"]))
+        return Ballot(
+            voterid=voter_id,
+            upk=base64.b64encode(self.voters["public_key"][voter[0]].as_py()).decode(),
+            ctv=ctv_b64,
+            ctlv=ctlv_b64,
+            ctlid=ctlid_b64,
+            proof=proof_b64,
+            timestamp=row["timestamp"]
+        )
+
+    def preceding_ballots(self, voter, before=None):
+        """Return the CBR length and the (up to two) ballots preceding a timestamp, latest first.
+        Args:
+            voter: Result of ``_voter``.
+            before (datetime, optional): Timestamp; None for the end of the CBR.
+        Returns:
+            tuple: (cbr_length, ballots) with ballots serialised like ``db.serialise_ballot_cts`` without proof.
+        """
+        timestamps, ctvs, ctlvs, ctlids = self._cbr(voter, ["timestamp", "ct_candidate", "ct_voter_list", "ct_voting_server_list"])
+        if before is None: # The head of the CBR, as in "VoterBallotHead".
+            preceding = list(range(len(timestamps)))
+            latest = preceding[::-1][:2]
+        else:
+            if before.tzinfo is not None:
+                before = before.astimezone(timezone.utc).replace(tzinfo=None) # Stored timestamps are UTC without zone.
+            preceding = [i for i, timestamp in enumerate(timestamps) if timestamp < before]
+            latest = sorted(preceding, key=lambda i: timestamps[i], reverse=True)[:2]
+        return len(preceding), [db.serialise_ballot_cts((ctvs[i], ctlvs[i], ctlids[i])) for i in latest]
+
+    def last_and_previous_last_ballot(self, voter_id):
+        """Same as ``db.fetch_last_and_previouslast_ballot``."""
+        voter = self._voter(voter_id)
+        _, ballots = self.preceding_ballots(voter) if voter else (0, [])
+        return (ballots + [None, None])[:2]
+
+    def proof_context(self, voter_id, before=None) -> ProofContext | None:
+        """Same as ``db.fetch_proof_context``."""
+        voter = self._voter(voter_id)
+        if voter is None:
+            return None
+        cbr_length, ballots = self.preceding_ballots(voter, before)
+        return ProofContext(
+            **self.context,
+            voter_public_key=base64.b64encode(self.voters["public_key"][voter[0]].as_py()).decode(),
+            cbr_length=cbr_length,
+            last_ballot=ballots[0] if len(ballots) > 0 else None,
+            previous_last_ballot=ballots[1] if len(ballots) > 1 else None
+        )
+
+    def ballot_hashes(self) -> list[str]:
+        return self.ballots.column("ballot_hash").to_pylist()
+
+    def last_ballot_ctvs(self, batch_size=db.STREAM_BATCH_SIZE):
+        """Yield (voter_id, ctv_b64) for the last ballot of every voter with a ballot, ordered by voter id."""
+        voters = self.voters.filter(pc.greater(self.voters["cbr_length"], 0))
+        for offset in range(0, voters.num_rows, batch_size):
+            batch = voters.slice(offset, batch_size)
+            last_rows = pc.subtract(pc.add(batch["cbr_start"], batch["cbr_length"].cast(pa.int64())), 1)
+            ctvs = self.ballots.take(last_rows).column("ct_candidate").to_pylist()
+            for voter_id, ctv in zip(batch["voter_id"].to_pylist(), ctvs):
+                yield voter_id, [[base64.b64encode(c0).decode(), base64.b64encode(c1).decode()] for c0, c1 in ctv]
+
+
+class SnapshotStore:
+    """Builds snapshots and keeps the ones in use by this process mapped."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._open: dict = {} # election id -> ((inode, mtime) of the manifest, ElectionSnapshot)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _manifest_path(self, election_id):
+        return os.path.join(self.directory, f"election_{election_id}.json")
+
+    def get(self, election_id) -> ElectionSnapshot | None:
+        """Return the snapshot of an election, or None if it has none (the caller then reads PostgreSQL).
+        Args:
+            election_id (int): Id of the election.
+        Returns:
+            ElectionSnapshot | None: The mapped snapshot.
+        """
+        if not self.enabled:
+            return None
+        try:
+            stat = os.stat(self._manifest_path(election_id))
+        except FileNotFoundError:
+            self._open.pop(election_id, None)
+            return None
+
+        version = (stat.st_ino, stat.st_mtime_ns)
+        cached = self._open.get(election_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with open(self._manifest_path(election_id)) as f:
+            manifest = json.load(f)
+        snapshot = ElectionSnapshot(election_id, manifest, self.directory)
+        self._open[election_id] = (version, snapshot)
+        return snapshot
+
+    async def build(self, election_id) -> dict:
+        """Write the snapshot of a tallied election, replacing an existing one.
+        Args:
+            election_id (int): Id of the election.
+        Returns:
+            dict: Number of ballots and voters in the snapshot.
+        Raises:
+            SnapshotUnavailable: If no result has been posted for the election.
+            SnapshotStale: If ballots were posted to the election while the snapshot was built.
+        """
+        build = uuid.uuid4().hex[:12]
+        ballots_file = f"election_{election_id}-{build}-ballots.arrow"
+        voters_file = f"election_{election_id}-{build}-voters.arrow"
+
+        async with db.pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    # Everything is read from one snapshot of the board, as in boardexportBB.export_election.
+                    await cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                    election_result = await db.read_election_result(cur, election_id)
+                    if election_result is None:
+                        raise SnapshotUnavailable(f"election {election_id} has no result")
+                    board_version = await db.fetch_merkle_tree_size(cur, election_id) or 0
+                    encrypted_aggregate = await db.read_encrypted_aggregate(cur, election_id)
+                    context = await db.fetch_election_context(cur, election_id)
+                await asyncio.to_thread(os.makedirs, self.directory, exist_ok=True)
+
+                try:
+                    # The Arrow files are written on worker threads, so the event loop keeps serving requests.
+                    cbr_lengths: dict = {}
+                    num_ballots = 0
+                    with pa.OSFile(os.path.join(self.directory, ballots_file), "wb") as sink, pa.ipc.new_file(sink, BALLOT_SCHEMA) as writer:
+                        async for rows in db.stream_cbr_ballots(conn, election_id):
+                            await asyncio.to_thread(write_rows, writer, rows, BALLOT_SCHEMA)
+                            for row in rows:
+                                cbr_lengths[row[0]] = cbr_lengths.get(row[0], 0) + 1
+                            num_ballots += len(rows)
+
+                    num_voters = 0
+                    cbr_start = 0
+                    with pa.OSFile(os.path.join(self.directory, voters_file), "wb") as sink, pa.ipc.new_file(sink, VOTER_SCHEMA) as writer:
+                        async for rows in db.stream_voter_keys(conn, election_id):
+                            lengths = [cbr_lengths.get(voter_id, 0) for voter_id, _ in rows]
+                            starts = []
+                            for length in lengths:
+                                starts.append(cbr_start)
+                                cbr_start += length
+                            voter_rows = [(voter_id, public_key, start, length) for (voter_id, public_key), start, length in zip(rows, starts, lengths)]
+                            await asyncio.to_thread(write_rows, writer, voter_rows, VOTER_SCHEMA)
+                            num_voters += len(rows)
+                except BaseException:
+                    await asyncio.to_thread(self._remove_files, election_id, set(), build)
+                    raise
+
+        manifest = {
+            "electionid": election_id,
+            "boardversion": board_version,
+            "ballots": ballots_file,
+            "voters": voters_file,
+            "result": election_result.model_dump(mode="json"),
+            "encrypted_aggregate": encrypted_aggregate,
+            "context": {**context, "candidates": [candidate.model_dump() for candidate in context["candidates"]]},
+        }
+
+        # A ballot posted while building only removes an existing manifest, so the board version is checked
+        # before publishing and again after: a ballot committed before the manifest was replaced is seen by
+        # the second check, one committed after it finds the manifest and removes it.
+        if await current_board_version(election_id) != board_version:
+            await asyncio.to_thread(self._remove_files, election_id, set(), build)
+            raise SnapshotStale(f"ballots were posted to election {election_id} while building its snapshot")
+        await asyncio.to_thread(self._publish, election_id, manifest, build)
+        if await current_board_version(election_id) != board_version:
+            self.discard(election_id)
+            raise SnapshotStale(f"ballots were posted to election {election_id} while building its snapshot")
+
+        await asyncio.to_thread(self._remove_files, election_id, {ballots_file, voters_file})
+        return {"ballots": num_ballots, "voters": num_voters}
+
+    def _publish(self, election_id, manifest, build):
+        manifest_path = self._manifest_path(election_id)
+        with open(f"{manifest_path}.{build}.tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(f"{manifest_path}.{build}.tmp", manifest_path)
+
+    def discard(self, election_id):
+        """Remove the snapshot of an election, e.g. because its board changed. Does nothing if there is none.
+        Called for every posted ballot. The manifest on disk is checked, so snapshots built by other processes are
+        removed as well; elections without a snapshot cost one ``stat``.
+        Processes that still map the old files keep reading them until they notice the manifest is gone.
+        """
+        if not self.enabled or not os.path.exists(self._manifest_path(election_id)):
+            return
+        try:
+            os.remove(self._manifest_path(election_id))
+        except FileNotFoundError:
+            return
+        self._open.pop(election_id, None)
+        self._remove_files(election_id, keep=set())
+
+    def _remove_files(self, election_id, keep, build=""):
+        prefix = f"election_{election_id}-{build}"
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(".arrow") and name not in keep:
+                os.remove(os.path.join(self.directory, name))
+
+
+def write_rows(writer, rows, schema):
+    """Write a batch of row tuples to an Arrow IPC writer."""
+    writer.write_batch(pa.record_batch([list(column) for column in zip(*rows)], schema=schema))
+
+
+async def current_board_version(election_id):
+    """Return the current size of an election's Merkle log, which grows with every ballot posted to the board."""
+    async with db.pool.connection() as conn:
+        async with conn.cursor() as cur:
+            return await db.fetch_merkle_tree_size(cur, election_id) or 0
+
+
+snapshots = SnapshotStore(SNAPSHOT_DIR)
@@ -14,6 +14,7 @@ from modelsRA import BallotPayload
 import httpx
 import base64
 from coloursRA import CYAN, RED
+from fixedbaseRA import fixed_base, enc_vector
 
 async def generate_ballot0(voter_id, public_key_voter, candidates): 
     """Builds and Generate ballot0 for a voter. This is the initialisation ballot.
@@ -36,7 +37,7 @@ async def generate_ballot0(voter_id, public_key_voter, candidates):
     public_key_TS, public_key_VS = await fetch_public_keys_from_bb()
     r0 = ORDER.random()
     x = [0]*candidates
-    ct0 = [enc(GENERATOR, public_key_TS, x[j], r0) for j in range(candidates)]
+    ct0 = enc_vector(GENERATOR, public_key_TS, x, r0) # r0*g and r0*pk_TS are shared by all candidates
     ctl0 = enc(GENERATOR, public_key_VS, 0, r0)
     ctlid = ctl0 # ctlid is identical to ctlv for ballot 0 since it sets "ctl0 = ctlid = enc(pk_vs, 0, r)".
     ballot0 = (voter_id, public_key_voter, ct0, ctl0, ctlid, r0)
@@ -81,7 +82,7 @@ def enc(g, pk, m, r):
         tuple: Ciphertext pair(c0, c1).
     """
     c0 = r*g
-    c1 = m*g + r*pk
+    c1 = fixed_base(g).mul(m) + r*pk
     
     return (c0, c1)
 
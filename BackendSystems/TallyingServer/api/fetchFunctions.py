@@ -49,30 +49,33 @@ async def fetch_elgamal_params():
             raise HTTPException(status_code=502, detail=f"Unable to fetch elgamal params: {e}")
 
 
-async def fetch_last_ballot_ctvs_from_bb(election_id):
-    """Fetch the last ciphertext vote (ctv) from BB per voter in election.
+async def fetch_encrypted_aggregate_from_bb(election_id, GROUP):
+    """Fetch the per-candidate sum of the last ciphertext votes (ctv) of all voters in election from BB.
+
+    The BB keeps this sum up to date on every ballot insert, as ElGamal is additively homomorphic.
 
     Args:
-    election_id: Election identifier.
+        election_id: Election identifier.
+        GROUP: Petlib group used to decode points.
 
     Returns:
-        list: The value of ``last_ballot_ctvs`` returned by BB.
+        list[tuple[EcPt, EcPt]]: Summed ``(c0, c1)`` per candidate.
 
     HTTPException:
         If BB request fails.
     """
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://bb_api:8000/fetch_last_ballot_ctvs?election_id={election_id}")
+            response = await client.get(f"http://bb_api:8000/encrypted-aggregate?election_id={election_id}")
             response.raise_for_status() 
-          
+
             data = response.json()
-            last_ballot_ctvs = data["last_ballot_ctvs"]
-          
-            return last_ballot_ctvs
+            ctv_sums = [(EcPt.from_binary(base64.b64decode(c0), GROUP), EcPt.from_binary(base64.b64decode(c1), GROUP)) for c0, c1 in data["aggregate"]]
+
+            return ctv_sums
     except Exception as e:
-        print(f"{RED}Error fetching voters from BB {e}")
-        raise HTTPException(status_code=500, detail=f"{RED}Error fetching voters from BB: {str(e)}")
+        print(f"{RED}Error fetching encrypted aggregate from BB {e}")
+        raise HTTPException(status_code=500, detail=f"{RED}Error fetching encrypted aggregate from BB: {str(e)}")
     
 
 async def fetch_candidates_from_bb(election_id):
@@ -88,47 +91,47 @@ async def fetch_candidates_from_bb(election_id):
         If BB request fails.
     """
     try:
+        candidates_list: list = []
+        after_id = None
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://bb_api:8000/candidates?election_id={election_id}")
-            response.raise_for_status() 
-          
-            data = response.json()
-            candidates_list: list = []
-
-            for candidate in data["candidates"]:
-                candidates_list.append(candidate["id"])
-
-            return candidates_list
+            while True: # The BB returns the candidates in pages ordered by id.
+                params = {"election_id": election_id} if after_id is None else {"election_id": election_id, "after_id": after_id}
+                response = await client.get("http://bb_api:8000/candidates", params=params)
+                response.raise_for_status()
+
+                data = response.json()
+                for candidate in data["candidates"]:
+                    candidates_list.append(candidate["id"])
+
+                after_id = data.get("next")
+                if after_id is None:
+                    return candidates_list
     except Exception as e:
         print(f"{RED}Error fetching candidates from BB: {e}")
         raise HTTPException(status_code=500, detail=f"{RED}Error fetching candidates from BB: {str(e)}")     
 
 
-async def fetch_voters_from_bb(election_id):
-    """Fetch voter ids for an election from BB.
+async def fetch_voter_count_from_bb(election_id):
+    """Fetch the number of voters in an election from BB.
 
     Args:
         election_id: Election identifier.
 
     Returns:
-        list[int]: Voter id list.
+        int: Number of voters.
 
-    HTTPException<.
+    HTTPException:
         If BB request fails.
     """
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://bb_api:8000/voters?election_id={election_id}")
-            response.raise_for_status() 
-          
-            data = response.json()
-            voters = data["voters"]
-            voter_id_list = [v["id"] for v in voters]
-          
-            return voter_id_list
+            response = await client.get("http://bb_api:8000/voters/count", params={"election_id": election_id})
+            response.raise_for_status()
+
+            return response.json()["voter_count"]
     except Exception as e:
-        print(f"{RED}Error fetching voters from BB {e}")
-        raise HTTPException(status_code=500, detail=f"{RED}Error fetching voters from BB: {str(e)}")
+        print(f"{RED}Error fetching voter count from BB {e}")
+        raise HTTPException(status_code=500, detail=f"{RED}Error fetching voter count from BB: {str(e)}")
 
 
 async def fetch_electiondates_from_bb(election_id):
@@ -2,15 +2,14 @@
 
 This module:
 1) Wait until election end time (plus a configurable grace period).
-2) Fetch final encrypted vote ciphertexts from BB.
-3) Decrypt ciphertexts for each candidate using the TS secret key.
+2) Fetch the per-candidate sum of the final encrypted vote ciphertexts, kept up to date by BB.
+3) Decrypt the summed ciphertext for each candidate using the TS secret key.
 4) Determine vote counts by matching decrypted group elements.
 5) Generate a discrete-log representation proof (zksk DLRep) for each candidate.
 6) Post results + proofs to BB.
 """
 
 from zksk import Secret, base, DLRep
-from petlib.ec import EcPt
 import httpx
 from coloursTS import RED, PURPLE, CYAN, PINK
 import base64
@@ -18,8 +17,9 @@ from modelsTS import CandidateResult, ElectionResult
 import pytz
 from datetime import datetime
 import asyncio
-from fetchFunctions import fetch_candidates_from_bb, fetch_voters_from_bb, fetch_last_ballot_ctvs_from_bb, fetch_ts_secret_key, fetch_electiondates_from_bb, fetch_elgamal_params
+from fetchFunctions import fetch_candidates_from_bb, fetch_voter_count_from_bb, fetch_encrypted_aggregate_from_bb, fetch_ts_secret_key, fetch_electiondates_from_bb, fetch_elgamal_params
 import time
+from fixedbaseTS import fixed_base
 
 async def handle_election(election_id):
     """Waits for an election to finish, then tally and publish the result.
@@ -60,28 +60,24 @@ async def tally(election_id):
     GROUP, GENERATOR, ORDER = await fetch_elgamal_params()
     candidates = await fetch_candidates_from_bb(election_id)
     candidates_length = len(candidates)
-    voters_length = len(await fetch_voters_from_bb(election_id))
+    voters_length = await fetch_voter_count_from_bb(election_id)
     sk_TS = fetch_ts_secret_key()
-    last_ballots_ctvs_b64: list = await fetch_last_ballot_ctvs_from_bb(election_id)
-    last_ballots_ctvs = convert_to_ecpt(last_ballots_ctvs_b64, GROUP)
+    ctv_sums = await fetch_encrypted_aggregate_from_bb(election_id, GROUP)
     sk=Secret(value=sk_TS)
     stmt, nizk=[], []
     votes_for_candidate=[0]*candidates_length
     
     for i in range(candidates_length):
-        c0, c1 = (0*GENERATOR), (0*GENERATOR)
-
-        #summing up all encrypted votes for a candidate
-        for j in range(voters_length):
-            c0+= last_ballots_ctvs[j][i][0]
-            c1+= last_ballots_ctvs[j][i][1]
+        #summed up encrypted votes for a candidate
+        c0, c1 = ctv_sums[i]
         sum_votes=dec((c0,c1), sk_TS)
 
-        #finding the number of votes for a candidate
-        for j in range(voters_length):
-            if sum_votes==j*GENERATOR:
-                votes_for_candidate[i]=j
-                break
+        #finding the number of votes for a candidate in the table of multiples of the generator
+        j = fixed_base(GENERATOR).log(sum_votes, voters_length)
+        if j is not None:
+            votes_for_candidate[i]=j
+        else:
+            j = voters_length-1
 
         print(f"{PURPLE}Votes for Candidate", candidates[i],":", votes_for_candidate[i])
         
@@ -122,7 +118,7 @@ def stmt_tally(generator, order, votes, c0, c1, sk_TS):
     """
     one=Secret(value=1)
     neg_c0 = (-1)*c0
-    return DLRep(votes*generator, one*c1 + sk_TS*neg_c0)
+    return DLRep(fixed_base(generator).mul(votes), one*c1 + sk_TS*neg_c0)
 
 def dec(ct, sk):
     """Decrypt an ElGamal ciphertext under secret key ``sk``.
@@ -139,36 +135,6 @@ def dec(ct, sk):
 
     return message
 
-def convert_to_ecpt(ctv_list, GROUP):
-    """Convert a base64 ciphertext list to EC points.
-
-    Args:
-        ctv_list: Ciphertext structure as base64 strings:
-        ``[ [ [ct0_b64, ct1_b64], ... per candidate ], ... per voter ]``.
-        group: Petlib group used to decode points.
-
-    Returns:
-        list[list[tuple[EcPt, EcPt]]]: Ciphertexts converted to ``EcPt`` pairs.
-    """
-    # Converting to binary
-    ctv_bin = []
-    for ctvs in ctv_list: # for each voter
-        decoded_pairs = []
-        for ct0, ct1 in ctvs: # for the ciphertext pairs for each candidate
-            decoded_pairs.append((base64.b64decode(ct0), base64.b64decode(ct1)))
-        ctv_bin.append(decoded_pairs)
-
-    # Converting to ecpt
-    ctv_ecpt = []
-    for ctvs in ctv_bin: # for each voter ctv-list
-        decoded_pairs = []
-        for ct0, ct1 in ctvs: # for the ciphertext pairs for each candidate
-            decoded_pairs.append((EcPt.from_binary(ct0, GROUP), EcPt.from_binary(ct1, GROUP)))
-        ctv_ecpt.append(decoded_pairs)
-    
-    return ctv_ecpt
-
-
 async def send_result_to_bb(election_result: ElectionResult):
     """Send the final election result (and proofs) to BB.
 
@@ -3,18 +3,20 @@ FastAPI service for the Voting Server (VS).
 
 This module initializes the VS subsystem, manages lifecycle setup,
 handles incoming ballots, communicates with the Bulletin Board (BB),
-and persists voting-related data in two DuckDB tables.
+and persists voting-related data in two tables of the VS store (storeVS).
 """
 from fastapi import FastAPI
 import asyncio
 from keygen import send_public_key_to_BB
 from modelsVS import BallotPayload, Ballot
 from contextlib import asynccontextmanager
-import duckdb
-from epochHandling import update_time, prepare_election
+from epochHandling import prepare_election
+from scheduler import scheduler
+from schedules import schedules
+from storeVS import store
+from randomnessPool import randomness
 import json
 from coloursVS import RED, CYAN
-from lock import duckdb_lock
 from fetchFunctions import fetch_image_filename, fetch_electiondates_from_bb
 import pytz
 from datetime import datetime
@@ -23,21 +25,26 @@ from datetime import datetime
 async def lifespan(app: FastAPI):
     """Manages application startup and shutdown events.
 
-    On startup, this function initializes the DuckDB database schema
-    and starts a background task for keeping track of current time. Control is
+    On startup, this function opens the VS store, initializes its schema
+    and starts the scheduler that casts ballots during elections together with
+    the checkpointing of the in-memory voter schedules and the refilling of
+    the obfuscation randomness pool. Control is
     yielded back to FastAPI once initialization is complete.
 
     Args:
         app (FastAPI): The FastAPI application instance.
     """
-    conn = duckdb.connect("/duckdb/voter-data.duckdb")
-    conn.sql("DROP TABLE IF EXISTS VoterTimestamps")
-    conn.sql("DROP TABLE IF EXISTS PendingVotes")
-    conn.sql("CREATE TABLE VoterTimestamps(VoterID INTEGER, ElectionID INTEGER, Timestamp TIMESTAMPTZ, Processed BOOLEAN, ImagePath TEXT)" )
-    conn.sql("CREATE TABLE PendingVotes(VoterID INTEGER, ElectionID INTEGER, PublicKey TEXT, ctv TEXT, ctlv TEXT, ctlid TEXT, Proof TEXT)")
+    await store.start()
+    await store.create_tables()
 
-    asyncio.create_task(update_time())
+    await schedules.start()
+    await randomness.start()
+    await scheduler.start()
     yield
+    await scheduler.stop()
+    await randomness.stop()
+    await schedules.stop()
+    await store.stop()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -46,6 +53,16 @@ def health():
     """Return status response indicating the service is running."""
     return {"ok": True}
 
+@app.get("/scheduler")
+def scheduler_stats():
+    """Return the number of scheduled ballots and the scheduling lag since startup."""
+    return scheduler.stats()
+
+@app.get("/randomness-pool")
+def randomness_pool_stats():
+    """Return the size of the obfuscation randomness pool and how often it was found empty."""
+    return randomness.stats()
+
 @app.get("/vs_resp")
 async def vs_resp():
     """Handle Bulletin Board (BB) notification for parameter availability.
@@ -103,16 +120,12 @@ async def receive_ballot(pyBallot: Ballot):
         print(f"{RED}Election not active, rejecting ballot")
         return {"image": "Ballot rejected"}
     try:
-        async with duckdb_lock: # lock is acquired to check if access should be allowed, lock while accessing ressource and is then released before returning  
-            conn = duckdb.connect("/duckdb/voter-data.duckdb")
-            ctv = json.dumps(pyBallot.ctv) # json string of base64 encoding
-            ctlv = json.dumps(pyBallot.ctlv)
-            ctlid = json.dumps(pyBallot.ctlid)
-            conn.execute("INSERT INTO PendingVotes (VoterID, ElectionID, PublicKey, ctv, ctlv, ctlid, Proof) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                         (pyBallot.voterid, pyBallot.electionid, pyBallot.upk, ctv, ctlv, ctlid, pyBallot.proof)) 
-            conn.close()
+        ctv = json.dumps(pyBallot.ctv) # json string of base64 encoding
+        ctlv = json.dumps(pyBallot.ctlv)
+        ctlid = json.dumps(pyBallot.ctlid)
+        await store.save_pending_vote(pyBallot.voterid, pyBallot.electionid, pyBallot.upk, ctv, ctlv, ctlid, pyBallot.proof)
         image_filename = await fetch_image_filename(pyBallot.electionid, pyBallot.voterid)
         return {"image": image_filename}
     except Exception as e:
-        print(f"{RED}error writing ballot to duckdb for voter {pyBallot.voterid} in election {pyBallot.electionid}: {e}")
+        print(f"{RED}error storing ballot for voter {pyBallot.voterid} in election {pyBallot.electionid}: {e}")
 
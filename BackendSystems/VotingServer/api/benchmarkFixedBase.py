@@ -0,0 +1,83 @@
+"""
+Benchmark of the fixed-base precomputation (fixedbaseVS) against plain petlib point multiplication.
+
+The script times, per operation:
+- encrypting the vote vector of a ballot (VA vote casting, RA ballot 0), one ciphertext per candidate,
+- the zero point compared against when obfuscating (VS): ``0*g`` against ``GROUP.infinite()``,
+- finding the vote count of one candidate from the decrypted sum (TS tallying), for a count near the
+  number of voters, which is the worst case of the linear search.
+
+Usage (inside any service container or any environment with petlib):
+    python benchmarkFixedBase.py --candidates 3 --voters 1000 --rounds 200
+"""
+import argparse
+import time
+from petlib.ec import EcGroup
+from coloursVS import PINK
+from fixedbaseVS import fixed_base, enc_vector
+
+
+def enc(g, pk, m, r):
+    return (r*g, m*g + r*pk)
+
+
+def timed(function, rounds):
+    """Return the average duration of ``function()`` in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return round((time.perf_counter() - start) / rounds * 1000, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fixed-base precomputation tables.")
+    parser.add_argument("--candidates", type=int, default=3)
+    parser.add_argument("--voters", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    group = EcGroup()
+    g = group.generator()
+    order = group.order()
+    pk = order.random() * g
+    votes = [1] + [0] * (args.candidates - 1)
+    r = order.random()
+    count = args.voters - 1
+    tally_point = count * g
+
+    start = time.perf_counter()
+    table = fixed_base(g)
+    table.log(g, args.voters)
+    print(f"{PINK}table of {args.voters} multiples built in {round((time.perf_counter() - start) * 1000, 2)} ms")
+
+    assert enc_vector(g, pk, votes, r) == [enc(g, pk, m, r) for m in votes]
+    assert table.log(tally_point, args.voters) == count
+
+    def linear_search():
+        for j in range(args.voters):
+            if tally_point == j*g:
+                return j
+
+    results = {
+        f"vote encryption, {args.candidates} candidates": (
+            timed(lambda: [enc(g, pk, m, r) for m in votes], args.rounds),
+            timed(lambda: enc_vector(g, pk, votes, r), args.rounds),
+        ),
+        "zero point (group.infinite)": (
+            timed(lambda: 0*g, args.rounds),
+            timed(group.infinite, args.rounds),
+        ),
+        f"tally count {count}": (
+            timed(linear_search, max(1, args.rounds // 100)),
+            timed(lambda: table.log(tally_point, args.voters), args.rounds),
+        ),
+    }
+
+    width = max(len(step) for step in results)
+    print(f"{PINK}{'ms':<{width}}{'petlib':>12}{'fixed base':>12}")
+    for step, (plain, precomputed) in results.items():
+        print(f"{PINK}{step:<{width}}{plain:>12}{precomputed:>12}")
+
+
+if __name__ == "__main__":
+    main()
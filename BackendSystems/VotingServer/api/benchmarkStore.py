@@ -0,0 +1,111 @@
+"""
+Benchmark of the Voting Server store backends (storeVS) on the schedule and pending-vote workload.
+
+For each backend the script times:
+- inserting the timestamps of all voters when an election is prepared,
+- loading the unprocessed timestamps of the election (schedule recovery),
+- checkpoints marking one consumed timestamp per voter as processed,
+- voter-cast ballots being saved and taken concurrently, and taking from voters without a pending ballot
+  (the obfuscation case, which is the common one).
+
+Usage (inside the vs_api container or any environment with the VS requirements):
+    python benchmarkStore.py --voters 2000 --timestamps 200 --backends duckdb sqlite memory
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from coloursVS import PINK
+from storeVS import open_store
+
+ELECTION_ID = 1
+START = 1_767_225_600.0 # Start of the benchmark election in seconds since the epoch.
+
+
+def timestamp_rows(voters, timestamps):
+    return [
+        (voter_id, ELECTION_ID, START + 10 * i + voter_id % 10, f"image_{(voter_id + i) % 1100}.jpg")
+        for voter_id in range(voters)
+        for i in range(timestamps)
+    ]
+
+
+async def benchmark(backend, directory, voters, timestamps, checkpoints, pending):
+    """
+    Run the workload on one backend.
+    Returns:
+        dict: Duration of each step in milliseconds.
+    """
+    path = os.path.join(directory, f"benchmark.{backend}")
+    store = open_store(backend, path)
+    await store.start()
+    results = {}
+    try:
+        await store.create_tables()
+        rows = timestamp_rows(voters, timestamps)
+
+        start = time.perf_counter()
+        await store.insert_timestamps(rows)
+        results["insert timestamps"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = await store.load_timestamps(ELECTION_ID)
+        results["load schedule"] = time.perf_counter() - start
+        assert len(loaded) == len(rows), f"{backend} loaded {len(loaded)} of {len(rows)} timestamps"
+
+        voter_ids = list(range(voters))
+        election_ids = [ELECTION_ID] * voters
+        start = time.perf_counter()
+        for i in range(checkpoints):
+            await store.mark_processed(voter_ids, election_ids, [START + 10 * i + voter_id % 10 for voter_id in voter_ids])
+        results["checkpoint (avg)"] = (time.perf_counter() - start) / checkpoints
+        assert len(await store.load_timestamps(ELECTION_ID)) == len(rows) - checkpoints * voters
+
+        ciphertexts = json.dumps(["A" * 44] * 4)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            store.save_pending_vote(voter_id, ELECTION_ID, "key", ciphertexts, ciphertexts, ciphertexts, "proof")
+            for voter_id in range(pending)
+        ))
+        results["save pending vote (per vote)"] = (time.perf_counter() - start) / pending
+
+        start = time.perf_counter()
+        taken = await asyncio.gather(*(store.take_pending_vote(voter_id, ELECTION_ID) for voter_id in range(pending)))
+        results["take pending vote (per vote)"] = (time.perf_counter() - start) / pending
+        assert all(taken), f"{backend} lost pending votes"
+
+        start = time.perf_counter()
+        await asyncio.gather(*(store.take_pending_vote(voter_id, ELECTION_ID) for voter_id in range(pending)))
+        results["take without pending vote (per voter)"] = (time.perf_counter() - start) / pending
+    finally:
+        await store.stop()
+    return {step: round(seconds * 1000, 3) for step, seconds in results.items()}
+
+
+async def run(args):
+    directory = args.dir or tempfile.mkdtemp(prefix="vs-store-")
+    print(f"{PINK}{args.voters} voters x {args.timestamps} timestamps, {args.checkpoints} checkpoints, {args.pending} pending votes, files in {directory}")
+    results = {backend: await benchmark(backend, directory, args.voters, args.timestamps, args.checkpoints, args.pending) for backend in args.backends}
+
+    steps = list(next(iter(results.values())))
+    width = max(len(step) for step in steps)
+    print(f"{PINK}{'ms':<{width}}" + "".join(f"{backend:>12}" for backend in args.backends))
+    for step in steps:
+        print(f"{PINK}{step:<{width}}" + "".join(f"{results[backend][step]:>12}" for backend in args.backends))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Voting Server store backends.")
+    parser.add_argument("--backends", nargs="+", default=["duckdb", "sqlite", "memory"], choices=["duckdb", "sqlite", "memory"])
+    parser.add_argument("--voters", type=int, default=2000)
+    parser.add_argument("--timestamps", type=int, default=200, help="timestamps per voter")
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--pending", type=int, default=1000, help="voter-cast ballots saved and taken")
+    parser.add_argument("--dir", default="", help="directory for the database files, a temporary directory by default")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,39 +4,37 @@ ballot-casting throughout the election.
 
 It is responsible for:
 - Preparing elections by generating CBR ballot timestamps per voter.
-- Managing asynchronous ballot casting for each voter during the election period.
+- Scheduling ballot casting for each voter during the election period on the central scheduler.
 - Reconstructing and validating voter-cast ballots.
 - Generating obfuscating ballots.
 - Sending ballots to the Bulletin Board (BB).
-- Persisting and retrieving voter timestamps and pending votes using DuckDB.
+- Persisting voter timestamps and pending votes in the VS store, and serving timestamps from in-memory schedules.
 - Assigning image paths to each vote timestamp.
 """
 import httpx
-import duckdb
 import asyncio
 from datetime import datetime, timezone, timedelta
 from validateBallot import obfuscate, validate_ballot
-from modelsVS import Ballot, BallotPayload
+from modelsVS import Ballot, BallotPayload, BallotList, BallotReceiptList
 from fastapi import HTTPException 
 import json
-import pytz
 from coloursVS import RED, CYAN, GREEN, PURPLE, YELLOW, PINK
-from lock import duckdb_lock
-from fetchFunctions import fetch_electiondates_from_bb
+from fetchFunctions import fetch_electiondates_from_bb, fetch_elgamal_params, fetch_public_keys_from_bb
 from epochGeneration import generate_timestamps, assign_images_for_timestamps
 import time
+import os
+from hashVS import hash_ballot
+from scheduler import scheduler
+from schedules import schedules
+from storeVS import store
+from randomnessPool import randomness
 
 e_time_obf_incl_network = [] # For performance measurements of obfuscation including network calls.
 
-tz = pytz.timezone('Europe/Copenhagen')
-current_time = datetime.now(tz)
-
-async def update_time():
-    """Update the global current_time variable once per second, rounded to nearest second. Runs as a background task."""
-    global current_time
-    while True:
-        current_time = round_seconds_timestamps(datetime.now(tz))
-        await asyncio.sleep(1)
+BB_POST_RETRIES = int(os.getenv("VS_BB_POST_RETRIES", "3")) # Retries of a ballot post after a connection or server error.
+BB_POST_RETRY_DELAY_S = float(os.getenv("VS_BB_POST_RETRY_DELAY_S", "0.5")) # Delay before the first retry, doubled for each further retry.
+FINAL_BALLOTS_WINDOW_MS = float(os.getenv("VS_FINAL_BALLOTS_WINDOW_MS", "100")) # Final obfuscation ballots within this window share one BB request.
+FINAL_BALLOTS_MAX_BATCH = int(os.getenv("VS_FINAL_BALLOTS_MAX_BATCH", "200"))
 
 async def prepare_election(payload: BallotPayload):
     """
@@ -45,7 +43,7 @@ async def prepare_election(payload: BallotPayload):
     This function:
     - Generates timestamps for all voters
     - Sends ballot0 for each voter to the Bulletin Board
-    - Starts asynchronous ballot-casting tasks for each voter
+    - Schedules the first ballot of each voter on the central scheduler
 
     Args:
         payload (BallotPayload): Payload containing ballot0 data and election ID.
@@ -68,60 +66,87 @@ async def prepare_election(payload: BallotPayload):
         )
         await send_ballot0_to_bb(pyBallot)
 
-    # After sending ballot 0 we create an asynchronous task for handling vote-casting to each voters CBR.
+    # After sending ballot 0 each voter's next timestamp is put on the central scheduler, which casts the ballot
+    # and schedules the following one.
     start, end = await fetch_electiondates_from_bb(payload.electionid)
+    time_until_start_election = (start - datetime.now(timezone.utc)).total_seconds()
+    print(f"{CYAN}Time until election starts: {time_until_start_election}")
+    await prepare_randomness()
+    next_timestamps = await fetch_next_timestamps_for_election(payload.electionid)
     for ballot in payload.ballot0list:
-        asyncio.create_task(timestamp_management(ballot.voterid, payload.electionid, start, end))
+        schedule_next_ballot(ballot.voterid, payload.electionid, next_timestamps.get(ballot.voterid), start, end)
 
-async def timestamp_management(voter_id, election_id, start, end):
+async def prepare_randomness():
+    """Start precomputing the randomness of obfuscation ballots for the current generator and TS/VS public keys."""
+    try:
+        _, GENERATOR, ORDER = await fetch_elgamal_params()
+        pk_TS, pk_VS = await fetch_public_keys_from_bb()
+        randomness.prepare(GENERATOR, ORDER, pk_TS, pk_VS)
+    except Exception as e: # obfuscation computes its randomness on the spot while the pool is empty
+        print(f"{RED}error preparing the randomness pool: {e}")
+
+def schedule_next_ballot(voter_id, election_id, next_timestamp, start, end):
     """
-    Manage ballot casting for a single voter over the election period.
+    Schedule the next ballot of a voter.
 
-    This coroutine waits until the election starts, then repeatedly checks
-    for the next scheduled timestamp and casts ballots accordingly until
-    the election ends.
+    Timestamps inside the election period are cast by ``cast_scheduled_vote``. Once the next
+    timestamp lies after the election end, the final obfuscation ballot is scheduled one second
+    after the end instead.
 
     Args:
         voter_id: Identifier of the voter.
         election_id: Identifier of the election.
+        next_timestamp (datetime | None): Next unprocessed timestamp of the voter.
         start (datetime): Election start time.
         end (datetime): Election end time.
     """
-    time_until_start_election = (start-current_time).total_seconds()
-    print(f"{CYAN}Time until election starts: {time_until_start_election}")
-    await asyncio.sleep(time_until_start_election+1) # adding one second to ensure we don't check until after election start date
+    if not next_timestamp:
+        print(f"{RED}No timestamps for voter {voter_id}")
+        return
 
-    while current_time >= start and current_time <= end: 
-        next_timestamp = await fetch_next_timestamp_for_voter(voter_id, election_id)
+    if next_timestamp > end:
+        print(f"{PURPLE}Waiting for election end for voter {voter_id}")
+        scheduler.schedule(end + timedelta(seconds=1), send_final_obfuscation_ballot, voter_id, election_id) # adding one second to ensure we are outside of the election period
+        return
 
-        if not next_timestamp:
-            print(f"{RED}No timestamps for voter {voter_id}")
-            break
+    scheduler.schedule(max(next_timestamp, start), cast_scheduled_vote, voter_id, election_id, start, end)
 
-        if next_timestamp > end:
-            print(f"{PURPLE}Waiting for election end for voter {voter_id}")
-            time_until_end = (end - current_time).total_seconds()
-            await asyncio.sleep(time_until_end +1) # adding one second to ensure we are outside of the election period
-            break
+async def cast_scheduled_vote(voter_id, election_id, start, end):
+    """
+    Cast the ballot of a voter whose timestamp has been reached and schedule the next one.
 
-        time_until_next_timestamp = (next_timestamp-current_time).total_seconds()
-        await asyncio.sleep(time_until_next_timestamp)
+    Args:
+        voter_id: Identifier of the voter.
+        election_id: Identifier of the election.
+        start (datetime): Election start time.
+        end (datetime): Election end time.
+    """
+    print(f"{GREEN}Reached timestamp for voter {voter_id}")
+    await cast_vote(voter_id, election_id)
+    # ballot_validated = await cast_vote(voter_id, election_id)
+    # if ballot_validated == False
+    #   async call to frontend with voterid + ballot?
+    next_timestamp = await fetch_next_timestamp_for_voter(voter_id, election_id)
+    schedule_next_ballot(voter_id, election_id, next_timestamp, start, end)
+
+async def send_final_obfuscation_ballot(voter_id, election_id):
+    """
+    Send the last obfuscation ballot of a voter after the election has ended.
 
-        print(f"{GREEN}Reached timestamp {next_timestamp} for voter {voter_id}")
-        await cast_vote(voter_id, election_id)
-        # ballot_validated = await cast_vote(voter_id, election_id)
-        # if ballot_validated == False
-        #   async call to frontend with voterid + ballot?
-    
-    if current_time > end:
-        print(f"{PURPLE}election over for election {election_id}")
+    Args:
+        voter_id: Identifier of the voter.
+        election_id: Identifier of the election.
+    """
+    print(f"{PURPLE}election over for election {election_id}")
+    if e_time_obf_incl_network:
         print(f"{PINK}Ballot obfuscation time including network calls (avg):", round(sum(e_time_obf_incl_network)/len(e_time_obf_incl_network)/1000000,3), "ms")
-        try: 
-            last_obf_ballot = await obfuscate(voter_id, election_id)
-            await send_ballot_to_bb(last_obf_ballot)
-            print(f"{YELLOW}Final obfuscation ballot sent to bb for voter {voter_id}.")
-        except Exception as e:
-            print(f"{RED}Error creating/sending final obfuscation ballot for voter {voter_id}: {e}")
+    try: 
+        last_obf_ballot = await obfuscate(voter_id, election_id)
+        # The final ballots of all voters are due at the same time, so they are posted to the BB in batches.
+        await send_ballot_to_bb(last_obf_ballot, batched=True)
+        print(f"{YELLOW}Final obfuscation ballot sent to bb for voter {voter_id}.")
+    except Exception as e:
+        print(f"{RED}Error creating/sending final obfuscation ballot for voter {voter_id}: {e}")
 
 async def cast_vote(voter_id, election_id):
     """
@@ -140,15 +165,10 @@ async def cast_vote(voter_id, election_id):
         False if validation failed, or None if an error occurred.
     """
     try:
-        async with duckdb_lock: # lock is acquired to check if access should be allowed, lock while accessing ressource and is then released before returning  
-            conn = duckdb.connect("/duckdb/voter-data.duckdb")
-            row = conn.execute("""
-                    SELECT PublicKey, ctv, ctlv, ctlid, Proof
-                    FROM PendingVotes
-                    WHERE VoterID = ? AND ElectionID = ?
-                    """, (voter_id, election_id)).fetchone()
-        
-        # Check DuckDB table "PendingVotes" to see if a voter-cast ballot has been received from the Voting App.
+        # The pending ballot is removed from the store when it is taken, whether it validates or not.
+        row = await store.take_pending_vote(voter_id, election_id)
+
+        # Check table "PendingVotes" to see if a voter-cast ballot has been received from the Voting App.
         if not row or all(x is None for x in row): # If no voter-cast ballot has been received an obfuscation ballot is sent to the BB.
             s_time_obf_incl_network = time.process_time_ns() # Performance timing for ballot obfuscation including network calls
             obf_ballot = await obfuscate(voter_id, election_id)
@@ -158,9 +178,6 @@ async def cast_vote(voter_id, election_id):
             public_key, ct_v, ct_lv, ct_lid, proof = row
             pyballot:Ballot = construct_ballot(voter_id, public_key, ct_v, ct_lv, ct_lid, proof, election_id)
             ballot_validated = await validate_ballot(pyballot)
-            # Once ballot is constructed as a pydantic ballot and validated, the data is deleted from the DuckDB table.
-            conn.execute("DELETE FROM PendingVotes WHERE VoterID = ? AND ElectionID = ?", (voter_id, election_id))
-            conn.close()
 
             if ballot_validated:
                 await send_ballot_to_bb(pyballot)
@@ -208,7 +225,7 @@ def construct_ballot(voter_id, public_key, ct_v, ct_lv, ct_lid, proof, election_
 
 async def fetch_next_timestamp_for_voter(voter_id, election_id):
     """
-    Fetch the next unprocessed timestamp for a voter.
+    Fetch the next unprocessed timestamp for a voter from the in-memory schedules.
 
     Args:
         voter_id: Identifier of the voter.
@@ -217,28 +234,27 @@ async def fetch_next_timestamp_for_voter(voter_id, election_id):
     Returns:
         datetime | None: Next timestamp or None if none remain.
     """
+    entry = await schedules.peek(election_id, voter_id)
+    return entry[0] if entry else None
+
+async def fetch_next_timestamps_for_election(election_id):
+    """
+    Fetch the next unprocessed timestamp of every voter in an election from the in-memory schedules.
+
+    Args:
+        election_id: Identifier of the election.
+
+    Returns:
+        dict: Next timestamp per voter ID.
+    """
     try:
-        async with duckdb_lock: # lock is acquired to check if access should be allowed, locked while accessing ressource and is then released before returning  
-            conn = duckdb.connect("/duckdb/voter-data.duckdb")
-            row = conn.execute("""
-                    SELECT Timestamp
-                    FROM VoterTimestamps
-                    WHERE VoterID = ? AND ElectionID = ? AND  Processed = false
-                    ORDER BY Timestamp ASC
-                    LIMIT 1
-            """, (voter_id, election_id)).fetchone()
-
-            if row is None:
-                return None
-            
-            (timestamp,) = row
-            
-            return timestamp
+        return await schedules.next_timestamps(election_id)
     except Exception as e:
-        print(f"{RED}error fetching next timestamp from duckdb for voter {voter_id} in election {election_id}: {e}")
+        print(f"{RED}error fetching next timestamps for election {election_id}: {e}")
+        return {}
 
 
-async def send_ballot_to_bb(pyBallot:Ballot):
+async def send_ballot_to_bb(pyBallot:Ballot, batched=False):
     """
     Send a ballot to the Bulletin Board.
 
@@ -246,9 +262,11 @@ async def send_ballot_to_bb(pyBallot:Ballot):
 
     Args:
         pyBallot (Ballot): Ballot to send.
+        batched (bool): Post the ballot together with other ballots sent at the same time through
+            ``/receive-ballots`` (see ``BallotBatcher``) instead of on its own.
 
     Returns:
-        dict: JSON response from the Bulletin Board.
+        dict: JSON response from the Bulletin Board, or the ballot id if ``batched``.
 
     Raises:
         HTTPException: If sending the ballot fails.
@@ -260,21 +278,159 @@ async def send_ballot_to_bb(pyBallot:Ballot):
     pyBallot.imagepath = image_path
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post("http://bb_api:8000/receive-ballot", content = pyBallot.model_dump_json())
-            response.raise_for_status() # gets http status code
-            print(f"{GREEN}ballot sent to BB for voter {pyBallot.voterid}")
-            return response.json()
+        if batched:
+            response_json = await ballot_batcher.send(pyBallot)
+        else:
+            response_json = await post_ballot_to_bb("receive-ballot", pyBallot)
+        print(f"{GREEN}ballot sent to BB for voter {pyBallot.voterid}")
+        return response_json
     except Exception as e:
         print(f"{RED}Error sending ballot: {e}")
         raise HTTPException(status_code=500, detail=f"{RED}Failed to send ballot to BB: {str(e)}") 
     
 
+async def post_ballot_to_bb(endpoint, pyBallot: Ballot):
+    """
+    Post a ballot to the Bulletin Board, retrying after connection errors and server errors.
+
+    The ballot hash is sent along as idempotency key: if a post was stored but its response was lost,
+    the retry returns the stored ballot instead of adding the ballot to the CBR twice.
+
+    Args:
+        endpoint (str): BB endpoint, "receive-ballot" or "receive-ballot0".
+        pyBallot (Ballot): Ballot to send, with timestamp and image path set.
+
+    Returns:
+        dict: JSON response from the Bulletin Board.
+
+    Raises:
+        httpx.HTTPError: If the post still fails after the last retry, or is rejected by the BB.
+    """
+    pyBallot.hash = hash_ballot(pyBallot)
+    return await post_to_bb_with_retries(endpoint, pyBallot.model_dump_json(), f"the ballot of voter {pyBallot.voterid}")
+
+
+async def post_ballots_to_bb(ballots: list[Ballot]):
+    """
+    Post a batch of ballots to the Bulletin Board in one request, retrying after connection errors and server errors.
+
+    The BB stores the ballots in one transaction. Like single posts, the batch is idempotent on the ballot hashes.
+
+    Args:
+        ballots (list[Ballot]): Ballots to send, with timestamp and image path set.
+
+    Returns:
+        BallotReceiptList: Ballot id or error of each ballot, in the order they were posted.
+
+    Raises:
+        httpx.HTTPError: If the post still fails after the last retry, or is rejected by the BB.
+    """
+    for pyBallot in ballots:
+        pyBallot.hash = hash_ballot(pyBallot)
+    response_json = await post_to_bb_with_retries("receive-ballots", BallotList(ballots=ballots).model_dump_json(), f"a batch of {len(ballots)} ballots")
+    return BallotReceiptList(**response_json)
+
+
+async def post_to_bb_with_retries(endpoint, content, description):
+    """
+    Post a JSON body to a Bulletin Board endpoint, retrying after connection errors and server errors.
+
+    Args:
+        endpoint (str): BB endpoint.
+        content (str): JSON body.
+        description (str): What is posted, for the log.
+
+    Returns:
+        dict: JSON response from the Bulletin Board.
+
+    Raises:
+        httpx.HTTPError: If the post still fails after the last retry, or is rejected by the BB.
+    """
+    async with httpx.AsyncClient() as client:
+        for attempt in range(BB_POST_RETRIES + 1):
+            try:
+                response = await client.post(f"http://bb_api:8000/{endpoint}", content = content)
+                if response.status_code < 500 or attempt == BB_POST_RETRIES:
+                    response.raise_for_status() # client errors are not retried
+                    return response.json()
+                print(f"{RED}BB returned {response.status_code} for {description}, retrying")
+            except httpx.TransportError as e:
+                if attempt == BB_POST_RETRIES:
+                    raise
+                print(f"{RED}posting {description} to BB failed, retrying: {e}")
+            await asyncio.sleep(BB_POST_RETRY_DELAY_S * 2 ** attempt)
+
+
+class BallotBatcher:
+    """Coalesces ballots sent to the BB at the same time into ``POST /receive-ballots`` requests.
+
+    The final obfuscation ballots of all voters are due one second after the election end. They are collected
+    for ``VS_FINAL_BALLOTS_WINDOW_MS`` and posted in chunks of ``VS_FINAL_BALLOTS_MAX_BATCH`` ballots, each
+    stored by the BB in one transaction, instead of one request and transaction per ballot.
+    """
+
+    def __init__(self, window_ms, max_batch):
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: list = [] # (ballot, future) in arrival order
+        self._tasks: set = set() # Flush tasks, referenced until they are done so they are not garbage-collected.
+
+    async def send(self, pyBallot: Ballot):
+        """
+        Post a ballot to the BB, sharing the request with the ballots sent in the same window.
+
+        Args:
+            pyBallot (Ballot): Ballot to send, with timestamp and image path set.
+
+        Returns:
+            int: Id of the stored ballot.
+
+        Raises:
+            HTTPException: If the BB rejected the ballot.
+            httpx.HTTPError: If the batch could not be posted.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if not self._pending:
+            task = asyncio.create_task(self._flush_after_window())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._pending.append((pyBallot, future))
+
+        return await future
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window_s)
+        pending, self._pending = self._pending, []
+        await asyncio.gather(*[
+            self._post_chunk(pending[i:i + self.max_batch])
+            for i in range(0, len(pending), self.max_batch)
+        ])
+
+    async def _post_chunk(self, chunk):
+        try:
+            receipts = (await post_ballots_to_bb([pyBallot for pyBallot, _ in chunk])).receipts
+        except Exception as e:
+            receipts, error = None, e
+
+        for idx, (pyBallot, future) in enumerate(chunk):
+            if future.done(): # The sender was cancelled.
+                continue
+            if receipts is None:
+                future.set_exception(error)
+            elif receipts[idx].error is not None:
+                future.set_exception(HTTPException(status_code=500, detail=f"BB rejected the ballot of voter {pyBallot.voterid}: {receipts[idx].error}"))
+            else:
+                future.set_result(receipts[idx].ballotid)
+
+
+ballot_batcher = BallotBatcher(FINAL_BALLOTS_WINDOW_MS, FINAL_BALLOTS_MAX_BATCH)
+
+
 async def fetch_ballot_timestamp_and_imagepath(election_id, voter_id):
     """
-    Fetch and mark the next unprocessed timestamp and image-path for a ballot.
-    Progress is tracked through the database column "Processed". The next row
-    with "Processed = false" is fetched and Processed is set to true afterwards.
+    Fetch and consume the next unprocessed timestamp and image-path for a ballot.
+    Progress is tracked in the in-memory schedules and checkpointed to the
+    database column "Processed" in batches.
 
     Args:
         election_id: Identifier of the election.
@@ -283,28 +439,10 @@ async def fetch_ballot_timestamp_and_imagepath(election_id, voter_id):
     Returns:
         tuple[datetime, str]: Timestamp and image path.
     """
-    try:
-        async with duckdb_lock: # lock is acquired to check if access should be allowed, locked while accessing ressource and is then released before returning  
-            conn = duckdb.connect("/duckdb/voter-data.duckdb")
-            # Fetch next unprocessed row (Processed = false)
-            ballot_timestamp, image_path = conn.execute("""
-                    SELECT Timestamp, ImagePath
-                    FROM VoterTimestamps
-                    WHERE VoterID = ? AND ElectionID = ? AND Processed = false
-                    ORDER BY Timestamp ASC
-                    LIMIT 1
-                    """, (voter_id, election_id)).fetchone()
-            
-            # Set processed column to true for the fetched timestamp:
-            conn.execute("""
-                UPDATE VoterTimestamps
-                SET Processed = TRUE
-                WHERE VoterID = ? AND ElectionID = ? AND Timestamp = ?
-            """, (voter_id, election_id, ballot_timestamp))
-
-            return ballot_timestamp, image_path
-    except Exception as e:
-        print(f"{RED}error fetching timestamp from duckdb for voter {voter_id} in election {election_id}: {e}")
+    entry = await schedules.pop(election_id, voter_id)
+    if entry is None:
+        print(f"{RED}no timestamps left for voter {voter_id} in election {election_id}")
+    return entry
 
 def round_seconds_timestamps(ts: datetime) -> datetime:
     """Rounds a datetime object to the nearest second."""
@@ -359,29 +497,26 @@ async def generate_timestamps_for_voter(election_id, voter_id, start, end):
 
 async def save_timestamps_to_db(election_id, voter_timestamps):
     """
-    Persist voter timestamps and associated image-paths to DuckDB.
+    Persist voter timestamps and associated image-paths to the store and add them to the in-memory schedules.
     Set initial state of "Processed"-column to false for all rows. 
 
     Args:
         election_id: Identifier of the election.
         voter_timestamps (list): List of (voter_id, timestamps) tuples.
     """
-    print(f"{CYAN}Writing timestamps to Duckdb for election {election_id}")
+    print(f"{CYAN}Writing timestamps to the {store.name} store for election {election_id}")
     try:
-        async with duckdb_lock: # lock is acquired to check if access should be allowed, lock while accessing ressource and is then released before returning  
-            conn = duckdb.connect("/duckdb/voter-data.duckdb")
-            for voter_id, timestamps in voter_timestamps:
-                image_paths = assign_images_for_timestamps(len(timestamps))
-                rows = [] #list to collect all rows we want to insert in DB in one batch
-                print(f"timestamps matched with images: {len(timestamps)}, {len(image_paths)}")
-                for timestamp, img in zip(timestamps, image_paths):
-                    dt_timestamp = datetime.fromtimestamp(timestamp, tz=timezone.utc) # convert to datetime to store in DB as TIMESTAMPTZ
-                    timestamp_rounded = round_seconds_timestamps(dt_timestamp) # Round to nearest second.
-                    rows.append((voter_id, election_id, timestamp_rounded, False, img))
-                conn.executemany("INSERT INTO VoterTimestamps (VoterID, ElectionID, Timestamp, Processed, ImagePath) VALUES (?, ?, ?, ?, ?)", rows) #inserts all rows in one operation
-        conn.close()
+        rows = [] #list to collect all rows we want to insert in DB in one batch
+        for voter_id, timestamps in voter_timestamps:
+            image_paths = assign_images_for_timestamps(len(timestamps))
+            print(f"timestamps matched with images: {len(timestamps)}, {len(image_paths)}")
+            # Round to nearest second, the store keeps seconds since the epoch.
+            rounded = [round_seconds_timestamps(datetime.fromtimestamp(timestamp, tz=timezone.utc)).timestamp() for timestamp in timestamps]
+            rows.extend((voter_id, election_id, timestamp, img) for timestamp, img in zip(rounded, image_paths))
+            schedules.add(election_id, voter_id, rounded, image_paths) # ballot casting reads the schedule from memory, the store is the checkpoint
+        await store.insert_timestamps(rows) #inserts all rows in one transaction
     except Exception as e:
-        print(f"{RED}error writing to duckdb for voter {voter_id} in election {election_id}: {e}")
+        print(f"{RED}error writing timestamps to the {store.name} store in election {election_id}: {e}")
 
 
 async def send_ballot0_to_bb(pyBallot: Ballot):
@@ -398,19 +533,17 @@ async def send_ballot0_to_bb(pyBallot: Ballot):
         HTTPException: If sending fails.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post("http://bb_api:8000/receive-ballot0", content = pyBallot.model_dump_json())
-            response.raise_for_status() # gets http status code
-            print(f"{CYAN}ballot0 sent to BB for voter {pyBallot.voterid}")
-            return response.json()
+        response_json = await post_ballot_to_bb("receive-ballot0", pyBallot)
+        print(f"{CYAN}ballot0 sent to BB for voter {pyBallot.voterid}")
+        return response_json
     except Exception as e:
         print(f"{RED}Error sending ballot0: {e}")
         raise HTTPException(status_code=500, detail=f"{RED}Failed to send ballot0 to BB: {str(e)}") 
     
 async def fetch_ballot0_timestamp(election_id, voter_id):
     """
-    Fetch timestamp and image for a voter's ballot0.
-    Set column "Processed = True" in VoterTimestamps table. 
+    Fetch and consume the timestamp and image for a voter's ballot0, the first
+    entry of the voter's schedule.
 
     Args:
         election_id: Identifier of the election.
@@ -419,25 +552,7 @@ async def fetch_ballot0_timestamp(election_id, voter_id):
     Returns:
         tuple[datetime, str]: Timestamp and image path.
     """
-    try:
-        async with duckdb_lock: # lock is acquired to check if access should be allowed, lock while accessing ressource and is then released before returning  
-            conn = duckdb.connect("/duckdb/voter-data.duckdb")
-            ballot0_timestamp, image_path = conn.execute("""
-                    SELECT Timestamp, ImagePath
-                    FROM VoterTimestamps
-                    WHERE VoterID = ? AND ElectionID = ?
-                    ORDER BY Timestamp ASC
-                    LIMIT 1
-                    """, (voter_id, election_id)).fetchone()
-            
-            # Set processed column to true for the fetched timestamp:
-            conn.execute("""
-                UPDATE VoterTimestamps
-                SET Processed = TRUE
-                WHERE VoterID = ? AND ElectionID = ? AND Timestamp = ?
-            """, (voter_id, election_id, ballot0_timestamp))
-            
-            return ballot0_timestamp, image_path
-    except Exception as e:
-        print(f"{RED}error fetching timestamp from duckdb for voter {voter_id} in election {election_id}: {e}")
-
+    entry = await schedules.pop(election_id, voter_id)
+    if entry is None:
+        print(f"{RED}no timestamps for voter {voter_id} in election {election_id}")
+    return entry
@@ -1,18 +1,19 @@
 """Voting Server fetch functions.
 
 This module provides asynchronous helpers for retrieving election data
-from the bulletin board and local state from DuckDB. 
+from the bulletin board and local voter schedules. 
 - Fetch election start/end timestamps.
 - Fetch ElGamal parameters and convert them to petlib types.
 - Fetch voters, candidates, and public keys.
-- Fetch ballot-related metadata.
-- Fetch image filenames from the local DuckDB.
+- Fetch ballot-related metadata, coalescing concurrent head lookups into one BB request.
+- Fetch image filenames from the in-memory voter schedules.
 
 BB endpoints return binary objects (keys, ciphertexts) as base64 strings.
-Concurrency around DuckDB access is protected with ``duckdb_lock``.
 """
 
 from datetime import datetime
+import asyncio
+import os
 import httpx
 from coloursVS import RED
 from fastapi import HTTPException
@@ -23,8 +24,7 @@ import httpx
 import base64
 from petlib.bn import Bn # For casting database values to petlib big integer types.
 from petlib.ec import EcGroup, EcPt, EcGroup
-import duckdb
-from lock import duckdb_lock
+from schedules import schedules
 
 async def fetch_electiondates_from_bb(election_id):
     """Fetch election start/end datetimes from BB.
@@ -82,31 +82,28 @@ async def fetch_elgamal_params():
 
 
 
-async def fetch_voters_from_bb(election_id):
-    """Fetch voter ids for an election from BB.
+async def fetch_voter_eligible_from_bb(election_id, voter_id):
+    """Check with BB whether a voter is eligible to vote in an election.
 
     Args:
         election_id: Election identifier.
+        voter_id: Voter identifier.
 
     Returns:
-        list[int]: Voter id list.
+        bool: True if the voter participates in the election.
 
-    HTTPException<.
+    HTTPException:
         If BB request fails.
     """
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://bb_api:8000/voters?election_id={election_id}")
-            response.raise_for_status() 
-          
-            data = response.json()
-            voters = data["voters"]
-            voter_id_list = [v["id"] for v in voters]
-          
-            return voter_id_list
+            response = await client.get(f"http://bb_api:8000/voters/{voter_id}/eligible", params={"election_id": election_id})
+            response.raise_for_status()
+
+            return response.json()["eligible"]
     except Exception as e:
-        print(f"{RED}Error fetching voters from BB {e}")
-        raise HTTPException(status_code=500, detail=f"{RED}Error fetching voters from BB: {str(e)}")     
+        print(f"{RED}Error checking voter eligibility on BB {e}")
+        raise HTTPException(status_code=500, detail=f"{RED}Error checking voter eligibility on BB: {str(e)}")     
 
 async def fetch_candidates_from_bb(election_id):
     """Fetch candidates for an election from BB.
@@ -121,17 +118,21 @@ async def fetch_candidates_from_bb(election_id):
         If BB request fails.
     """
     try:
+        candidates_list: list = []
+        after_id = None
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://bb_api:8000/candidates?election_id={election_id}")
-            response.raise_for_status() 
-          
-            data = response.json()
-            candidates_list: list = []
-
-            for candidate in data["candidates"]:
-                candidates_list.append(candidate["id"])
-
-            return candidates_list
+            while True: # The BB returns the candidates in pages ordered by id.
+                params = {"election_id": election_id} if after_id is None else {"election_id": election_id, "after_id": after_id}
+                response = await client.get("http://bb_api:8000/candidates", params=params)
+                response.raise_for_status()
+
+                data = response.json()
+                for candidate in data["candidates"]:
+                    candidates_list.append(candidate["id"])
+
+                after_id = data.get("next")
+                if after_id is None:
+                    return candidates_list
     except Exception as e:
         print(f"{RED}Error fetching candidates from BB: {e}")
         raise HTTPException(status_code=500, detail=f"{RED}Error fetching candidates from BB: {str(e)}")     
@@ -187,30 +188,176 @@ async def fetch_voter_public_key_from_bb(voter_id, election_id):
         print(f"{RED}Error fetching public key for voter: {e}")
         raise HTTPException(status_code=500, detail=f"{RED}Error fetching public key for voter:  {str(e)}")     
 
-async def fetch_ballot_hash_from_bb(election_id):
-    """Fetch all ballot hashes for an election from BB.
+async def fetch_proof_context_from_bb(election_id, voter_id, before=None):
+    """Fetch everything needed to build or verify one ballot for a voter in a single BB request.
 
     Args:
         election_id: Election identifier.
+        voter_id: Voter identifier.
+        before: Optional datetime. If given, the CBR length and preceding ballots are taken as of this timestamp.
 
     Returns:
-        list: List of ballot hashes.
+        tuple: ``(GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, voter_public_key_bin, cbr_length, last_ballot_b64, previous_last_ballot_b64)``
+        with parameters and keys converted into petlib types, candidates as a list of candidate ids and
+        ``previous_last_ballot_b64`` set to ``last_ballot_b64`` if BB reports it as ``None``.
 
     HTTPException:
         If BB request fails.
     """
+    if before is None and head_fetcher.enabled:
+        return await head_fetcher.fetch(election_id, voter_id)
+
+    params = {"election_id": election_id, "voter_id": voter_id}
+    if before is not None:
+        params["before"] = before.isoformat()
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"http://bb_api:8000/fetch-ballot-hashes?election_id={election_id}")
+            response = await client.get("http://bb_api:8000/proof-context", params=params)
+            response.raise_for_status() 
+            data = response.json()
+
+        return convert_proof_context(data, data)
+    except Exception as e:
+        print(f"{RED}Error fetching proof context from BB: {e}")
+        raise HTTPException(status_code=500, detail=f"{RED}Error fetching proof context from BB: {str(e)}")     
+
+def convert_proof_context(election_context, head):
+    """Convert a BB proof context (or election context and voter head) to the types used for cryptographic functions.
+
+    Args:
+        election_context (dict): BB JSON with group, generator, order, publickey_ts, publickey_vs and candidates.
+        head (dict): BB JSON with voter_public_key, cbr_length, last_ballot and previous_last_ballot.
+
+    Returns:
+        tuple: ``(GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, voter_public_key_bin, cbr_length, last_ballot_b64, previous_last_ballot_b64)``
+    """
+    GROUP = EcGroup(election_context["group"])
+    GENERATOR = EcPt.from_binary(base64.b64decode(election_context["generator"]), GROUP)
+    ORDER = Bn.from_binary(base64.b64decode(election_context["order"]))
+    pk_TS = EcPt.from_binary(base64.b64decode(election_context["publickey_ts"]), GROUP)
+    pk_VS = EcPt.from_binary(base64.b64decode(election_context["publickey_vs"]), GROUP)
+
+    candidates = [candidate["id"] for candidate in election_context["candidates"]]
+    voter_public_key_bin = base64.b64decode(head["voter_public_key"])
+
+    last_ballot_b64 = head["last_ballot"]
+    previous_last_ballot_b64 = head["previous_last_ballot"]
+    # If there is no previous last ballot then the last ballot is used as the previous last ballot.
+    if previous_last_ballot_b64 is None:
+        previous_last_ballot_b64 = last_ballot_b64
+
+    return GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, voter_public_key_bin, head["cbr_length"], last_ballot_b64, previous_last_ballot_b64
+
+
+class HeadFetcher:
+    """Coalesces concurrent proof context lookups into ``POST /heads`` requests to BB.
+
+    Voters whose timestamps fall in the same second are obfuscated concurrently. Their lookups are collected
+    for ``VS_HEADS_WINDOW_MS`` and sent to BB as one request per election (split into chunks of
+    ``VS_HEADS_MAX_BATCH`` voters), instead of one ``/proof-context`` request per voter.
+    """
+
+    def __init__(self, window_ms, max_batch):
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: dict = {} # election id -> {voter id: [futures]}
+        self._tasks: set = set() # Flush tasks, referenced until they are done so they are not garbage-collected.
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_s > 0
+
+    async def fetch(self, election_id, voter_id):
+        """Fetch the current proof context of a voter, sharing the BB request with concurrent lookups.
+
+        Args:
+            election_id: Election identifier.
+            voter_id: Voter identifier.
+
+        Returns:
+            tuple: As returned by ``fetch_proof_context_from_bb``.
+
+        HTTPException:
+            If BB request fails or the voter does not participate in the election.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if election_id not in self._pending:
+            self._pending[election_id] = {}
+            task = asyncio.create_task(self._flush_after_window(election_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._pending[election_id].setdefault(voter_id, []).append(future)
+
+        return await future
+
+    async def _flush_after_window(self, election_id):
+        await asyncio.sleep(self.window_s)
+        pending = self._pending.pop(election_id)
+        voter_ids = list(pending)
+        await asyncio.gather(*[
+            self._fetch_chunk(election_id, voter_ids[i:i + self.max_batch], pending)
+            for i in range(0, len(voter_ids), self.max_batch)
+        ])
+
+    async def _fetch_chunk(self, election_id, voter_ids, pending):
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post("http://bb_api:8000/heads", json={"electionid": election_id, "voterids": voter_ids})
+                response.raise_for_status()
+                data = response.json()
+            heads = {head["voterid"]: head for head in data["heads"]}
+        except Exception as e:
+            print(f"{RED}Error fetching heads from BB: {e}")
+            heads, error = {}, HTTPException(status_code=500, detail=f"{RED}Error fetching heads from BB: {str(e)}")
+        else:
+            error = HTTPException(status_code=500, detail=f"{RED}Voter not found in election {election_id}")
+
+        for voter_id in voter_ids:
+            proof_context, voter_error = None, error
+            if voter_id in heads:
+                try:
+                    proof_context = convert_proof_context(data, heads[voter_id])
+                except Exception as e: # A malformed head only fails the lookups of its voter.
+                    print(f"{RED}Error reading head of voter {voter_id} from BB: {e}")
+                    voter_error = HTTPException(status_code=500, detail=f"{RED}Error reading head of voter {voter_id} from BB: {str(e)}")
+
+            for future in pending[voter_id]:
+                if future.done(): # The lookup was cancelled.
+                    continue
+                if proof_context is not None:
+                    future.set_result(proof_context)
+                else:
+                    future.set_exception(voter_error)
+
+
+head_fetcher = HeadFetcher(float(os.getenv("VS_HEADS_WINDOW_MS", "10")), int(os.getenv("VS_HEADS_MAX_BATCH", "500")))
+
+async def fetch_ballot_hash_exists_from_bb(election_id, ballot_hash):
+    """Check whether a ballot hash is already included on BB for an election.
+
+    Args:
+        election_id: Election identifier.
+        ballot_hash: Hash of the ballot to look up.
+
+    Returns:
+        bool: True if the ballot hash already exists on BB.
+
+    HTTPException:
+        If BB request fails.
+    """
+    payload = {"electionid": election_id, "hashes": [ballot_hash]}
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post("http://bb_api:8000/ballot-hashes/exists", json=payload)
             response.raise_for_status() 
           
             data = response.json()
-            ballothash_list = data["ballot_hashes"]
+            ballot_hash_exists = data["exists"][ballot_hash]
             
-            return ballothash_list
+            return ballot_hash_exists
     except Exception as e:
-        print(f"{RED}Error fetching list of all ballot hashes")
-        raise HTTPException(status_code=500, detail=f"{RED}Error fetching list of all ballot hashes:  {str(e)}")     
+        print(f"{RED}Error looking up ballot hash on BB")
+        raise HTTPException(status_code=500, detail=f"{RED}Error looking up ballot hash on BB:  {str(e)}")     
 
 async def fetch_last_and_previouslast_ballot_from_bb(election_id, voter_id):
     """Fetch the last and previous-to-last ballot for a voter from BB.
@@ -266,9 +413,7 @@ async def fetch_cbr_length_from_bb(voter_id, election_id):
         raise HTTPException(status_code=500, detail=f"{RED}Error fetching previous ballots from BB: {str(e)}")    
 
 async def fetch_image_filename(election_id, voter_id):
-    """Fetch the next unprocessed image filename for a voter from VS DuckDB.
-
-    This queries the VS-local database for the oldest unprocessed timestamp entry.
+    """Fetch the next unprocessed image filename for a voter from the in-memory schedules.
 
     Args:
         election_id: Election identifier.
@@ -276,22 +421,9 @@ async def fetch_image_filename(election_id, voter_id):
 
     Returns:
         str | None: Image path/filename if available; otherwise ``None``.
-
-    Access is protected by ``duckdb_lock`` to avoid concurrent DuckDB usage.
     """
-    try:
-        async with duckdb_lock: # lock is acquired to check if access should be allowed, lock while accessing ressource and is then released before returning  
-            conn = duckdb.connect("/duckdb/voter-data.duckdb")
-            (image_filename,) = conn.execute("""
-                    SELECT ImagePath
-                    FROM VoterTimestamps
-                    WHERE VoterID = ? AND ElectionID = ? AND Processed = false
-                    ORDER BY Timestamp ASC
-                    LIMIT 1
-                    """, (voter_id, election_id)).fetchone()
-        return image_filename
-    except Exception as e:
-        print(f"{RED}error fetching timestamp from duckdb for voter {voter_id} in election {election_id}: {e}")
+    entry = await schedules.peek(election_id, voter_id)
+    return entry[1] if entry else None
 
 
 async def fetch_electiondates_from_bb(election_id):
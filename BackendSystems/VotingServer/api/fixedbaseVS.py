@@ -0,0 +1,90 @@
+"""
+Precomputed small multiples of the group generator, and encryption of several messages under one randomness.
+
+petlib multiplies points with OpenSSL's constant-time ladder, which ignores precomputed tables and
+costs the same (about 0.1 ms) for the generator and for a public key. Window and comb tables
+evaluated from Python are slower than the ladder, because each point addition is a separate call
+into OpenSSL, so no tables are built for the TS and VS public keys. What is done instead:
+- the small multiples m*g for 0 <= m < TABLE_SIZE are built once per process, with one point addition
+  each. They are used for encoded messages (vote bits, zero) and to find a tally count from m*g with a
+  dictionary lookup instead of one multiplication per candidate count.
+- r*g and r*pk are computed once when the same randomness encrypts several messages (``enc_vector``).
+Secret and large scalars keep using the constant-time ladder.
+"""
+from petlib.ec import EcPt
+
+TABLE_SIZE = 1024 # Small multiples kept per base, extended on demand for tally counts.
+
+
+class FixedBase:
+    """Table of the multiples 0*base, 1*base, ... of a fixed base point."""
+
+    def __init__(self, base: EcPt, size):
+        self.base = base
+        self._multiples = [base.group.infinite()]
+        self._logs: dict = {} # encoded point -> multiple, built on first use of ``log``
+        self.extend(size)
+
+    def extend(self, size):
+        """Extend the table to hold the multiples 0..size-1."""
+        point = self._multiples[-1]
+        while len(self._multiples) < size:
+            point = point + self.base
+            self._multiples.append(point)
+
+    def mul(self, k) -> EcPt:
+        """
+        Return k*base, looked up in the table for small non-negative k.
+        Args:
+            k (int | Bn): Scalar.
+        Returns:
+            EcPt: k*base.
+        """
+        if 0 <= k < len(self._multiples):
+            return self._multiples[int(k)]
+        return k * self.base
+
+    def log(self, point: EcPt, limit):
+        """
+        Return the m with m*base == point for 0 <= m < limit.
+        Args:
+            point (EcPt): Point to look up, e.g. a decrypted vote count.
+            limit (int): Exclusive upper bound on m, the table is extended to it.
+        Returns:
+            int | None: m, or None if the point is not a multiple below the limit.
+        """
+        self.extend(limit)
+        for m in range(len(self._logs), limit):
+            self._logs[self._multiples[m].export()] = m
+        m = self._logs.get(point.export())
+        return m if m is not None and m < limit else None
+
+
+_tables: dict = {}
+
+
+def fixed_base(base: EcPt) -> FixedBase:
+    """Return the table of a base, built on first use and kept for the lifetime of the process."""
+    key = (base.group.nid(), base.export())
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = FixedBase(base, TABLE_SIZE)
+    return table
+
+
+def enc_vector(g, pk, messages, r):
+    """Encrypt several messages with the same randomness, computing r*g and r*pk once.
+
+    Args:
+        g (EcPt): group generator
+        pk (EcPt): public key of the receiver
+        messages (list[int | Bn]): messages to be encrypted
+        r (Bn): randomness shared by all ciphertexts
+
+    Returns:
+        list[(EcPt, EcPt)]: ciphertexts (c0, c1), where c0 = r*g and c1 = m*g + r*pk
+    """
+    c0 = r*g
+    r_pk = r*pk
+    g_table = fixed_base(g)
+    return [(c0, g_table.mul(m) + r_pk) for m in messages]
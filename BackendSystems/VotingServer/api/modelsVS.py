@@ -30,4 +30,18 @@ class ElGamalParams(BaseModel):
     All parameters are encoded for safe transport in JSON-format."""
     group: int
     generator: str  # base64-encoded group generator
-    order: str      # base64-encoded group order
\ No newline at end of file
+    order: str      # base64-encoded group order
+class BallotList(BaseModel):
+    """Container for a batch of ballots posted to the BB in one request."""
+    ballots: List[Ballot]
+
+class BallotReceipt(BaseModel):
+    """Outcome for a single ballot in a batch posted to the BB.
+    Either the id assigned to the stored ballot or the error that prevented it from being stored."""
+    index: int                              # Position of the ballot in the posted batch.
+    ballotid: Optional[int] = None          # Id of the stored ballot.
+    error: Optional[str] = None             # Error message if the ballot could not be stored.
+
+class BallotReceiptList(BaseModel):
+    """Container for the per-ballot outcomes of a batch."""
+    receipts: List[BallotReceipt]
@@ -0,0 +1,135 @@
+"""
+Pool of precomputed re-encryption randomness for obfuscation ballots.
+
+An obfuscation ballot re-encrypts ct_v under pk_TS with r_v, and ct_lv and ct_lid under pk_VS with
+r_lv and r_lid. The points r*g and r*pk do not depend on the ballot, so they are computed ahead of
+time by a background thread and kept in a pool of ``VS_RANDOMNESS_POOL_DEPTH`` entries, refilled at
+most ``VS_RANDOMNESS_REFILL_PER_S`` entries per second. A scheduled obfuscation then only adds the
+precomputed points to the ciphertexts. If the pool is empty, the randomness is computed on the spot.
+
+The pool is bound to the generator and the TS and VS public keys it was filled for, and is emptied
+when they change.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import NamedTuple
+from petlib.bn import Bn
+from petlib.ec import EcPt
+
+POOL_DEPTH = int(os.getenv("VS_RANDOMNESS_POOL_DEPTH", "500")) # Entries kept ready, one per obfuscation ballot.
+REFILL_PER_S = float(os.getenv("VS_RANDOMNESS_REFILL_PER_S", "200")) # Upper bound on entries computed per second.
+REFILL_BATCH = 10 # Entries computed per call to the background thread.
+
+
+class ReEncryptionFactor(NamedTuple):
+    """Randomness r with the points r*g and r*pk added to a ciphertext when re-encrypting it."""
+    r: Bn
+    r_g: EcPt
+    r_pk: EcPt
+
+
+class ObfuscationRandomness(NamedTuple):
+    """Randomness of one obfuscation ballot: ct_v under pk_TS, ct_lv and ct_lid under pk_VS."""
+    v: ReEncryptionFactor
+    lv: ReEncryptionFactor
+    lid: ReEncryptionFactor
+
+
+class Bases(NamedTuple):
+    generator: EcPt
+    order: Bn
+    pk_TS: EcPt
+    pk_VS: EcPt
+
+    def matches(self, generator, order, pk_TS, pk_VS) -> bool:
+        return self.generator == generator and self.order == order and self.pk_TS == pk_TS and self.pk_VS == pk_VS
+
+
+def re_encryption_factor(bases: Bases, pk) -> ReEncryptionFactor:
+    r = bases.order.random()
+    return ReEncryptionFactor(r, r * bases.generator, r * pk)
+
+
+def obfuscation_randomness(bases: Bases) -> ObfuscationRandomness:
+    """Draw fresh randomness for one obfuscation ballot and compute its points."""
+    return ObfuscationRandomness(
+        re_encryption_factor(bases, bases.pk_TS),
+        re_encryption_factor(bases, bases.pk_VS),
+        re_encryption_factor(bases, bases.pk_VS),
+    )
+
+
+class RandomnessPool:
+    """Precomputed ``ObfuscationRandomness`` entries, filled in the background."""
+
+    def __init__(self, depth, refill_per_s):
+        self._depth = depth
+        self._refill_per_s = refill_per_s
+        self._pool: deque = deque()
+        self._bases = None
+        self._wanted = asyncio.Event()
+        self._hits = 0
+        self._misses = 0
+        self._task = None
+
+    async def start(self):
+        """Start refilling the pool in the background."""
+        self._task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def prepare(self, generator, order, pk_TS, pk_VS):
+        """Bind the pool to the generator and public keys of an election and start filling it."""
+        if self._bases is None or not self._bases.matches(generator, order, pk_TS, pk_VS):
+            self._bases = Bases(generator, order, pk_TS, pk_VS)
+            self._pool.clear()
+        self._wanted.set()
+
+    def take(self, generator, order, pk_TS, pk_VS) -> ObfuscationRandomness:
+        """
+        Take the randomness for one obfuscation ballot. Every entry is handed out once.
+        Args:
+            generator (EcPt): Group generator.
+            order (Bn): Group order.
+            pk_TS (EcPt): Public key of the Tallying Server.
+            pk_VS (EcPt): Public key of the Voting Server.
+        Returns:
+            ObfuscationRandomness: Randomness and its points for ct_v, ct_lv and ct_lid.
+        """
+        self.prepare(generator, order, pk_TS, pk_VS)
+        try:
+            randomness = self._pool.popleft()
+            self._hits += 1
+        except IndexError:
+            randomness = obfuscation_randomness(self._bases)
+            self._misses += 1
+        return randomness
+
+    def stats(self) -> dict:
+        """Return the current size of the pool and how many obfuscations found it empty."""
+        return {"size": len(self._pool), "depth": self._depth, "hits": self._hits, "misses": self._misses}
+
+    async def _refill(self):
+        while True:
+            if self._bases is None or len(self._pool) >= self._depth:
+                self._wanted.clear()
+                await self._wanted.wait()
+                continue
+
+            bases = self._bases
+            count = min(REFILL_BATCH, self._depth - len(self._pool))
+            started = time.monotonic()
+            # petlib keeps a BN_CTX per thread, so the points can be computed off the event loop.
+            entries = await asyncio.to_thread(lambda: [obfuscation_randomness(bases) for _ in range(count)])
+            if bases is self._bases: # discard entries for keys that were replaced meanwhile
+                self._pool.extend(entries)
+            await asyncio.sleep(max(0.0, count / self._refill_per_s - (time.monotonic() - started)))
+
+
+randomness = RandomnessPool(POOL_DEPTH, REFILL_PER_S)
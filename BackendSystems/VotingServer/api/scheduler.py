@@ -0,0 +1,131 @@
+"""
+Central scheduler for the ballots the Voting Server casts during an election.
+
+All pending jobs (one per voter: its next ballot timestamp) are kept in a single heap ordered by
+due time on the monotonic clock. One dispatcher task sleeps until the earliest job is due and hands
+due jobs to a fixed pool of workers, so the number of live coroutines does not grow with the
+electorate and timestamps are met with sub-second precision.
+
+Scheduling lag (time between a job being due and a worker starting it) is logged every
+``VS_SCHEDULER_REPORT_S`` seconds and returned by ``Scheduler.stats``.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from datetime import datetime, timezone
+from coloursVS import RED, PINK
+
+SCHEDULER_WORKERS = int(os.getenv("VS_SCHEDULER_WORKERS", "32")) # Jobs (ballot casts) running at the same time.
+SCHEDULER_REPORT_S = float(os.getenv("VS_SCHEDULER_REPORT_S", "60")) # Interval for logging the scheduling lag.
+
+
+class LagWindow:
+    """Number, sum and maximum of the scheduling lags since the last report."""
+
+    def __init__(self):
+        self.jobs = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def add(self, lag_s):
+        self.jobs += 1
+        self.total_s += lag_s
+        self.max_s = max(self.max_s, lag_s)
+
+    def as_dict(self) -> dict:
+        return {
+            "jobs": self.jobs,
+            "lag_avg_ms": round(self.total_s / self.jobs * 1000, 3) if self.jobs else 0.0,
+            "lag_max_ms": round(self.max_s * 1000, 3),
+        }
+
+
+class Scheduler:
+    """Runs coroutine jobs at given times on a bounded pool of workers."""
+
+    def __init__(self, workers, report_s):
+        self._workers = workers
+        self._report_s = report_s
+        self._heap: list = [] # (due on the monotonic clock, sequence number, job, args)
+        self._sequence = itertools.count() # Keeps jobs due at the same time in scheduling order.
+        self._wakeup = asyncio.Event()
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._running = 0
+        self._window = LagWindow()
+        self._total = LagWindow()
+        self._tasks: list = []
+
+    async def start(self):
+        """Start the dispatcher, the workers and the lag reporter."""
+        self._tasks = [asyncio.create_task(self._dispatch()), asyncio.create_task(self._report())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self._workers)]
+
+    async def stop(self):
+        """Cancel all pending jobs and stop the scheduler."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def schedule(self, when: datetime, job, *args):
+        """Run ``await job(*args)`` at a wall-clock time. Jobs due in the past run right away.
+        Args:
+            when (datetime): Timezone-aware time the job is due.
+            job: Coroutine function.
+            *args: Arguments for the job.
+        """
+        delay = (when - datetime.now(timezone.utc)).total_seconds()
+        entry = (time.monotonic() + max(delay, 0), next(self._sequence), job, args)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry: # New earliest job, the dispatcher has to wake up sooner.
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        """Return the number of scheduled, queued and running jobs and the scheduling lag since startup."""
+        return {
+            "scheduled": len(self._heap),
+            "queued": self._ready.qsize(),
+            "running": self._running,
+            **self._total.as_dict(),
+        }
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, job, args = heapq.heappop(self._heap)
+                self._ready.put_nowait((due, job, args))
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self):
+        while True:
+            due, job, args = await self._ready.get()
+            lag_s = time.monotonic() - due
+            self._window.add(lag_s)
+            self._total.add(lag_s)
+            self._running += 1
+            try:
+                await job(*args)
+            except Exception as e:
+                print(f"{RED}scheduled job {job.__name__}{args} failed: {e}")
+            finally:
+                self._running -= 1
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self._report_s)
+            if self._window.jobs:
+                window = self._window.as_dict()
+                print(f"{PINK}Scheduling lag over {window['jobs']} ballots (avg/max): {window['lag_avg_ms']} / {window['lag_max_ms']} ms, {len(self._heap)} scheduled")
+                self._window = LagWindow()
+
+
+scheduler = Scheduler(SCHEDULER_WORKERS, SCHEDULER_REPORT_S)
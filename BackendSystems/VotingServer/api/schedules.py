@@ -0,0 +1,160 @@
+"""
+In-memory ballot schedules of the voters on the Voting Server.
+
+The remaining (timestamp, image) pairs of each voter are kept in compact arrays with a cursor, so the
+next timestamp or image of a voter is looked up in O(1) without querying the store (``storeVS``).
+The store is only the checkpoint: VoterTimestamps is written when the schedules are created, and
+consumed timestamps are marked as processed there in batches every ``VS_CHECKPOINT_INTERVAL_S``
+seconds. Schedules of an election that is not in memory are loaded from the checkpoint on first use.
+"""
+import asyncio
+import os
+from array import array
+from datetime import datetime, timezone
+from coloursVS import RED
+from storeVS import store
+
+CHECKPOINT_INTERVAL_S = float(os.getenv("VS_CHECKPOINT_INTERVAL_S", "1")) # Interval for writing consumed timestamps to the store.
+
+
+class VoterSchedule:
+    """Remaining ballot timestamps (seconds since the epoch) and image indices of one voter."""
+    __slots__ = ("timestamps", "images", "cursor")
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.images = array("H")
+        self.cursor = 0
+
+
+class ScheduleStore:
+    """Ballot schedules of all voters, keyed on (election ID, voter ID)."""
+
+    def __init__(self, checkpoint_interval_s):
+        self._checkpoint_interval_s = checkpoint_interval_s
+        self._schedules: dict = {}
+        self._elections: set = set() # Elections whose schedules are in memory.
+        self._images: list = [] # Image paths, referenced by index from the schedules.
+        self._image_index: dict = {}
+        self._consumed: dict = {} # Last consumed timestamp per (election ID, voter ID) since the last checkpoint.
+        self._load_lock = asyncio.Lock()
+        self._task = None
+
+    async def start(self):
+        """Start writing checkpoints in the background."""
+        self._task = asyncio.create_task(self._checkpoint_loop())
+
+    async def stop(self):
+        """Stop the background task and write the last checkpoint."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.checkpoint()
+
+    def add(self, election_id, voter_id, timestamps, image_paths):
+        """
+        Add the schedule of a voter. The timestamps are expected to be persisted to the store by the caller.
+
+        Args:
+            election_id: Identifier of the election.
+            voter_id: Identifier of the voter.
+            timestamps (list[float]): Ballot timestamps in seconds since the epoch.
+            image_paths (list[str]): Image path of each ballot.
+        """
+        entries = sorted(zip(timestamps, image_paths), key=lambda entry: entry[0])
+        schedule = VoterSchedule()
+        schedule.timestamps.extend(ts for ts, _ in entries)
+        schedule.images.extend(self._intern_image(path) for _, path in entries)
+        self._schedules[(election_id, voter_id)] = schedule
+        self._elections.add(election_id)
+
+    async def peek(self, election_id, voter_id):
+        """
+        Return the next unprocessed timestamp and image path of a voter without consuming it.
+
+        Returns:
+            tuple[datetime, str] | None: Timestamp and image path, or None if no timestamps remain.
+        """
+        schedule = await self._schedule(election_id, voter_id)
+        if schedule is None or schedule.cursor >= len(schedule.timestamps):
+            return None
+        return self._entry(schedule, schedule.cursor)
+
+    async def pop(self, election_id, voter_id):
+        """
+        Consume the next unprocessed timestamp and image path of a voter.
+        The timestamp is marked as processed in the store with the next checkpoint.
+
+        Returns:
+            tuple[datetime, str] | None: Timestamp and image path, or None if no timestamps remain.
+        """
+        entry = await self.peek(election_id, voter_id)
+        if entry is not None:
+            self._schedules[(election_id, voter_id)].cursor += 1
+            self._consumed[(election_id, voter_id)] = entry[0].timestamp()
+        return entry
+
+    async def next_timestamps(self, election_id) -> dict:
+        """Return the next unprocessed timestamp of every voter in an election that has one left."""
+        if election_id not in self._elections:
+            await self._load(election_id)
+        return {
+            voter_id: datetime.fromtimestamp(schedule.timestamps[schedule.cursor], tz=timezone.utc)
+            for (eid, voter_id), schedule in self._schedules.items()
+            if eid == election_id and schedule.cursor < len(schedule.timestamps)
+        }
+
+    async def checkpoint(self):
+        """Mark all timestamps consumed since the last checkpoint as processed in the store."""
+        if not self._consumed:
+            return
+        consumed, self._consumed = self._consumed, {}
+        voter_ids = [voter_id for _, voter_id in consumed]
+        election_ids = [election_id for election_id, _ in consumed]
+        try:
+            # Timestamps are consumed in order, so everything up to the last consumed timestamp is processed.
+            await store.mark_processed(voter_ids, election_ids, list(consumed.values()))
+        except Exception as e:
+            print(f"{RED}error writing schedule checkpoint to the {store.name} store: {e}")
+            for key, timestamp in consumed.items(): # retry with the next checkpoint
+                self._consumed.setdefault(key, timestamp)
+
+    def _entry(self, schedule, index):
+        timestamp = datetime.fromtimestamp(schedule.timestamps[index], tz=timezone.utc)
+        return timestamp, self._images[schedule.images[index]]
+
+    def _intern_image(self, path):
+        index = self._image_index.get(path)
+        if index is None:
+            index = self._image_index[path] = len(self._images)
+            self._images.append(path)
+        return index
+
+    async def _schedule(self, election_id, voter_id):
+        if election_id not in self._elections:
+            await self._load(election_id)
+        return self._schedules.get((election_id, voter_id))
+
+    async def _load(self, election_id):
+        async with self._load_lock:
+            if election_id in self._elections: # loaded while waiting for the lock
+                return
+            rows = await store.load_timestamps(election_id)
+
+            voters: dict = {}
+            for voter_id, timestamp, image_path in rows:
+                timestamps, image_paths = voters.setdefault(voter_id, ([], []))
+                timestamps.append(timestamp)
+                image_paths.append(image_path)
+            for voter_id, (timestamps, image_paths) in voters.items():
+                self.add(election_id, voter_id, timestamps, image_paths)
+            self._elections.add(election_id)
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(self._checkpoint_interval_s)
+            await self.checkpoint()
+
+
+schedules = ScheduleStore(CHECKPOINT_INTERVAL_S)
@@ -0,0 +1,410 @@
+"""
+Storage of the Voting Server state: ballot timestamps (VoterTimestamps) and voter-cast ballots waiting
+for their next timestamp (PendingVotes).
+
+The backend is chosen with ``VS_STORE``:
+- ``duckdb`` (default): DuckDB file at ``VS_STORE_PATH``, suited for analytical queries but slow on single-row writes.
+- ``sqlite``: SQLite file in WAL mode, better suited for the single-row inserts and deletes of PendingVotes.
+- ``memory``: Python dicts, nothing is persisted.
+
+The SQL backends keep one long-lived connection per thread instead of connecting for every call. All
+writes are run in order by a dedicated writer thread, each in its own transaction, and reads run on
+worker threads with their own cursors, so the event loop is never blocked by the database and no
+global lock is needed.
+
+Timestamps are passed in and out as seconds since the epoch (UTC). A voter has at most one pending
+ballot per election: saving a ballot replaces the one still pending (latest wins), in every backend.
+"""
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+import duckdb
+import numpy as np
+
+VS_STORE = os.getenv("VS_STORE", "duckdb")
+VS_STORE_PATH = os.getenv("VS_STORE_PATH", "") # Defaults to the DuckDB or SQLite file in the /duckdb volume.
+DEFAULT_PATHS = {
+    "duckdb": os.getenv("DUCKDB_PATH", "/duckdb/voter-data.duckdb"),
+    "sqlite": "/duckdb/voter-data.sqlite",
+}
+
+
+class Store(ABC):
+    """Interface of the Voting Server storage backends."""
+    name = ""
+
+    async def start(self):
+        """Open the store."""
+
+    async def stop(self):
+        """Close the store after all queued writes have been run."""
+
+    @abstractmethod
+    async def create_tables(self):
+        """Drop and recreate VoterTimestamps and PendingVotes."""
+
+    @abstractmethod
+    async def insert_timestamps(self, rows):
+        """
+        Insert ballot timestamps as unprocessed.
+        Args:
+            rows (list[tuple]): (voter ID, election ID, timestamp in seconds since the epoch, image path).
+        """
+
+    @abstractmethod
+    async def mark_processed(self, voter_ids, election_ids, epochs):
+        """
+        Mark the timestamps of each voter up to and including the given time as processed.
+        Args:
+            voter_ids (list[int]): Identifiers of the voters.
+            election_ids (list[int]): Election of each voter.
+            epochs (list[float]): Last consumed timestamp of each voter in seconds since the epoch.
+        """
+
+    @abstractmethod
+    async def load_timestamps(self, election_id):
+        """
+        Return the unprocessed timestamps of an election.
+        Returns:
+            list[tuple]: (voter ID, timestamp in seconds since the epoch, image path), ordered by voter and timestamp.
+        """
+
+    @abstractmethod
+    async def save_pending_vote(self, voter_id, election_id, public_key, ctv, ctlv, ctlid, proof):
+        """
+        Store a voter-cast ballot until the voter's next timestamp, replacing a ballot of the voter that is
+        still pending (latest wins). Ciphertexts are JSON strings.
+        """
+
+    @abstractmethod
+    async def take_pending_vote(self, voter_id, election_id):
+        """
+        Remove the pending ballot of a voter and return it.
+        Returns:
+            tuple | None: (public key, ctv, ctlv, ctlid, proof), or None if the voter has no pending ballot.
+        """
+
+
+class StoreWriter:
+    """Thread that runs write operations one after another on its own connection."""
+
+    def __init__(self, connect):
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, args=(connect,), name="vs-store-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    async def stop(self):
+        self._queue.put(None)
+        await asyncio.to_thread(self._thread.join)
+
+    async def submit(self, operation, *args):
+        """Run ``operation(conn, *args)`` in a transaction on the writer thread and return its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((operation, args, loop, future))
+        return await future
+
+    def _run(self, connect):
+        conn = connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                operation, args, loop, future = item
+                try:
+                    conn.execute("BEGIN TRANSACTION")
+                    result = operation(conn, *args)
+                    conn.execute("COMMIT")
+                    loop.call_soon_threadsafe(resolve, future, result, None)
+                except Exception as e:
+                    try:
+                        conn.execute("ROLLBACK")
+                    except Exception:
+                        pass
+                    loop.call_soon_threadsafe(resolve, future, None, e)
+        finally:
+            conn.close()
+
+
+def resolve(future, result, error):
+    """Set the outcome of a write on its future, unless the waiting task has been cancelled."""
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SQLStore(Store):
+    """Shared implementation of the SQL backends: a writer thread plus per-thread read cursors."""
+
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+        self._local = threading.local()
+        self._cursors: list = []
+        self._cursors_lock = threading.Lock()
+
+    @abstractmethod
+    def connect(self):
+        """Open a connection for the calling thread."""
+
+    @staticmethod
+    @abstractmethod
+    def _create_tables(conn):
+        """Drop and recreate the tables. PendingVotes has the primary key (ElectionID, VoterID)."""
+
+    @staticmethod
+    @abstractmethod
+    def _insert_timestamps(conn, rows):
+        """See ``insert_timestamps``, run in a write transaction."""
+
+    @staticmethod
+    @abstractmethod
+    def _mark_processed(conn, voter_ids, election_ids, epochs):
+        """See ``mark_processed``, run in a write transaction."""
+
+    @staticmethod
+    @abstractmethod
+    def _load_timestamps(conn, election_id):
+        """See ``load_timestamps``, run on a read cursor."""
+
+    async def start(self):
+        self._writer = StoreWriter(self.connect)
+        self._writer.start()
+
+    async def stop(self):
+        await self._writer.stop()
+        with self._cursors_lock:
+            for cursor in self._cursors:
+                cursor.close()
+            self._cursors = []
+
+    async def write(self, operation, *args):
+        return await self._writer.submit(operation, *args)
+
+    async def read(self, operation, *args):
+        return await asyncio.to_thread(self._read, operation, *args)
+
+    def _read(self, operation, *args):
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self._local.cursor = self.connect()
+            with self._cursors_lock:
+                self._cursors.append(cursor)
+        return operation(cursor, *args)
+
+    async def create_tables(self):
+        await self.write(self._create_tables)
+
+    async def insert_timestamps(self, rows):
+        await self.write(self._insert_timestamps, rows)
+
+    async def mark_processed(self, voter_ids, election_ids, epochs):
+        await self.write(self._mark_processed, voter_ids, election_ids, epochs)
+
+    async def load_timestamps(self, election_id):
+        return await self.read(self._load_timestamps, election_id)
+
+    async def save_pending_vote(self, voter_id, election_id, public_key, ctv, ctlv, ctlid, proof):
+        await self.write(self._save_pending_vote, (voter_id, election_id, public_key, ctv, ctlv, ctlid, proof))
+
+    async def take_pending_vote(self, voter_id, election_id):
+        return await self.write(self._take_pending_vote, voter_id, election_id)
+
+    @staticmethod
+    def _save_pending_vote(conn, row):
+        # The primary key (ElectionID, VoterID) keeps one pending ballot per voter, a newer one replaces it.
+        conn.execute("INSERT OR REPLACE INTO PendingVotes (VoterID, ElectionID, PublicKey, ctv, ctlv, ctlid, Proof) VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+
+    @staticmethod
+    def _take_pending_vote(conn, voter_id, election_id):
+        row = conn.execute("""
+                SELECT PublicKey, ctv, ctlv, ctlid, Proof
+                FROM PendingVotes
+                WHERE VoterID = ? AND ElectionID = ?
+                """, (voter_id, election_id)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM PendingVotes WHERE VoterID = ? AND ElectionID = ?", (voter_id, election_id))
+        return row
+
+
+class DuckDBStore(SQLStore):
+    """DuckDB backend. Worker threads use cursors of one long-lived database connection."""
+    name = "duckdb"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._conn = None
+
+    def connect(self):
+        return self._conn.cursor()
+
+    async def start(self):
+        self._conn = duckdb.connect(self.path)
+        await super().start()
+
+    async def stop(self):
+        await super().stop()
+        self._conn.close()
+
+    @staticmethod
+    def _create_tables(conn):
+        conn.execute("DROP TABLE IF EXISTS VoterTimestamps")
+        conn.execute("DROP TABLE IF EXISTS PendingVotes")
+        conn.execute("CREATE TABLE VoterTimestamps(VoterID INTEGER, ElectionID INTEGER, Timestamp TIMESTAMPTZ, Processed BOOLEAN, ImagePath TEXT)")
+        conn.execute("CREATE TABLE PendingVotes(VoterID INTEGER, ElectionID INTEGER, PublicKey TEXT, ctv TEXT, ctlv TEXT, ctlid TEXT, Proof TEXT, PRIMARY KEY (ElectionID, VoterID))")
+
+    @staticmethod
+    def _insert_timestamps(conn, rows):
+        voter_ids, election_ids, epochs, image_paths = zip(*rows) if rows else ((), (), (), ())
+        # Registered numpy columns are scanned in bulk, binding Python values as parameters converts them one by one.
+        conn.register("timestamp_rows", {
+            "VoterID": np.array(voter_ids, dtype=np.int32),
+            "ElectionID": np.array(election_ids, dtype=np.int32),
+            "Epoch": np.array(epochs, dtype=np.float64),
+            "ImagePath": np.array(image_paths, dtype=object),
+        })
+        try:
+            conn.execute("""
+                INSERT INTO VoterTimestamps (VoterID, ElectionID, Timestamp, Processed, ImagePath)
+                SELECT VoterID, ElectionID, to_timestamp(Epoch), false, ImagePath FROM timestamp_rows
+            """)
+        finally:
+            conn.unregister("timestamp_rows")
+
+    @staticmethod
+    def _mark_processed(conn, voter_ids, election_ids, epochs):
+        conn.register("checkpoint_rows", {
+            "VoterID": np.array(voter_ids, dtype=np.int32),
+            "ElectionID": np.array(election_ids, dtype=np.int32),
+            "Epoch": np.array(epochs, dtype=np.float64),
+        })
+        try:
+            conn.execute("""
+                UPDATE VoterTimestamps
+                SET Processed = TRUE
+                FROM checkpoint_rows AS c
+                WHERE VoterTimestamps.VoterID = c.VoterID AND VoterTimestamps.ElectionID = c.ElectionID
+                AND VoterTimestamps.Timestamp <= to_timestamp(c.Epoch) AND NOT VoterTimestamps.Processed
+            """)
+        finally:
+            conn.unregister("checkpoint_rows")
+
+    @staticmethod
+    def _load_timestamps(conn, election_id):
+        return conn.execute("""
+                SELECT VoterID, epoch(Timestamp), ImagePath
+                FROM VoterTimestamps
+                WHERE ElectionID = ? AND Processed = false
+                ORDER BY VoterID, Timestamp ASC
+        """, (election_id,)).fetchall()
+
+
+class SQLiteStore(SQLStore):
+    """SQLite backend in WAL mode, so readers do not block the writer. Timestamps are stored as REAL."""
+    name = "sqlite"
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False) # transactions are explicit
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # WAL stays consistent after a crash, only the last commits can be lost
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @staticmethod
+    def _create_tables(conn):
+        conn.execute("DROP TABLE IF EXISTS VoterTimestamps")
+        conn.execute("DROP TABLE IF EXISTS PendingVotes")
+        conn.execute("CREATE TABLE VoterTimestamps(VoterID INTEGER, ElectionID INTEGER, Timestamp REAL, Processed INTEGER, ImagePath TEXT)")
+        conn.execute("CREATE INDEX VoterTimestampsVoter ON VoterTimestamps(ElectionID, VoterID, Timestamp)")
+        conn.execute("CREATE TABLE PendingVotes(VoterID INTEGER, ElectionID INTEGER, PublicKey TEXT, ctv TEXT, ctlv TEXT, ctlid TEXT, Proof TEXT, PRIMARY KEY (ElectionID, VoterID))")
+
+    @staticmethod
+    def _insert_timestamps(conn, rows):
+        conn.executemany("INSERT INTO VoterTimestamps (VoterID, ElectionID, Timestamp, Processed, ImagePath) VALUES (?, ?, ?, 0, ?)", rows)
+
+    @staticmethod
+    def _mark_processed(conn, voter_ids, election_ids, epochs):
+        conn.executemany("""
+            UPDATE VoterTimestamps
+            SET Processed = 1
+            WHERE ElectionID = ? AND VoterID = ? AND Timestamp <= ? AND Processed = 0
+        """, zip(election_ids, voter_ids, epochs))
+
+    @staticmethod
+    def _load_timestamps(conn, election_id):
+        return conn.execute("""
+                SELECT VoterID, Timestamp, ImagePath
+                FROM VoterTimestamps
+                WHERE ElectionID = ? AND Processed = 0
+                ORDER BY VoterID, Timestamp ASC
+        """, (election_id,)).fetchall()
+
+
+class MemoryStore(Store):
+    """In-memory backend without persistence, for tests and benchmarks."""
+    name = "memory"
+
+    def __init__(self):
+        self._timestamps: dict = {} # election ID -> voter ID -> list of [timestamp, image path, processed]
+        self._pending: dict = {} # (election ID, voter ID) -> pending ballot
+
+    async def create_tables(self):
+        self._timestamps = {}
+        self._pending = {}
+
+    async def insert_timestamps(self, rows):
+        for voter_id, election_id, epoch, image_path in rows:
+            self._timestamps.setdefault(election_id, {}).setdefault(voter_id, []).append([epoch, image_path, False])
+
+    async def mark_processed(self, voter_ids, election_ids, epochs):
+        for voter_id, election_id, epoch in zip(voter_ids, election_ids, epochs):
+            for entry in self._timestamps.get(election_id, {}).get(voter_id, []):
+                if entry[0] <= epoch:
+                    entry[2] = True
+
+    async def load_timestamps(self, election_id):
+        voters = self._timestamps.get(election_id, {})
+        return [
+            (voter_id, epoch, image_path)
+            for voter_id in sorted(voters)
+            for epoch, image_path, processed in sorted(voters[voter_id])
+            if not processed
+        ]
+
+    async def save_pending_vote(self, voter_id, election_id, public_key, ctv, ctlv, ctlid, proof):
+        self._pending[(election_id, voter_id)] = (public_key, ctv, ctlv, ctlid, proof)
+
+    async def take_pending_vote(self, voter_id, election_id):
+        return self._pending.pop((election_id, voter_id), None)
+
+
+def open_store(backend, path=""):
+    """
+    Create the store for a backend. It has to be started before use.
+    Args:
+        backend (str): "duckdb", "sqlite" or "memory".
+        path (str): Database file of the SQL backends, defaults to the file in the /duckdb volume.
+    Returns:
+        Store: The store.
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "duckdb":
+        return DuckDBStore(path or DEFAULT_PATHS["duckdb"])
+    if backend == "sqlite":
+        return SQLiteStore(path or DEFAULT_PATHS["sqlite"])
+    if backend == "memory":
+        return MemoryStore()
+    raise ValueError(f"unknown VS_STORE backend {backend!r}, expected duckdb, sqlite or memory")
+
+
+store = open_store(VS_STORE, VS_STORE_PATH)
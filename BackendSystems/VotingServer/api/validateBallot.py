@@ -6,7 +6,7 @@ It is responsible for:
 
 - Validating ballots against election state and Bulletin Board (BB) data.
 - Verifying cryptographic proofs of correct construction of ballots.
-- Obfuscating ballots via re-encryption and proof simulation.
+- Obfuscating ballots via re-encryption with precomputed randomness and proof simulation.
 - Constructing serialized ballot objects for transmission.
 - Fetching cryptographic parameters, keys, and election metadata.
 
@@ -25,6 +25,7 @@ from hashVS import hash_ballot
 import json
 from coloursVS import GREEN, ORANGE, YELLOW, PINK, BOLD
 import fetchFunctions as ff
+from randomnessPool import randomness
 import time
 
 e_time_obf = [] # Performance timing for ballot obfuscation without network calls.
@@ -45,8 +46,6 @@ async def validate_ballot(pyballot:Ballot):
         bool: True if the ballot is valid, otherwise False.
     """
     election_id = pyballot.electionid
-    ballot_hash: list = await ff.fetch_ballot_hash_from_bb(election_id) # Fetch list of all ballot-hashes from BB.
-    voter_list: list = await ff.fetch_voters_from_bb(election_id)
 
     hashed_ballot = hash_ballot(pyballot) # Generate hash for current voter-cast ballot.  
     uid_exists = False
@@ -54,15 +53,10 @@ async def validate_ballot(pyballot:Ballot):
     proof_verified = False
 
     # Check that voter is included in list of eligible voters.
-    for id in voter_list:
-        if pyballot.voterid == id:
-            uid_exists = True
+    uid_exists = await ff.fetch_voter_eligible_from_bb(election_id, pyballot.voterid)
 
     # Check that ballot hash of curret ballot is not already included in the Bulletin Board.
-    if not ballot_hash: # Guarding against empty list, not necessary if we dont have to validate Ballot0
-        ballot_not_included = True
-    if hashed_ballot not in ballot_hash:
-        ballot_not_included = True
+    ballot_not_included = not await ff.fetch_ballot_hash_exists_from_bb(election_id, hashed_ballot)
 
     # Verify proof
     proof_verified = await verify_proof(election_id, pyballot.voterid, pyballot)
@@ -84,17 +78,11 @@ async def verify_proof(election_id, voter_id, pyballot):
     Returns:
         bool: True if the proof verifies successfully, otherwise False.
     """
-    GROUP, GENERATOR, _, cbr_length, candidates, pk_TS, pk_VS = await fetch_data(election_id, voter_id)
+    # Last ballot and previous last ballot are fetched together with the parameters.
+    # If there is no previous last ballot then the last ballot is used as the previous last ballot.
+    GROUP, GENERATOR, _, _, candidates, pk_TS, pk_VS, _, last_ballot_b64, previous_last_ballot_b64 = await fetch_data(election_id, voter_id)
     current_ballot_b64 = (pyballot.ctv, pyballot.ctlv, pyballot.ctlid, pyballot.proof)
     ctv_current, ctlv_current, ctlid_current, proof_current = convert_to_ecpt(current_ballot_b64, GROUP)
-    
-    # Fetch last ballot and previous last ballot from Bulletin Board if there is at least two ballots on the Bulletin Board.
-    if cbr_length >= 2:
-        last_ballot_b64, previous_last_ballot_b64 = await ff.fetch_last_and_previouslast_ballot_from_bb(election_id, voter_id)
-    else:
-        # if there is no previous last ballot then we use the last ballot as the previous last ballot
-        last_ballot_b64, _ = await ff.fetch_last_and_previouslast_ballot_from_bb(election_id, voter_id)
-        previous_last_ballot_b64 = last_ballot_b64
 
     # Convert ballots back into petlib objects
     last_ballot = convert_to_ecpt(last_ballot_b64, GROUP)
@@ -179,6 +167,19 @@ def re_enc(g, pk, ct, r):
 
     return (c0Prime, c1Prime)
 
+def re_enc_precomputed(ct, factor):
+    """Re-Encryption of a ciphertext with precomputed randomness
+
+    Args:
+        ct (EcPt, EcPt): ciphertext of encrypted message (c0, c1)
+        factor (ReEncryptionFactor): randomness r with the points r*g and r*pk
+    
+    Returns:
+        (c0Prime, c1Prime) (EcPt, EcPt): re-encrypted ciphertext, equal to re_enc(g, pk, ct, r)
+    """
+    c0, c1 = ct
+    return (c0 + factor.r_g, c1 + factor.r_pk)
+
 def dec(ct, sk):
     """Decryption of a ciphertext
 
@@ -218,29 +219,23 @@ async def obfuscate(voter_id, election_id):
     Returns:
         Ballot: Obfuscated ballot ready for submission.
     """
-    GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS = await fetch_data(election_id, voter_id)
-    voter_public_key_bin = await ff.fetch_voter_public_key_from_bb(voter_id, election_id)
+    # Last ballot and previous last ballot are fetched together with the parameters.
+    # If there is no previous last ballot then the last ballot is used as the previous last ballot.
+    GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS, voter_public_key_bin, last_ballot_b64, previous_last_ballot_b64 = await fetch_data(election_id, voter_id)
     upk = EcPt.from_binary(voter_public_key_bin, GROUP)     # Recreating voter public key as petlib EcPt object.
 
     # Fetch VS secret key from json file keys.json
     sk_VS = fetch_vs_secret_key()
 
-    # Fetch last ballot and previous last ballot
-    if cbr_length >= 2:
-        last_ballot_b64, previous_last_ballot_b64 = await ff.fetch_last_and_previouslast_ballot_from_bb(election_id, voter_id)
-    else:
-        # if there is no last previous ballot then we use the last ballot as the previous last ballot
-        last_ballot_b64, _ = await ff.fetch_last_and_previouslast_ballot_from_bb(election_id, voter_id)
-        previous_last_ballot_b64 = last_ballot_b64
-
     last_ballot = convert_to_ecpt(last_ballot_b64, GROUP)
     previous_last_ballot = convert_to_ecpt(previous_last_ballot_b64, GROUP)
     s_time_obf = time.process_time_ns() # Performance: Start timer before obfuscation
 
-    # Generate a noise ballot
-    r_v = Secret(value=ORDER.random())
-    r_lv = Secret(value=ORDER.random())
-    r_lid = Secret(value=ORDER.random())
+    # Generate a noise ballot. The randomness and its points r*g and r*pk are taken from the precomputed pool.
+    rand = randomness.take(GENERATOR, ORDER, pk_TS, pk_VS)
+    r_v = Secret(value=rand.v.r)
+    r_lv = Secret(value=rand.lv.r)
+    r_lid = Secret(value=rand.lid.r)
     sk = Secret(value=sk_VS)
 
     # fetching ct_lv and ct_lid from last_ballot to use for obfuscation.
@@ -250,8 +245,8 @@ async def obfuscate(voter_id, election_id):
     ct_i=(2*ct_lid[0],2*ct_lid[1])  
     
     # ct_lv and ct_lid are re-encrypted for the new obfuscated ballot.
-    ct_lv_new=re_enc(GENERATOR, pk_VS, ct_i, r_lv.value) 
-    ct_lid_new=re_enc(GENERATOR, pk_VS, ct_i, r_lid.value) 
+    ct_lv_new=re_enc_precomputed(ct_i, rand.lv)
+    ct_lid_new=re_enc_precomputed(ct_i, rand.lid)
 
     # If both ct_lv and ct_lid are encryptions of the same list, subtracting lid from lv will result in the equivalent of 0 (represented as 0*generator)
     c0 = ct_lv[0]-ct_lid[0]
@@ -260,7 +255,7 @@ async def obfuscate(voter_id, election_id):
     g_m_dec = dec(ct, sk.value)
 
     # Obfuscating depending on comparison of lv and lid. If the result is 0 (represented as 0*generator), the lists are equivalent.
-    if g_m_dec==0*GENERATOR:
+    if g_m_dec==GROUP.infinite():
     # If 1 = Dec(sk_vs, (ct_lv-1)-(ct_lid-1)) then we re-randomize the last ballot 
         ct_v=last_ballot[0]
         sim_relation=2 
@@ -270,7 +265,7 @@ async def obfuscate(voter_id, election_id):
         sim_relation=1
         print(f"{YELLOW}[{cbr_length}] VS obfuscated previous last ballot for voter {voter_id}")
     
-    ct_v_new = [re_enc(GENERATOR, pk_TS, ct_v[i], r_v.value) for i in range(len(candidates))]
+    ct_v_new = [re_enc_precomputed(ct_v[i], rand.v) for i in range(len(candidates))]
 
     full_stmt=stmt((GENERATOR, pk_TS, pk_VS, upk, ct_v_new, ct_lv_new, ct_lid_new, ct_i, c0, c1, last_ballot[0], previous_last_ballot[0]),(r_v, Secret(), r_lv, r_lid, Secret(), sk), len(candidates))
     full_stmt.subproofs[0].set_simulated()
@@ -351,18 +346,15 @@ def fetch_vs_secret_key():
 async def fetch_data(election_id, voter_id):
     """
     Fetch all cryptographic and election-related data required for
-    ballot validation or obfuscation.
+    ballot validation or obfuscation in a single request to the Bulletin Board.
 
     Args:
         election_id: Identifier of the election.
         voter_id: Identifier of the voter.
 
     Returns:
-        tuple: (GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS)
+        tuple: (GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS, voter_public_key_bin, last_ballot_b64, previous_last_ballot_b64)
     """
-    GROUP, GENERATOR, ORDER = await ff.fetch_elgamal_params()
-    cbr_length = await ff.fetch_cbr_length_from_bb(voter_id, election_id)
-    candidates: list = await ff.fetch_candidates_from_bb(election_id)
-    pk_TS, pk_VS = await ff.fetch_public_keys_from_bb()
+    GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, voter_public_key_bin, cbr_length, last_ballot_b64, previous_last_ballot_b64 = await ff.fetch_proof_context_from_bb(election_id, voter_id)
 
-    return GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS
\ No newline at end of file
+    return GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS, voter_public_key_bin, last_ballot_b64, previous_last_ballot_b64
\ No newline at end of file
@@ -4,8 +4,15 @@ DROP TABLE IF EXISTS CandidateRunsInElection CASCADE;
 DROP TABLE IF EXISTS Voters CASCADE;
 DROP TABLE IF EXISTS VoterParticipatesInElection CASCADE;
 DROP TABLE IF EXISTS Ballots CASCADE;
+DROP TABLE IF EXISTS BallotProofs CASCADE;
 DROP TABLE IF EXISTS VoterCastsBallot CASCADE;
 DROP TABLE IF EXISTS Images CASCADE;
+DROP TABLE IF EXISTS VoterBallotHead CASCADE;
+DROP TABLE IF EXISTS VoterCBR CASCADE;
+DROP TABLE IF EXISTS EncryptedAggregate CASCADE;
+DROP TABLE IF EXISTS MerkleHeads CASCADE;
+DROP TABLE IF EXISTS MerkleNodes CASCADE;
+DROP TABLE IF EXISTS BoardChanges CASCADE;
 DROP TABLE IF EXISTS VotingServer CASCADE;
 DROP TABLE IF EXISTS GlobalInfo CASCADE;
 
@@ -42,27 +49,124 @@ CREATE TABLE VoterParticipatesInElection (
     PublicKey BYTEA NOT NULL
 );
 
+-- Keyset pagination and counting of an election's voters.
+CREATE INDEX VoterParticipatesInElectionIndex ON VoterParticipatesInElection (ElectionID, VoterID);
+
+-- The ballot tables are partitioned by election (LIST on ElectionID), so per-election queries only touch
+-- that election's partitions, and a finished election can be detached and archived as a whole.
+-- Partitions are created by the Bulletin Board when an election is loaded (see dbcalls.create_election_partitions).
+-- Primary keys and foreign keys between the ballot tables include ElectionID, as required for partitioned tables.
+
+-- Ciphertexts are stored as raw exported EC points.
 CREATE TABLE Ballots (
-    ID SERIAL PRIMARY KEY,
-    CtCandidate JSONB NOT NULL,
-    CtVoterList JSONB NOT NULL,
-    CtVotingServerList JSONB NOT NULL,
-    Proof BYTEA NOT NULL,
+    ElectionID INT NOT NULL REFERENCES Elections(ID),
+    ID SERIAL,
+    PRIMARY KEY (ElectionID, ID),
+    CtCandidate BYTEA[][] NOT NULL, -- One (c0, c1) pair per candidate.
+    CtVoterList BYTEA[] NOT NULL, -- (c0, c1)
+    CtVotingServerList BYTEA[] NOT NULL, -- (c0, c1)
     BallotHash TEXT NOT NULL
-);
+) PARTITION BY LIST (ElectionID);
+
+-- Proofs are only needed when verifying a ballot, so they are kept out of the "Ballots" rows
+-- read when obfuscating and tallying.
+CREATE TABLE BallotProofs (
+    ElectionID INT NOT NULL,
+    BallotID INT NOT NULL,
+    PRIMARY KEY (ElectionID, BallotID),
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID),
+    Proof BYTEA NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+-- Point lookups for duplicate detection, and a guarantee that the same ballot is never posted twice in an election.
+CREATE UNIQUE INDEX BallotHashIndex ON Ballots (ElectionID, BallotHash);
 
 CREATE TABLE VoterCastsBallot (
-    BallotID INT PRIMARY KEY REFERENCES Ballots(ID),
+    ElectionID INT NOT NULL REFERENCES Elections(ID),
+    BallotID INT NOT NULL,
+    PRIMARY KEY (ElectionID, BallotID),
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID),
     VoterID INT REFERENCES Voters(ID),
-    ElectionID INT REFERENCES Elections(ID),
     VoteTimestamp TIMESTAMP NOT NULL -- multiple type options - we need to reflect on what fits best.
-);
+) PARTITION BY LIST (ElectionID);
 
 CREATE TABLE Images (
+    ElectionID INT NOT NULL,
+    BallotID INT NOT NULL,
+    PRIMARY KEY (ElectionID, BallotID),
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID),
+    ImageFilename VARCHAR(50) NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+-- Head of each voter's CBR, maintained in the same transaction as every ballot insert,
+-- so the last ballot, previous last ballot and CBR length are single-row lookups.
+CREATE TABLE VoterBallotHead (
+    ElectionID INT REFERENCES Elections(ID),
+    VoterID INT REFERENCES Voters(ID),
+    PRIMARY KEY (ElectionID, VoterID),
+    LastBallotID INT NOT NULL,
+    PreviousLastBallotID INT, -- NULL while only ballot0 is on the CBR.
+    FOREIGN KEY (ElectionID, LastBallotID) REFERENCES Ballots(ElectionID, ID),
+    FOREIGN KEY (ElectionID, PreviousLastBallotID) REFERENCES Ballots(ElectionID, ID),
+    CBRLength INT NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+-- Denormalised Cast Ballot Record (CBR) of each voter, appended to on every ballot insert,
+-- so the CBR shown in the Voting App is read from one table and can be paginated by CBRIndex.
+CREATE TABLE VoterCBR (
+    ElectionID INT REFERENCES Elections(ID),
+    VoterID INT REFERENCES Voters(ID),
+    CBRIndex INT NOT NULL, -- Position of the ballot on the voter's CBR, starting at 0 for ballot0.
+    PRIMARY KEY (ElectionID, VoterID, CBRIndex),
     ImageFilename VARCHAR(50) NOT NULL,
-    BallotID INT PRIMARY KEY REFERENCES Ballots(ID)
+    VoteTimestamp TIMESTAMP NOT NULL,
+    BallotID INT NOT NULL,
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID)
+) PARTITION BY LIST (ElectionID);
+
+-- Per-candidate sum of the last ballot ciphertexts (ctv) of all voters in an election.
+-- ElGamal is additively homomorphic, so every ballot insert adds the new last ctv and subtracts the replaced one.
+-- C0 and C1 are EC points, starting at the point at infinity ('\x00').
+CREATE TABLE EncryptedAggregate (
+    ElectionID INT REFERENCES Elections(ID),
+    CandidateIndex INT, -- Position of the candidate in the ballot ctv.
+    PRIMARY KEY (ElectionID, CandidateIndex),
+    C0 BYTEA NOT NULL DEFAULT '\x00',
+    C1 BYTEA NOT NULL DEFAULT '\x00'
+);
+
+-- Append-only Merkle log (RFC 6962) over the ballot hashes of each election, see merkleBB.py.
+-- TreeSize is the number of leaves; the row is locked while appending, so leaves are appended one batch at a time.
+CREATE TABLE MerkleHeads (
+    ElectionID INT PRIMARY KEY REFERENCES Elections(ID),
+    TreeSize INT NOT NULL DEFAULT 0
+);
+
+-- Roots of the complete (perfect) subtrees: node (Level, NodeIndex) covers the leaves
+-- [NodeIndex * 2^Level, (NodeIndex + 1) * 2^Level). Level 0 holds the leaf hashes.
+CREATE TABLE MerkleNodes (
+    ElectionID INT REFERENCES Elections(ID),
+    Level SMALLINT,
+    NodeIndex INT,
+    PRIMARY KEY (ElectionID, Level, NodeIndex),
+    Hash BYTEA NOT NULL
+);
+
+CREATE UNIQUE INDEX MerkleLeafHashIndex ON MerkleNodes (ElectionID, Hash) WHERE Level = 0;
+
+-- Change feed: one row per ballot or result posted, read with GET /changes and /changes/stream.
+-- Rows are inserted while the election's MerkleHeads row is locked, so within an election the IDs
+-- grow in commit order and can be used as a cursor without skipping changes committed later.
+CREATE TABLE BoardChanges (
+    ID BIGSERIAL PRIMARY KEY,
+    ElectionID INT NOT NULL REFERENCES Elections(ID),
+    Kind VARCHAR(20) NOT NULL, -- 'ballot' or 'result'
+    Payload JSONB NOT NULL,
+    CreatedAt TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
+CREATE INDEX BoardChangesElectionIndex ON BoardChanges (ElectionID, ID);
+
 CREATE TABLE GlobalInfo (
     ID INT PRIMARY KEY,
     PublicKeyTallyingServer BYTEA,
@@ -0,0 +1,6 @@
+-- Migration for databases created before the unique ballot hash index was added to schema.sql.
+-- Built concurrently so a running board keeps accepting ballots.
+-- Fails if the board already contains duplicate ballot hashes; these have to be resolved by hand first:
+--   SELECT BallotHash, COUNT(*) FROM Ballots GROUP BY BallotHash HAVING COUNT(*) > 1;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS BallotHashIndex ON Ballots (BallotHash);
@@ -0,0 +1,21 @@
+-- Migration for databases created before the VoterBallotHead table was added to schema.sql.
+-- Run while the Bulletin Board is stopped, so no ballots are inserted between the backfill and the restart.
+
+CREATE TABLE IF NOT EXISTS VoterBallotHead (
+    ElectionID INT REFERENCES Elections(ID),
+    VoterID INT REFERENCES Voters(ID),
+    PRIMARY KEY (ElectionID, VoterID),
+    LastBallotID INT NOT NULL REFERENCES Ballots(ID),
+    PreviousLastBallotID INT REFERENCES Ballots(ID),
+    CBRLength INT NOT NULL
+);
+
+INSERT INTO VoterBallotHead (ElectionID, VoterID, LastBallotID, PreviousLastBallotID, CBRLength)
+SELECT ElectionID,
+       VoterID,
+       (array_agg(BallotID ORDER BY VoteTimestamp DESC))[1],
+       (array_agg(BallotID ORDER BY VoteTimestamp DESC))[2],
+       COUNT(*)
+FROM VoterCastsBallot
+GROUP BY ElectionID, VoterID
+ON CONFLICT (ElectionID, VoterID) DO NOTHING;
@@ -0,0 +1,53 @@
+-- Migration for databases created before ciphertexts were stored as raw EC points and proofs were moved to "BallotProofs".
+-- Converts the JSONB arrays of base64 strings in "Ballots" to BYTEA arrays and moves every proof to "BallotProofs".
+-- Run while the Bulletin Board is stopped.
+
+BEGIN;
+
+CREATE TABLE BallotProofs (
+    BallotID INT PRIMARY KEY REFERENCES Ballots(ID),
+    Proof BYTEA NOT NULL
+);
+
+INSERT INTO BallotProofs (BallotID, Proof)
+SELECT ID, Proof
+FROM Ballots;
+
+ALTER TABLE Ballots
+    ADD COLUMN CtCandidateBin BYTEA[][],
+    ADD COLUMN CtVoterListBin BYTEA[],
+    ADD COLUMN CtVotingServerListBin BYTEA[];
+
+UPDATE Ballots
+SET CtCandidateBin = (
+        SELECT array_agg(ARRAY[decode(ct->>0, 'base64'), decode(ct->>1, 'base64')] ORDER BY idx)
+        FROM jsonb_array_elements(CtCandidate) WITH ORDINALITY AS t(ct, idx)
+    ),
+    CtVoterListBin = (
+        SELECT array_agg(decode(ct, 'base64') ORDER BY idx)
+        FROM jsonb_array_elements_text(CtVoterList) WITH ORDINALITY AS t(ct, idx)
+    ),
+    CtVotingServerListBin = (
+        SELECT array_agg(decode(ct, 'base64') ORDER BY idx)
+        FROM jsonb_array_elements_text(CtVotingServerList) WITH ORDINALITY AS t(ct, idx)
+    );
+
+ALTER TABLE Ballots
+    DROP COLUMN CtCandidate,
+    DROP COLUMN CtVoterList,
+    DROP COLUMN CtVotingServerList,
+    DROP COLUMN Proof;
+
+ALTER TABLE Ballots RENAME COLUMN CtCandidateBin TO CtCandidate;
+ALTER TABLE Ballots RENAME COLUMN CtVoterListBin TO CtVoterList;
+ALTER TABLE Ballots RENAME COLUMN CtVotingServerListBin TO CtVotingServerList;
+
+ALTER TABLE Ballots
+    ALTER COLUMN CtCandidate SET NOT NULL,
+    ALTER COLUMN CtVoterList SET NOT NULL,
+    ALTER COLUMN CtVotingServerList SET NOT NULL;
+
+COMMIT;
+
+-- Rewrite the table so the space held by the dropped JSONB and proof columns is returned.
+VACUUM FULL Ballots;
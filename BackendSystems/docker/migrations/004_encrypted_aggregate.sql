@@ -0,0 +1,17 @@
+-- Migration for databases created before the EncryptedAggregate table was added to schema.sql.
+-- The sums cannot be computed in SQL, so for elections that already have ballots the aggregate has to be
+-- rebuilt from the last ballots afterwards with POST /encrypted-aggregate/rebuild?election_id=<id>.
+
+CREATE TABLE IF NOT EXISTS EncryptedAggregate (
+    ElectionID INT REFERENCES Elections(ID),
+    CandidateIndex INT,
+    PRIMARY KEY (ElectionID, CandidateIndex),
+    C0 BYTEA NOT NULL DEFAULT '\x00',
+    C1 BYTEA NOT NULL DEFAULT '\x00'
+);
+
+INSERT INTO EncryptedAggregate (ElectionID, CandidateIndex)
+SELECT ElectionID, generate_series(0, COUNT(*) - 1)
+FROM CandidateRunsInElection
+GROUP BY ElectionID
+ON CONFLICT (ElectionID, CandidateIndex) DO NOTHING;
@@ -0,0 +1,118 @@
+-- Migration for databases created before the ballot tables were partitioned by election.
+-- Run while the Bulletin Board is stopped. All ballot tables are rewritten into per-election partitions,
+-- with ElectionID copied onto every row from VoterCastsBallot.
+
+BEGIN;
+
+ALTER TABLE VoterBallotHead RENAME TO VoterBallotHead_old;
+ALTER TABLE Images RENAME TO Images_old;
+ALTER TABLE BallotProofs RENAME TO BallotProofs_old;
+ALTER TABLE VoterCastsBallot RENAME TO VoterCastsBallot_old;
+ALTER TABLE Ballots RENAME TO Ballots_old;
+
+-- Index names are unique per schema, so the old ones are renamed before the new tables are created.
+ALTER INDEX voterballothead_pkey RENAME TO voterballothead_old_pkey;
+ALTER INDEX images_pkey RENAME TO images_old_pkey;
+ALTER INDEX ballotproofs_pkey RENAME TO ballotproofs_old_pkey;
+ALTER INDEX votercastsballot_pkey RENAME TO votercastsballot_old_pkey;
+ALTER INDEX ballots_pkey RENAME TO ballots_old_pkey;
+ALTER INDEX BallotHashIndex RENAME TO BallotHashIndex_old;
+
+-- Ballot ids keep coming from the existing sequence.
+ALTER SEQUENCE ballots_id_seq OWNED BY NONE;
+
+CREATE TABLE Ballots (
+    ElectionID INT NOT NULL REFERENCES Elections(ID),
+    ID INT NOT NULL DEFAULT nextval('ballots_id_seq'),
+    PRIMARY KEY (ElectionID, ID),
+    CtCandidate BYTEA[][] NOT NULL,
+    CtVoterList BYTEA[] NOT NULL,
+    CtVotingServerList BYTEA[] NOT NULL,
+    BallotHash TEXT NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+CREATE TABLE BallotProofs (
+    ElectionID INT NOT NULL,
+    BallotID INT NOT NULL,
+    PRIMARY KEY (ElectionID, BallotID),
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID),
+    Proof BYTEA NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+CREATE UNIQUE INDEX BallotHashIndex ON Ballots (ElectionID, BallotHash);
+
+CREATE TABLE VoterCastsBallot (
+    ElectionID INT NOT NULL REFERENCES Elections(ID),
+    BallotID INT NOT NULL,
+    PRIMARY KEY (ElectionID, BallotID),
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID),
+    VoterID INT REFERENCES Voters(ID),
+    VoteTimestamp TIMESTAMP NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+CREATE TABLE Images (
+    ElectionID INT NOT NULL,
+    BallotID INT NOT NULL,
+    PRIMARY KEY (ElectionID, BallotID),
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID),
+    ImageFilename VARCHAR(50) NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+CREATE TABLE VoterBallotHead (
+    ElectionID INT REFERENCES Elections(ID),
+    VoterID INT REFERENCES Voters(ID),
+    PRIMARY KEY (ElectionID, VoterID),
+    LastBallotID INT NOT NULL,
+    PreviousLastBallotID INT,
+    FOREIGN KEY (ElectionID, LastBallotID) REFERENCES Ballots(ElectionID, ID),
+    FOREIGN KEY (ElectionID, PreviousLastBallotID) REFERENCES Ballots(ElectionID, ID),
+    CBRLength INT NOT NULL
+) PARTITION BY LIST (ElectionID);
+
+-- Same partitions as created by the Bulletin Board when an election is loaded.
+DO $$
+DECLARE
+    election_id INT;
+    parent TEXT;
+BEGIN
+    FOR election_id IN SELECT ID FROM Elections LOOP
+        FOREACH parent IN ARRAY ARRAY['ballots', 'ballotproofs', 'votercastsballot', 'images', 'voterballothead'] LOOP
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES IN (%s)', parent || '_e' || election_id, parent, election_id);
+        END LOOP;
+    END LOOP;
+END $$;
+
+INSERT INTO Ballots (ElectionID, ID, CtCandidate, CtVoterList, CtVotingServerList, BallotHash)
+SELECT c.ElectionID, b.ID, b.CtCandidate, b.CtVoterList, b.CtVotingServerList, b.BallotHash
+FROM Ballots_old b
+JOIN VoterCastsBallot_old c ON c.BallotID = b.ID;
+
+INSERT INTO BallotProofs (ElectionID, BallotID, Proof)
+SELECT c.ElectionID, p.BallotID, p.Proof
+FROM BallotProofs_old p
+JOIN VoterCastsBallot_old c ON c.BallotID = p.BallotID;
+
+INSERT INTO VoterCastsBallot (ElectionID, BallotID, VoterID, VoteTimestamp)
+SELECT ElectionID, BallotID, VoterID, VoteTimestamp
+FROM VoterCastsBallot_old;
+
+INSERT INTO Images (ElectionID, BallotID, ImageFilename)
+SELECT c.ElectionID, i.BallotID, i.ImageFilename
+FROM Images_old i
+JOIN VoterCastsBallot_old c ON c.BallotID = i.BallotID;
+
+INSERT INTO VoterBallotHead (ElectionID, VoterID, LastBallotID, PreviousLastBallotID, CBRLength)
+SELECT ElectionID, VoterID, LastBallotID, PreviousLastBallotID, CBRLength
+FROM VoterBallotHead_old;
+
+DROP TABLE VoterBallotHead_old, Images_old, BallotProofs_old, VoterCastsBallot_old, Ballots_old;
+
+ALTER SEQUENCE ballots_id_seq OWNED BY Ballots.ID;
+
+COMMIT;
+
+ANALYZE Ballots;
+ANALYZE BallotProofs;
+ANALYZE VoterCastsBallot;
+ANALYZE Images;
+ANALYZE VoterBallotHead;
@@ -0,0 +1,38 @@
+-- Migration for databases created before the VoterCBR table was added to schema.sql.
+-- Run while the Bulletin Board is stopped, so no ballots are inserted between the backfill and the restart.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS VoterCBR (
+    ElectionID INT REFERENCES Elections(ID),
+    VoterID INT REFERENCES Voters(ID),
+    CBRIndex INT NOT NULL,
+    PRIMARY KEY (ElectionID, VoterID, CBRIndex),
+    ImageFilename VARCHAR(50) NOT NULL,
+    VoteTimestamp TIMESTAMP NOT NULL,
+    BallotID INT NOT NULL,
+    FOREIGN KEY (ElectionID, BallotID) REFERENCES Ballots(ElectionID, ID)
+) PARTITION BY LIST (ElectionID);
+
+DO $$
+DECLARE
+    election_id INT;
+BEGIN
+    FOR election_id IN SELECT ID FROM Elections LOOP
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF VoterCBR FOR VALUES IN (%s)', 'votercbr_e' || election_id, election_id);
+    END LOOP;
+END $$;
+
+INSERT INTO VoterCBR (ElectionID, VoterID, CBRIndex, ImageFilename, VoteTimestamp, BallotID)
+SELECT c.ElectionID,
+       c.VoterID,
+       ROW_NUMBER() OVER (PARTITION BY c.ElectionID, c.VoterID ORDER BY c.VoteTimestamp ASC) - 1,
+       i.ImageFilename,
+       c.VoteTimestamp,
+       c.BallotID
+FROM VoterCastsBallot c
+JOIN Images i
+ON i.ElectionID = c.ElectionID AND i.BallotID = c.BallotID
+ON CONFLICT (ElectionID, VoterID, CBRIndex) DO NOTHING;
+
+COMMIT;
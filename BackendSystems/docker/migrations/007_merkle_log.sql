@@ -0,0 +1,22 @@
+-- Migration for databases created before the Merkle log tables were added to schema.sql.
+-- The leaf and node hashes are computed by the Bulletin Board, so for elections that already have ballots
+-- the log has to be built afterwards with POST /merkle/rebuild?election_id=<id>.
+
+CREATE TABLE IF NOT EXISTS MerkleHeads (
+    ElectionID INT PRIMARY KEY REFERENCES Elections(ID),
+    TreeSize INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS MerkleNodes (
+    ElectionID INT REFERENCES Elections(ID),
+    Level SMALLINT,
+    NodeIndex INT,
+    PRIMARY KEY (ElectionID, Level, NodeIndex),
+    Hash BYTEA NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS MerkleLeafHashIndex ON MerkleNodes (ElectionID, Hash) WHERE Level = 0;
+
+INSERT INTO MerkleHeads (ElectionID)
+SELECT ID FROM Elections
+ON CONFLICT (ElectionID) DO NOTHING;
@@ -0,0 +1,12 @@
+-- Migration for databases created before the BoardChanges table was added to schema.sql.
+-- Changes are only recorded from now on; consumers read ballots posted earlier from the existing endpoints.
+
+CREATE TABLE IF NOT EXISTS BoardChanges (
+    ID BIGSERIAL PRIMARY KEY,
+    ElectionID INT NOT NULL REFERENCES Elections(ID),
+    Kind VARCHAR(20) NOT NULL,
+    Payload JSONB NOT NULL,
+    CreatedAt TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS BoardChangesElectionIndex ON BoardChanges (ElectionID, ID);
@@ -0,0 +1,4 @@
+-- Migration for databases created before the roster index was added to schema.sql.
+-- Used for keyset pagination of GET /voters and for GET /voters/count.
+
+CREATE INDEX IF NOT EXISTS VoterParticipatesInElectionIndex ON VoterParticipatesInElection (ElectionID, VoterID);
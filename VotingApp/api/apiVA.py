@@ -27,7 +27,7 @@ from vote_casting import vote, send_ballot_to_VS
 from coloursVA import RED, GREEN, PURPLE, PINK
 import httpx
 from tally_verification import verify_tally
-from fetch_functions_va import fetch_election_result_from_bb, fetch_candidates_names_from_bb, fetch_keys_from_ra, already_saved, fetch_ballot_from_bb
+from fetch_functions_va import fetch_election_result_from_bb, fetch_candidates_names_from_bb, fetch_keys_from_ra, already_saved, fetch_ballot_from_bb, fetch_cbr_images_from_bb
 import time
 import os
 import save_to_duckdb as ddb
@@ -150,17 +150,9 @@ async def fetch_elections_for_voter(
     Returns:
         IndexImageCBR: List of index, image, and timestamp for all ballots on a voter's CBR.
     """
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BB_API_URL}/cbr-for-voter?election_id={election_id}&voter_id={voter_id}")
-            response.raise_for_status() 
+    cbr_images: IndexImageCBR = await fetch_cbr_images_from_bb(election_id, voter_id)
 
-            cbr_images: IndexImageCBR = IndexImageCBR.model_validate(response.json())
-            
-            return cbr_images
-    except Exception as e:
-        print(f"{RED}Error fetching cbr images for voter {voter_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"{RED}Error fetching cbr images for voter {voter_id}: {str(e)}")     
+    return cbr_images
 
 
 # Sending ballot to Voting Server after receiving it in the Voting App frontend.
@@ -28,14 +28,12 @@ async def verify_proof(election_id, voter_id, pyballot: Ballot):
     Returns:
         bool: True if the proof verifies successfully, otherwise False.
     """
-    GROUP, GENERATOR, _, _, candidates, pk_TS, pk_VS = await fetch_data(election_id, voter_id)
+    # The two ballots preceding the provided ballot are fetched together with the parameters.
+    GROUP, GENERATOR, _, _, candidates, pk_TS, pk_VS, last_ballot_b64, previous_last_ballot_b64 = await fetch_data(election_id, voter_id, pyballot.timestamp)
 
     current_ballot_b64 = (pyballot.ctv, pyballot.ctlv, pyballot.ctlid, pyballot.proof)
     ctv_current, ctlv_current, ctlid_current, proof_current = convert_to_ecpt(current_ballot_b64, GROUP)
     
-    # Fetch the two ballots preceding the provided ballot:
-    last_ballot_b64, previous_last_ballot_b64 = await ff.fetch_preceding_ballots_from_bb(election_id, voter_id, pyballot.timestamp)
-    
     # Convert ballots back into petlib objects
     last_ballot = convert_to_ecpt(last_ballot_b64, GROUP)
     previous_last_ballot = convert_to_ecpt(previous_last_ballot_b64, GROUP)
@@ -108,21 +106,19 @@ def convert_to_ecpt(ballot, GROUP):
     return (ct_v, ct_lv, ct_lid, proof)
 
 
-async def fetch_data(election_id, voter_id):
+async def fetch_data(election_id, voter_id, timestamp):
     """
     Fetch all cryptographic and election-related data required for
-    ballot verification.
+    ballot verification in a single request to the Bulletin Board.
 
     Args:
         election_id: Identifier of the election.
         voter_id: Identifier of the voter.
+        timestamp: Timestamp of the ballot being verified. The preceding ballots are the two ballots before it.
 
     Returns:
-        tuple: (GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS)
+        tuple: (GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS, last_ballot_b64, previous_last_ballot_b64)
     """
-    GROUP, GENERATOR, ORDER = await ff.fetch_elgamal_params()
-    cbr_length = await ff.fetch_cbr_length_from_bb(voter_id, election_id)
-    candidates: list = await ff.fetch_candidates_from_bb(election_id)
-    pk_TS, pk_VS = await ff.fetch_public_keys_from_bb()
+    GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, _, cbr_length, last_ballot_b64, previous_last_ballot_b64 = await ff.fetch_proof_context_from_bb(election_id, voter_id, timestamp)
 
-    return GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS
\ No newline at end of file
+    return GROUP, GENERATOR, ORDER, cbr_length, candidates, pk_TS, pk_VS, last_ballot_b64, previous_last_ballot_b64
\ No newline at end of file
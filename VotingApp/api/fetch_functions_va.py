@@ -14,7 +14,7 @@ All functions are written with FastAPI exceptions (``HTTPException``).
 import httpx
 from fastapi import HTTPException
 from coloursVA import RED
-from modelsVA import ElGamalParams, ElectionResult, Ballot
+from modelsVA import ElGamalParams, ElectionResult, Ballot, IndexImageCBR
 from petlib.ec import EcPt, EcGroup, Bn
 import base64
 import duckdb
@@ -28,6 +28,9 @@ RA_API_URL = os.environ.get("RA_API_URL")
 BB_API_URL = os.environ.get("BB_API_URL")
 """Base URL for the Bulletin Board API."""
 
+cbr_cache: dict = {}
+"""Cached CBR per ``(election_id, voter_id)`` as ``(etag, cbr_images)``, revalidated against BB on every fetch."""
+
 async def fetch_elgamal_params():
     """Fetch ElGamal parameters from the Bulletin Board.
     
@@ -71,17 +74,21 @@ async def fetch_candidates_from_bb(election_id):
         If BB request fails.
     """
     try:
+        candidates_list: list = []
+        after_id = None
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BB_API_URL}/candidates?election_id={election_id}")
-            response.raise_for_status() 
-
-            data = response.json()
-            candidates_list: list = []
-
-            for candidate in data["candidates"]:
-                candidates_list.append(candidate["id"])
- 
-            return candidates_list
+            while True: # The BB returns the candidates in pages ordered by id.
+                params = {"election_id": election_id} if after_id is None else {"election_id": election_id, "after_id": after_id}
+                response = await client.get(f"{BB_API_URL}/candidates", params=params)
+                response.raise_for_status()
+
+                data = response.json()
+                for candidate in data["candidates"]:
+                    candidates_list.append(candidate["id"])
+
+                after_id = data.get("next")
+                if after_id is None:
+                    return candidates_list
     except Exception as e:
         print(f"{RED}Error fetching candidates from BB: {e}")
         raise HTTPException(status_code=500, detail=f"{RED}Error fetching candidates from BB: {str(e)}")     
@@ -99,14 +106,19 @@ async def fetch_candidates_names_from_bb(election_id: int):
         If BB request fails.
     """
     try:
+        candidates: list = []
+        after_id = None
         async with httpx.AsyncClient() as client:
-            resp = await client.get(
-                f"{BB_API_URL}/candidates?election_id={election_id}"
-            )
-            resp.raise_for_status()
-            data = resp.json()
-
-            return data
+            while True: # The BB returns the candidates in pages ordered by id.
+                params = {"election_id": election_id} if after_id is None else {"election_id": election_id, "after_id": after_id}
+                resp = await client.get(f"{BB_API_URL}/candidates", params=params)
+                resp.raise_for_status()
+                data = resp.json()
+                candidates.extend(data["candidates"])
+
+                after_id = data.get("next")
+                if after_id is None:
+                    return {"candidates": candidates}
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Error fetching candidates: {e}")
 
@@ -123,44 +135,52 @@ async def fetch_voters_from_bb(election_id):
         If BB request fails.
     """
     try:
+        voter_id_list: list = []
+        after_id = None
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BB_API_URL}/voters?election_id={election_id}")
-            response.raise_for_status() 
-          
-            data = response.json()
-            voters = data["voters"]
-            voter_id_list = [v["id"] for v in voters]
-          
-            return voter_id_list
+            while True: # The BB returns the voters in pages ordered by id.
+                params = {"election_id": election_id} if after_id is None else {"election_id": election_id, "after_id": after_id}
+                response = await client.get(f"{BB_API_URL}/voters", params=params)
+                response.raise_for_status()
+
+                data = response.json()
+                voter_id_list.extend(v["id"] for v in data["voters"])
+
+                after_id = data.get("next")
+                if after_id is None:
+                    return voter_id_list
     except Exception as e:
         print(f"{RED}Error fetching voters from BB {e}")
         raise HTTPException(status_code=500, detail=f"{RED}Error fetching voters from BB: {str(e)}")
 
 
-async def fetch_last_ballot_ctvs_from_bb(election_id):
-    """Fetch the last ciphertext vote (ctv) from BB per voter in election.
+async def fetch_encrypted_aggregate_from_bb(election_id, GROUP):
+    """Fetch the per-candidate sum of the last ciphertext votes (ctv) of all voters in election from BB.
+
+    The BB keeps this sum up to date on every ballot insert, as ElGamal is additively homomorphic.
 
     Args:
-    election_id: Election identifier.
+        election_id: Election identifier.
+        GROUP: Petlib group used to decode points.
 
     Returns:
-        list: The value of ``last_ballot_ctvs`` returned by BB.
+        list[tuple[EcPt, EcPt]]: Summed ``(c0, c1)`` per candidate.
 
     HTTPException:
         If BB request fails.
     """
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BB_API_URL}/fetch_last_ballot_ctvs?election_id={election_id}")
+            response = await client.get(f"{BB_API_URL}/encrypted-aggregate?election_id={election_id}")
             response.raise_for_status() 
-          
+
             data = response.json()
-            last_ballot_ctvs = data["last_ballot_ctvs"]
-          
-            return last_ballot_ctvs
+            ctv_sums = [(EcPt.from_binary(base64.b64decode(c0), GROUP), EcPt.from_binary(base64.b64decode(c1), GROUP)) for c0, c1 in data["aggregate"]]
+
+            return ctv_sums
     except Exception as e:
-        print(f"{RED}Error fetching voters from BB {e}")
-        raise HTTPException(status_code=500, detail=f"{RED}Error fetching voters from BB: {str(e)}")
+        print(f"{RED}Error fetching encrypted aggregate from BB {e}")
+        raise HTTPException(status_code=500, detail=f"{RED}Error fetching encrypted aggregate from BB: {str(e)}")
     
 async def fetch_election_result_from_bb(election_id):
     """Fetch the election result from BB (if available).
@@ -272,6 +292,52 @@ async def fetch_cbr_length_from_bb(voter_id, election_id):
         raise HTTPException(status_code=500, detail=f"{RED}Error fetching previous ballots from BB: {str(e)}")    
 
 
+async def fetch_proof_context_from_bb(election_id, voter_id, before=None):
+    """Fetch everything needed to build or verify one ballot for a voter in a single BB request.
+
+    Args:
+        election_id: Election identifier.
+        voter_id: Voter identifier.
+        before: Optional datetime. If given, the CBR length and preceding ballots are taken as of this timestamp.
+
+    Returns:
+        tuple: ``(GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, voter_public_key_bin, cbr_length, last_ballot_b64, previous_last_ballot_b64)``
+        with parameters and keys converted into petlib types, candidates as a list of candidate ids and
+        ``previous_last_ballot_b64`` set to ``last_ballot_b64`` if BB reports it as ``None``.
+
+    HTTPException:
+        If BB request fails.
+    """
+    params = {"election_id": election_id, "voter_id": voter_id}
+    if before is not None:
+        params["before"] = before.isoformat()
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{BB_API_URL}/proof-context", params=params)
+            response.raise_for_status() 
+            data = response.json()
+
+        # Convert to proper types for cryptographic functions.
+        GROUP = EcGroup(data["group"])
+        GENERATOR = EcPt.from_binary(base64.b64decode(data["generator"]), GROUP)
+        ORDER = Bn.from_binary(base64.b64decode(data["order"]))
+        pk_TS = EcPt.from_binary(base64.b64decode(data["publickey_ts"]), GROUP)
+        pk_VS = EcPt.from_binary(base64.b64decode(data["publickey_vs"]), GROUP)
+
+        candidates = [candidate["id"] for candidate in data["candidates"]]
+        voter_public_key_bin = base64.b64decode(data["voter_public_key"])
+
+        last_ballot_b64 = data["last_ballot"]
+        previous_last_ballot_b64 = data["previous_last_ballot"]
+        # If there is no previous last ballot then the last ballot is used as the previous last ballot.
+        if previous_last_ballot_b64 is None:
+            previous_last_ballot_b64 = last_ballot_b64
+
+        return GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, voter_public_key_bin, data["cbr_length"], last_ballot_b64, previous_last_ballot_b64
+    except Exception as e:
+        print(f"{RED}Error fetching proof context from BB: {e}")
+        raise HTTPException(status_code=500, detail=f"{RED}Error fetching proof context from BB: {str(e)}")     
+
 def fetch_keys(voter_id, election_id):
     """Fetch a voter's secret/public keys from the local DuckDB.
 
@@ -344,6 +410,47 @@ def already_saved(election_id):
 
     return result is not None
 
+async def fetch_cbr_images_from_bb(election_id, voter_id):
+    """Fetch index, image, and timestamp for all ballots on a voter's CBR from BB.
+
+    The CBR only grows, so it is cached and BB is asked for the ballots after the last cached
+    CBR index with ``If-None-Match``. BB answers 304 if no ballot has been added since.
+
+    Args:
+        election_id: Election identifier.
+        voter_id: Voter identifier.
+
+    Returns:
+        IndexImageCBR: List of index, image, and timestamp for all ballots on the voter's CBR.
+
+    HTTPException:
+        If BB request fails.
+    """
+    key = (election_id, voter_id)
+    etag, cbr_images = cbr_cache.get(key, (None, []))
+
+    params = {"election_id": election_id, "voter_id": voter_id}
+    headers = {}
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    if cbr_images:
+        params["after_index"] = cbr_images[-1].cbrindex
+
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{BB_API_URL}/cbr-for-voter", params=params, headers=headers)
+            if response.status_code != 304: # Not modified: the cached CBR is up to date.
+                response.raise_for_status()
+
+                new_cbr_images = IndexImageCBR.model_validate(response.json()).cbrimages
+                cbr_images = cbr_images + new_cbr_images
+                cbr_cache[key] = (response.headers.get("etag"), cbr_images)
+
+            return IndexImageCBR(cbrimages=cbr_images)
+    except Exception as e:
+        print(f"{RED}Error fetching cbr images for voter {voter_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"{RED}Error fetching cbr images for voter {voter_id}: {str(e)}")     
+
 async def fetch_ballot_from_bb(election_id, voter_id, image_filename):
     """Fetch a specific ballot from BB.
 
@@ -5,10 +5,9 @@ published ciphertexts, using the NIZK proofs included in the BB's election
 result.
 
 1) Fetch ElGamal parameters and the final election result from BB.
-2) Fetch the last ciphertext vote (ctv) for each voter from BB.
-3) Recompute per-candidate aggregated ciphertexts.
-4) Reconstruct the ZK statement for each candidate tally.
-5) Deserialize the proof and verify it against the statement.
+2) Fetch the per-candidate aggregated ciphertexts of the last ciphertext votes (ctv), kept up to date by BB.
+3) Reconstruct the ZK statement for each candidate tally.
+4) Deserialize the proof and verify it against the statement.
 
 This verification does not recompute votes; it checks the cryptographic proof
   that the posted vote count matches the aggregated ciphertexts.
@@ -18,7 +17,7 @@ from zksk import Secret, base, DLRep
 import fetch_functions_va as ff
 from modelsVA import ElectionResult
 import base64
-from petlib.ec import EcPt
+from fixedbaseVA import fixed_base
 
 async def verify_tally(election_id):
     """Verify tally correctness for a given election id.
@@ -33,18 +32,13 @@ async def verify_tally(election_id):
         GROUP, GENERATOR, ORDER = await ff.fetch_elgamal_params()
         election_result: ElectionResult = await ff.fetch_election_result_from_bb(election_id)
         candidates = len(election_result.result) # The result list has one entry per candidate  
-        voters = len(await ff.fetch_voters_from_bb(election_id))
-        last_ballots_ctvs_b64 = await ff.fetch_last_ballot_ctvs_from_bb(election_id)
-        last_ballots_ctvs = convert_to_ecpt(last_ballots_ctvs_b64, GROUP)
+        ctv_sums = await ff.fetch_encrypted_aggregate_from_bb(election_id, GROUP)
 
         stmt=[]
         for i in range(candidates):
             votes = election_result.result[i].votes
 
-            c0, c1 =(0*GENERATOR), (0*GENERATOR)
-            for j in range(voters):
-                c0+=last_ballots_ctvs[j][i][0]
-                c1+=last_ballots_ctvs[j][i][1]
+            c0, c1 = ctv_sums[i]
             print(f"votes: {votes} \n c0: {c0} \n c1: {c1} \n secret:  {Secret()}")
             stmt.append(stmt_tally(GENERATOR, ORDER, votes, c0, c1, Secret()))
 
@@ -75,7 +69,7 @@ def stmt_tally(generator, order, votes, c0, c1, sk_TS):
     """
     one=Secret(value=1)
     neg_c0 = (-1)*c0
-    return DLRep(votes*generator, one*c1 + sk_TS*neg_c0)
+    return DLRep(fixed_base(generator).mul(votes), one*c1 + sk_TS*neg_c0)
 
 def dec(ct, sk):
     """Decrypt an ElGamal ciphertext under secret key ``sk``.
@@ -105,33 +99,3 @@ def deserialise(proof):
       proof = base.NIZK.deserialize(proof_bin)
 
       return proof
-
-
-def convert_to_ecpt(ctv_list, GROUP):
-    """Convert a base64 ciphertext list to EC points.
-
-    Args:
-        ctv_list: Ciphertext structure as base64 strings:
-        ``[ [ [ct0_b64, ct1_b64], ... per candidate ], ... per voter ]``.
-        group: Petlib group used to decode points.
-
-    Returns:
-        list[list[tuple[EcPt, EcPt]]]: Ciphertexts converted to ``EcPt`` pairs.
-    """
-    # Converting to binary
-    ctv_bin = []
-    for ctvs in ctv_list: # for each voter ctv-list
-        decoded_pairs = []
-        for ct0, ct1 in ctvs: # for the ciphertext pairs for each candidate
-            decoded_pairs.append((base64.b64decode(ct0), base64.b64decode(ct1)))
-        ctv_bin.append(decoded_pairs)
-
-    # Converting to ecpt
-    ctv_ecpt = []
-    for ctvs in ctv_bin: # for each voter ctv-list
-        decoded_pairs = []
-        for ct0, ct1 in ctvs: # for the ciphertext pairs for each candidate
-            decoded_pairs.append((EcPt.from_binary(ct0, GROUP), EcPt.from_binary(ct1, GROUP)))
-        ctv_ecpt.append(decoded_pairs)
-
-    return ctv_ecpt
\ No newline at end of file
@@ -8,6 +8,7 @@ from coloursVA import RED, GREEN, PINK
 import fetch_functions_va as ff
 import os
 import time
+from fixedbaseVA import fixed_base, enc_vector
 
 VS_API_URL = os.environ.get("VS_API_URL") # Fetch VS address from environment variable.
 
@@ -34,22 +35,14 @@ async def fetch_data(voter_id, election_id):
     Returns:
         tuple: (GENERATOR, ORDER, pk_TS, pk_VS, cbr_length, last_ballot, previous_last_ballot, candidates, public_key, usk)
     """
-    GROUP, GENERATOR, ORDER = await ff.fetch_elgamal_params()
-    pk_TS, pk_VS = await ff.fetch_public_keys_from_bb()
-    cbr_length = await ff.fetch_cbr_length_from_bb(voter_id, election_id)
-    # Fetch last ballot and previous last ballot
-    if cbr_length >= 2:
-        last_ballot_b64, previous_last_ballot_b64 = await ff.fetch_last_and_previouslast_ballot_from_bb(election_id, voter_id)
-    else:
-        # if there is no last previous ballot then we use the last ballot as the previous ballot
-        last_ballot_b64, _ = await ff.fetch_last_and_previouslast_ballot_from_bb(election_id, voter_id)
-        previous_last_ballot_b64 = last_ballot_b64
+    # Parameters, keys, candidates and the last and previous last ballot are fetched in a single request.
+    # If there is no previous last ballot then the last ballot is used as the previous ballot.
+    GROUP, GENERATOR, ORDER, pk_TS, pk_VS, candidates, _, cbr_length, last_ballot_b64, previous_last_ballot_b64 = await ff.fetch_proof_context_from_bb(election_id, voter_id)
 
     # Converting back to EcPt objects
     last_ballot = convert_to_ecpt(last_ballot_b64, GROUP) 
     previous_last_ballot = convert_to_ecpt(previous_last_ballot_b64, GROUP)
 
-    candidates: list = await ff.fetch_candidates_from_bb(election_id)
     usk_bin, public_key = ff.fetch_keys(voter_id, election_id)
     usk = Bn.from_binary(usk_bin) # Recreate voter's secret key as petlib Bn object.
 
@@ -80,7 +73,7 @@ async def vote(v, lv_list, election_id, voter_id):
 
     #generating the new ballot
     ct_i = (2*ct_lid[0],2*ct_lid[1]) 
-    ct_v_new = [enc(GENERATOR, pk_TS, R1_v[i].value, R1_r_v.value) for i in range(len(candidates))]
+    ct_v_new = enc_vector(GENERATOR, pk_TS, [R1_v[i].value for i in range(len(candidates))], R1_r_v.value) # R1_r_v*g and R1_r_v*pk_TS are shared by all candidates
     ct_lv_new = enc(GENERATOR, pk_VS, R1_lv.value, R1_r_lv.value) 
     ct_lid_new = re_enc(GENERATOR, pk_VS, (ct_i[0], GENERATOR+ct_i[1]), R1_r_lid.value)
     c0 = ct_lv[0]-ct_lid[0]
@@ -183,7 +176,7 @@ def enc(g, pk, m, r):
     """
     # Elliptic Curve Elgamal results in g**m * pk**r becoming m*g + r*pk
     c0 = r*g
-    c1 = m*g + r*pk
+    c1 = fixed_base(g).mul(m) + r*pk
 
     return (c0, c1)
 